@@ -0,0 +1,133 @@
+"""
+HLS-style playlists for recitations
+
+Segments are byte ranges into the original per-ayah MP3 files, so nothing is
+copied or re-encoded. Segment boundaries always fall on ayah boundaries; long
+ayahs are further split on frame boundaries to keep segments short.
+"""
+
+from typing import List, Tuple
+import hashlib
+import math
+import os
+
+from app.audio.mp3 import index_mp3, iter_frames
+from app.audio.playlist import resolve_audio_path
+from app.metrics import CACHE_EVICTIONS, CACHE_HITS, CACHE_MISSES
+
+HLS_CACHE_DIR = os.path.join("cache", "hls")
+
+# Long ayahs are split into segments of roughly this length
+TARGET_SEGMENT_MS = 10000
+
+
+def ayah_segments(path: str, target_ms: int = TARGET_SEGMENT_MS) -> List[Tuple[int, int, float]]:
+    """Split one ayah file into (offset, length, duration_ms) frame-aligned segments"""
+    index = index_mp3(path)
+    if index.duration_ms <= target_ms * 1.5:
+        return [(index.start, index.end - index.start, index.duration_ms)]
+
+    segments = []
+    seg_start = index.start
+    seg_ms = 0.0
+    for offset, header in iter_frames(path, index):
+        if seg_ms >= target_ms:
+            segments.append((seg_start, offset - seg_start, seg_ms))
+            seg_start = offset
+            seg_ms = 0.0
+        seg_ms += header.samples * 1000.0 / header.sample_rate
+    segments.append((seg_start, index.end - seg_start, seg_ms))
+    return segments
+
+
+def render_manifest(ayah_files: List[Tuple[int, str]], segment_base_url: str) -> str:
+    """Render an HLS media playlist for (ayah_number, audio_file_url) pairs"""
+    entries = []
+    for ayah_number, audio_url in ayah_files:
+        path = resolve_audio_path(audio_url)
+        filename = os.path.basename(path)
+        for offset, length, duration_ms in ayah_segments(path):
+            entries.append((ayah_number, filename, offset, length, duration_ms))
+
+    target_duration = max((math.ceil(e[4] / 1000) for e in entries), default=1)
+
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:4",
+        "#EXT-X-PLAYLIST-TYPE:VOD",
+        "#EXT-X-INDEPENDENT-SEGMENTS",
+        f"#EXT-X-TARGETDURATION:{target_duration}",
+        "#EXT-X-MEDIA-SEQUENCE:0",
+    ]
+    for ayah_number, filename, offset, length, duration_ms in entries:
+        lines.append(f"#EXTINF:{duration_ms / 1000:.3f},ayah {ayah_number}")
+        lines.append(f"#EXT-X-BYTERANGE:{length}@{offset}")
+        lines.append(f"{segment_base_url}/{filename}")
+    lines.append("#EXT-X-ENDLIST")
+    return "\n".join(lines) + "\n"
+
+
+def manifest_fingerprint(ayah_files: List[Tuple[int, str]]) -> str:
+    """Hash of the source files so a cached manifest is rebuilt when audio changes"""
+    digest = hashlib.sha1()
+    for ayah_number, audio_url in ayah_files:
+        path = resolve_audio_path(audio_url)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Audio file {os.path.basename(path)} not found")
+        stat = os.stat(path)
+        digest.update(f"{ayah_number}:{audio_url}:{stat.st_mtime_ns}:{stat.st_size};".encode())
+    return digest.hexdigest()[:16]
+
+
+def get_manifest_path(recitation_id: int, surah_number: int,
+                      ayah_files: List[Tuple[int, str]], segment_base_url: str) -> str:
+    """Return the cached manifest for a recitation and surah, building it if stale"""
+    fingerprint = manifest_fingerprint(ayah_files)
+    cache_dir = os.path.join(HLS_CACHE_DIR, str(recitation_id))
+    manifest_path = os.path.join(cache_dir, f"{surah_number:03d}-{fingerprint}.m3u8")
+
+    if os.path.exists(manifest_path):
+        CACHE_HITS.labels("hls_manifest").inc()
+        return manifest_path
+    CACHE_MISSES.labels("hls_manifest").inc()
+
+    os.makedirs(cache_dir, exist_ok=True)
+    content = render_manifest(ayah_files, segment_base_url)
+
+    # Write then rename so concurrent readers never see a partial manifest
+    tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_path, manifest_path)
+
+    # Drop manifests built from older versions of the audio files
+    prefix = f"{surah_number:03d}-"
+    for name in os.listdir(cache_dir):
+        if name.startswith(prefix) and name.endswith(".m3u8") and name != os.path.basename(manifest_path):
+            try:
+                os.remove(os.path.join(cache_dir, name))
+                CACHE_EVICTIONS.labels("hls_manifest").inc()
+            except OSError:
+                pass
+
+    return manifest_path
+
+
+def parse_range_header(range_header: str, file_size: int) -> Tuple[int, int]:
+    """Parse a single `bytes=a-b` range into a half-open (start, end) span"""
+    unit, _, spec = range_header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        raise ValueError("Only single byte ranges are supported")
+
+    first, _, last = spec.strip().partition("-")
+    if first == "":
+        length = int(last)
+        start, end = max(file_size - length, 0), file_size
+    else:
+        start = int(first)
+        end = int(last) + 1 if last else file_size
+    end = min(end, file_size)
+
+    if start >= end:
+        raise ValueError("Range not satisfiable")
+    return start, end
@@ -0,0 +1,219 @@
+"""
+MPEG audio frame scanning for joining per-ayah recitation files
+
+Only frame headers are read; the audio payload is never decoded, so a span of
+frames can be copied byte-for-byte into a larger stream.
+"""
+
+from functools import lru_cache
+from typing import Iterator, NamedTuple, Optional, Tuple
+import os
+
+from app.metrics import CACHE_EVICTIONS, CACHE_HITS, CACHE_MISSES, add_refresh_hook
+
+# Bitrates in kbps indexed by [version_is_mpeg1][layer][bitrate_index]
+BITRATES = {
+    True: {
+        1: (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+        2: (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+        3: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    },
+    False: {
+        1: (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+        2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+        3: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    },
+}
+
+# Sample rates in Hz indexed by version bits
+SAMPLE_RATES = {
+    3: (44100, 48000, 32000),  # MPEG 1
+    2: (22050, 24000, 16000),  # MPEG 2
+    0: (11025, 12000, 8000),   # MPEG 2.5
+}
+
+# How far to look for the first frame after any leading tag
+SYNC_SEARCH_LIMIT = 64 * 1024
+
+
+class FrameHeader(NamedTuple):
+    length: int
+    samples: int
+    sample_rate: int
+    side_info_offset: int
+
+
+class Mp3Index(NamedTuple):
+    """Byte span of the audio frames in a file and the duration they cover"""
+    start: int
+    end: int
+    frame_count: int
+    duration_ms: float
+    sample_rate: int
+
+
+def parse_frame_header(header: bytes) -> Optional[FrameHeader]:
+    """Decode a 4-byte MPEG audio frame header, or return None if invalid"""
+    if len(header) < 4 or header[0] != 0xFF or (header[1] & 0xE0) != 0xE0:
+        return None
+
+    version_bits = (header[1] >> 3) & 0x03
+    layer_bits = (header[1] >> 1) & 0x03
+    bitrate_index = (header[2] >> 4) & 0x0F
+    sample_rate_index = (header[2] >> 2) & 0x03
+    padding = (header[2] >> 1) & 0x01
+    channel_mode = (header[3] >> 6) & 0x03
+
+    if version_bits == 1 or layer_bits == 0:
+        return None
+    if bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    is_mpeg1 = version_bits == 3
+    layer = 4 - layer_bits
+    bitrate = BITRATES[is_mpeg1][layer][bitrate_index] * 1000
+    sample_rate = SAMPLE_RATES[version_bits][sample_rate_index]
+
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate // sample_rate + padding) * 4
+    elif layer == 2:
+        samples = 1152
+        length = 144 * bitrate // sample_rate + padding
+    else:
+        samples = 1152 if is_mpeg1 else 576
+        length = (144 if is_mpeg1 else 72) * bitrate // sample_rate + padding
+
+    # Where a Xing/Info tag would start inside the first frame
+    mono = channel_mode == 3
+    if is_mpeg1:
+        side_info_offset = 4 + (17 if mono else 32)
+    else:
+        side_info_offset = 4 + (9 if mono else 17)
+
+    return FrameHeader(length, samples, sample_rate, side_info_offset)
+
+
+def _id3v2_size(head: bytes) -> int:
+    """Size of a leading ID3v2 tag including its header and optional footer"""
+    if len(head) < 10 or head[:3] != b"ID3":
+        return 0
+    size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+    footer = 10 if head[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _trailing_tags_size(f, file_size: int) -> int:
+    """Size of ID3v1 and APEv2 tags appended to the end of the file"""
+    trailing = 0
+    if file_size >= 128:
+        f.seek(file_size - 128)
+        if f.read(3) == b"TAG":
+            trailing += 128
+    if file_size - trailing >= 32:
+        f.seek(file_size - trailing - 32)
+        footer = f.read(32)
+        if footer[:8] == b"APETAGEX":
+            trailing += int.from_bytes(footer[12:16], "little") + 32
+    return min(trailing, file_size)
+
+
+def _find_first_frame(f, offset: int, limit: int) -> Optional[int]:
+    """Locate the first header that is followed by another valid header"""
+    f.seek(offset)
+    window = f.read(SYNC_SEARCH_LIMIT + 4)
+    for i in range(len(window) - 3):
+        if window[i] != 0xFF:
+            continue
+        header = parse_frame_header(window[i:i + 4])
+        if header is None:
+            continue
+        next_offset = offset + i + header.length
+        if next_offset >= limit:
+            return offset + i
+        f.seek(next_offset)
+        if parse_frame_header(f.read(4)) is not None:
+            return offset + i
+    return None
+
+
+def _walk_frames(f, offset: int, limit: int) -> Iterator[Tuple[int, FrameHeader]]:
+    """Yield (offset, header) for consecutive frames until sync is lost"""
+    while offset + 4 <= limit:
+        f.seek(offset)
+        header = parse_frame_header(f.read(4))
+        if header is None or offset + header.length > limit:
+            return
+        yield offset, header
+        offset += header.length
+
+
+def iter_frames(path: str, index: Mp3Index) -> Iterator[Tuple[int, FrameHeader]]:
+    """Yield (offset, header) for every frame inside an indexed span"""
+    with open(path, "rb") as f:
+        yield from _walk_frames(f, index.start, index.end)
+
+
+def scan_mp3(path: str) -> Mp3Index:
+    """Walk the frame headers of an MP3 file and return its audio span"""
+    file_size = os.path.getsize(path)
+
+    with open(path, "rb") as f:
+        start = _id3v2_size(f.read(10))
+        limit = file_size - _trailing_tags_size(f, file_size)
+
+        first = _find_first_frame(f, start, limit)
+        if first is None:
+            raise ValueError(f"No MPEG audio frames found in {path}")
+
+        f.seek(first)
+        first_frame = f.read(200)
+        header = parse_frame_header(first_frame)
+
+        # A Xing/Info/VBRI frame carries metadata for this file only; drop it
+        # so the joined stream does not advertise a wrong length
+        tag = first_frame[header.side_info_offset:header.side_info_offset + 4]
+        if tag in (b"Xing", b"Info") or first_frame[36:40] == b"VBRI":
+            first += header.length
+
+        frame_count = 0
+        samples = 0
+        end = first
+        for offset, header in _walk_frames(f, first, limit):
+            frame_count += 1
+            samples += header.samples
+            sample_rate = header.sample_rate
+            end = offset + header.length
+
+    if frame_count == 0:
+        raise ValueError(f"No MPEG audio frames found in {path}")
+
+    return Mp3Index(
+        start=first,
+        end=end,
+        frame_count=frame_count,
+        duration_ms=samples * 1000.0 / sample_rate,
+        sample_rate=sample_rate
+    )
+
+
+@lru_cache(maxsize=8192)
+def _cached_scan(path: str, mtime_ns: int, size: int) -> Mp3Index:
+    return scan_mp3(path)
+
+
+def index_mp3(path: str) -> Mp3Index:
+    """Scan an MP3 file once and reuse the result until the file changes"""
+    stat = os.stat(path)
+    return _cached_scan(path, stat.st_mtime_ns, stat.st_size)
+
+
+def _refresh_cache_metrics():
+    info = _cached_scan.cache_info()
+    CACHE_HITS.labels("mp3_index").value = info.hits
+    CACHE_MISSES.labels("mp3_index").value = info.misses
+    # Every miss inserts an entry, and entries only leave by eviction
+    CACHE_EVICTIONS.labels("mp3_index").value = max(info.misses - info.currsize, 0)
+
+
+add_refresh_hook(_refresh_cache_metrics)
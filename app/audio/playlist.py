@@ -0,0 +1,81 @@
+"""
+Gapless ayah-range playlists assembled from per-ayah MP3 files
+"""
+
+from typing import Dict, Iterator, List, Tuple
+import os
+
+from app.audio.mp3 import index_mp3
+
+AUDIO_DIR = os.path.join("static", "audio")
+
+# Bytes copied per read while streaming a joined range
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def resolve_audio_path(audio_url: str) -> str:
+    """Map an audio_file_url such as /static/audio/001001_x.mp3 to a local path"""
+    return os.path.join(AUDIO_DIR, os.path.basename(audio_url))
+
+
+def build_playlist(rows: List[Tuple]) -> Dict:
+    """
+    Build cumulative offsets for a joined stream
+
+    `rows` are (ayah_number, word_id, start_time, end_time, audio_file_url)
+    ordered by ayah and word position. Word timings are shifted by the start
+    of their ayah inside the joined stream.
+    """
+    ayahs = []
+    current = None
+    for ayah_number, word_id, start_time, end_time, audio_url in rows:
+        if current is None or current["ayah_number"] != ayah_number:
+            current = {
+                "ayah_number": ayah_number,
+                "audio_url": audio_url,
+                "words": []
+            }
+            ayahs.append(current)
+        current["words"].append((word_id, start_time, end_time))
+
+    offset_ms = 0.0
+    for ayah in ayahs:
+        path = resolve_audio_path(ayah["audio_url"])
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Audio file {os.path.basename(path)} not found")
+
+        index = index_mp3(path)
+        ayah["path"] = path
+        ayah["byte_range"] = (index.start, index.end)
+        ayah["offset_ms"] = round(offset_ms, 3)
+        ayah["duration_ms"] = round(index.duration_ms, 3)
+        ayah["words"] = [
+            {
+                "word_id": word_id,
+                "start_time": round(offset_ms + start_time, 3),
+                "end_time": round(offset_ms + end_time, 3)
+            }
+            for word_id, start_time, end_time in ayah["words"]
+        ]
+        offset_ms += index.duration_ms
+
+    return {
+        "total_duration_ms": round(offset_ms, 3),
+        "total_bytes": sum(end - start for start, end in (a["byte_range"] for a in ayahs)),
+        "ayahs": ayahs
+    }
+
+
+def iter_joined_frames(spans: List[Tuple[str, int, int]],
+                       chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield the frame bytes of each (path, start, end) span in order"""
+    for path, start, end in spans:
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
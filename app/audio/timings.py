@@ -0,0 +1,32 @@
+"""
+Word timings of a whole surah grouped by ayah
+"""
+
+from typing import List, Tuple
+
+
+def group_surah_timings(rows: List[Tuple]) -> List[dict]:
+    """
+    Group timing rows into ayahs
+
+    `rows` are (word_id, ayah_number, word_position, text, start_time,
+    end_time, audio_file_url) ordered by ayah and word position.
+    """
+    ayahs = []
+    current = None
+    current_ayah = None
+    for word_id, ayah_number, position, text, start_time, end_time, audio_url in rows:
+        if ayah_number != current_ayah:
+            current = []
+            current_ayah = ayah_number
+            ayahs.append({"ayah_number": ayah_number, "words": current})
+        current.append({
+            "word_id": word_id,
+            "position": position,
+            "text": text,
+            "start_time": start_time,
+            "end_time": end_time,
+            "duration": end_time - start_time,
+            "audio_url": audio_url
+        })
+    return ayahs
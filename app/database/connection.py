@@ -3,11 +3,17 @@ Database connection and configuration
 """
 
 import aiosqlite
+import asyncio
 import os
+import time
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+from app.database.instrumentation import MeteredAsyncConnection
+from app.database.recitation_stats import migrate_recitation_stats
+from app.metrics import DB_CONNECT_DURATION
+
 Base = declarative_base()
 
 DATABASE_URL = "sqlite:///./app/database/quran.db"
@@ -22,8 +28,10 @@ async def get_async_db():
     # Ensure directory exists
     os.makedirs(os.path.dirname(db_path), exist_ok=True)
     
+    started = time.perf_counter()
     async with aiosqlite.connect(db_path) as db:
-        yield db
+        DB_CONNECT_DURATION.labels("quran").observe(time.perf_counter() - started)
+        yield MeteredAsyncConnection(db, "quran", db_path)
 
 async def init_database():
     """Initialize database on startup"""
@@ -34,4 +42,7 @@ async def init_database():
     if not os.path.exists(db_path):
         print(f"Database not found at {db_path}. Please run init_db.py first.")
     else:
-        print(f"Database found at {db_path}")
\ No newline at end of file
+        print(f"Database found at {db_path}")
+        # Older databases lack the recitation_stats table read by /audio/stats
+        if await asyncio.get_running_loop().run_in_executor(None, migrate_recitation_stats, db_path):
+            print("Created and backfilled recitation_stats")
\ No newline at end of file
@@ -0,0 +1,149 @@
+"""
+Timed SQLite connections
+
+Thin wrappers around sqlite3 and aiosqlite connections that report every
+statement and row fetch to app.metrics and, while query tracing is on, to
+the current request's trace (see app.database.tracing).
+"""
+
+from typing import Optional
+import sqlite3
+import time
+
+import aiosqlite
+
+from app.database.tracing import tracer
+from app.metrics import DB_CONNECT_DURATION, record_fetch, record_statement
+
+
+def _statement_done(db_label: str, db_path: str, sql: str, params, started: float) -> Optional[list]:
+    seconds = time.perf_counter() - started
+    record_statement(db_label, seconds)
+    if tracer.enabled:
+        return tracer.start_statement(db_path, sql, params, seconds)
+    return None
+
+
+def _fetch_done(db_label: str, entry: Optional[list], started: float, rows: int):
+    seconds = time.perf_counter() - started
+    record_fetch(db_label, seconds)
+    if entry is not None:
+        entry[3] += seconds
+        entry[4] += rows
+
+
+class MeteredCursor(sqlite3.Cursor):
+    """sqlite3 cursor timing execute and fetch calls"""
+
+    _trace_entry = None
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            conn = self.connection
+            self._trace_entry = _statement_done(conn.db_label, conn.db_path, sql, parameters, started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            conn = self.connection
+            self._trace_entry = _statement_done(conn.db_label, conn.db_path, sql, None, started)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        _fetch_done(self.connection.db_label, self._trace_entry, started, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        _fetch_done(self.connection.db_label, self._trace_entry, started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        _fetch_done(self.connection.db_label, self._trace_entry, started, len(rows))
+        return rows
+
+
+class MeteredConnection(sqlite3.Connection):
+    """sqlite3 connection whose cursors, including those of conn.execute, are timed"""
+
+    db_label = "qul"
+    db_path = ""
+
+    def cursor(self, factory=MeteredCursor):
+        return super().cursor(factory)
+
+    # sqlite3.Connection.execute builds a plain cursor; route it through cursor()
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connect(db_path: str, db_label: str) -> MeteredConnection:
+    """Open a timed sqlite3 connection"""
+    started = time.perf_counter()
+    conn = sqlite3.connect(db_path, factory=MeteredConnection)
+    conn.db_label = db_label
+    conn.db_path = db_path
+    DB_CONNECT_DURATION.labels(db_label).observe(time.perf_counter() - started)
+    return conn
+
+
+class MeteredAsyncCursor:
+    """aiosqlite cursor wrapper timing fetch calls"""
+
+    def __init__(self, cursor: aiosqlite.Cursor, db_label: str, trace_entry: Optional[list]):
+        self._cursor = cursor
+        self._db_label = db_label
+        self._trace_entry = trace_entry
+
+    async def fetchone(self):
+        started = time.perf_counter()
+        row = await self._cursor.fetchone()
+        _fetch_done(self._db_label, self._trace_entry, started, row is not None)
+        return row
+
+    async def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = await self._cursor.fetchmany(size)
+        _fetch_done(self._db_label, self._trace_entry, started, len(rows))
+        return rows
+
+    async def fetchall(self):
+        started = time.perf_counter()
+        rows = await self._cursor.fetchall()
+        _fetch_done(self._db_label, self._trace_entry, started, len(rows))
+        return rows
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class MeteredAsyncConnection:
+    """aiosqlite connection wrapper timing statements and their cursors"""
+
+    def __init__(self, conn: aiosqlite.Connection, db_label: str, db_path: str):
+        self._conn = conn
+        self._db_label = db_label
+        self._db_path = db_path
+
+    async def execute(self, sql, parameters=None):
+        started = time.perf_counter()
+        try:
+            cursor = await self._conn.execute(sql, parameters)
+        finally:
+            entry = _statement_done(self._db_label, self._db_path, sql, parameters, started)
+        return MeteredAsyncCursor(cursor, self._db_label, entry)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
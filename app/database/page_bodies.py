@@ -0,0 +1,64 @@
+"""
+Pre-encoded QUL page bodies
+
+Each build's pages are encoded once, as JSON and as compact MessagePack, into
+one bytes buffer per encoding with an offsets table indexed by page number.
+Serving a page slices the buffer instead of walking its Line and Word
+objects, which also leaves their reference counts untouched: the memory
+holding the store stays shared between workers forked by serve.py.
+"""
+
+from array import array
+from typing import Callable, Optional
+
+from app.database.qul_store import QulStore
+from app.responses import encode_json, encode_msgpack, msgpack
+
+
+class _Buffer:
+    """Concatenated bodies; page n spans offsets[n]:offsets[n + 1]"""
+
+    def __init__(self, store: QulStore, encode: Callable[[int], bytes]):
+        last_page = max(store.pages, default=0)
+        chunks = []
+        # offsets[0] stands in for the nonexistent page 0
+        self.offsets = array("Q", [0, 0])
+        position = 0
+        for page_number in range(1, last_page + 1):
+            if page_number in store.pages:
+                body = encode(page_number)
+                chunks.append(body)
+                position += len(body)
+            # Pages missing from the build get an empty span
+            self.offsets.append(position)
+        self.data = b"".join(chunks)
+
+    def get(self, page_number: int) -> Optional[bytes]:
+        if not 0 < page_number < len(self.offsets) - 1:
+            return None
+        start, end = self.offsets[page_number], self.offsets[page_number + 1]
+        return self.data[start:end] if end > start else None
+
+
+class PageBodies:
+    """JSON (`Page.to_dict`) and MessagePack (`Page.to_compact`) bodies of every page"""
+
+    def __init__(self, store: QulStore):
+        self._json = _Buffer(store, lambda n: encode_json(store.pages[n].to_dict()))
+        self._msgpack = _Buffer(store, lambda n: encode_msgpack(store.pages[n].to_compact())) \
+            if msgpack is not None else None
+
+    def json(self, page_number: int) -> Optional[bytes]:
+        return self._json.get(page_number)
+
+    def msgpack(self, page_number: int) -> Optional[bytes]:
+        return self._msgpack.get(page_number) if self._msgpack is not None else None
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._json.data) + (len(self._msgpack.data) if self._msgpack is not None else 0)
+
+
+def encode_page_bodies(store: QulStore):
+    """Store warmer: encode every page before the build goes live"""
+    store.bodies = PageBodies(store)
@@ -0,0 +1,130 @@
+"""
+Non-blocking access to the QUL database
+
+Handlers never call sqlite3 on the event loop. Queries and other blocking
+work run on a dedicated thread pool, each thread keeping its own timed
+connection, behind a limit of one call per thread plus a bounded queue:
+calls beyond the queue are shed at once, and a call that is not finished by
+its deadline is abandoned, with a running query interrupted so its thread is
+freed promptly.
+"""
+
+from typing import Any, Callable, List, Optional
+import asyncio
+import concurrent.futures
+import contextvars
+import os
+import threading
+import time
+
+from app.database import instrumentation
+from app.database.qul_store import QUL_DB_PATH, qul_manager
+from app.metrics import DB_REJECTED
+
+# Threads running QUL work, which is also the number of concurrent calls
+QUL_DB_THREADS = int(os.getenv("QUL_DB_THREADS", "4"))
+# Calls allowed to wait for a thread before new ones are rejected
+QUL_DB_MAX_WAITING = int(os.getenv("QUL_DB_MAX_WAITING", "64"))
+# Seconds a call may take, waiting for a thread included
+QUL_DB_TIMEOUT = float(os.getenv("QUL_DB_TIMEOUT", "2"))
+
+
+class Overloaded(Exception):
+    """Too many calls are already waiting for a thread"""
+
+
+class QueryTimeout(Exception):
+    """The call did not finish before its deadline"""
+
+
+class QulDatabase:
+    def __init__(self, db_path: str, threads: int = QUL_DB_THREADS,
+                 max_waiting: int = QUL_DB_MAX_WAITING, timeout: float = QUL_DB_TIMEOUT):
+        self.db_path = db_path
+        self.threads = threads
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        # Calls admitted and not yet finished, running or waiting for a thread
+        self._admitted = 0
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._local = threading.local()
+
+    def _pool(self):
+        # Created on first use, inside the worker process and its event loop
+        if self._executor is None:
+            self._slots = asyncio.Semaphore(self.threads)
+            self._executor = concurrent.futures.ThreadPoolExecutor(self.threads, thread_name_prefix="qul-db")
+        return self._slots, self._executor
+
+    def _connection(self) -> instrumentation.MeteredConnection:
+        """This thread's connection, reopened when a new build has been swapped in"""
+        store = qul_manager.current
+        signature = store.signature if store is not None else None
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.signature != signature:
+            if conn is not None:
+                conn.close()
+            if not os.path.exists(self.db_path):
+                raise FileNotFoundError("QUL database not found")
+            conn = self._local.conn = instrumentation.connect(self.db_path, "qul")
+            self._local.signature = signature
+        return conn
+
+    def _fetchall(self, running: list, sql: str, params) -> List[tuple]:
+        conn = self._connection()
+        running.append(conn)
+        return conn.cursor().execute(sql, params).fetchall()
+
+    async def fetchall(self, sql: str, params=()) -> List[tuple]:
+        """Rows of one query"""
+        running = []
+        try:
+            return await self._submit(self.timeout, self._fetchall, running, sql, params)
+        except QueryTimeout:
+            # sqlite3 allows interrupt() from another thread
+            for conn in running:
+                conn.interrupt()
+            raise
+
+    async def run(self, func: Callable[..., Any], *args, bounded: bool = True) -> Any:
+        """Run other blocking QUL work; unbounded calls have no deadline"""
+        return await self._submit(self.timeout if bounded else None, func, *args)
+
+    def _finished(self, future):
+        self._admitted -= 1
+        self._slots.release()
+
+    async def _submit(self, timeout: Optional[float], func: Callable[..., Any], *args):
+        slots, executor = self._pool()
+        if self._admitted >= self.threads + self.max_waiting:
+            DB_REJECTED.labels("qul", "overloaded").inc()
+            raise Overloaded()
+
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        self._admitted += 1
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout)
+        except BaseException as e:
+            self._admitted -= 1
+            if isinstance(e, asyncio.TimeoutError):
+                DB_REJECTED.labels("qul", "timeout").inc()
+                raise QueryTimeout()
+            raise
+
+        # The metrics and trace context of the request follow the call into the thread
+        context = contextvars.copy_context()
+        future = asyncio.get_running_loop().run_in_executor(executor, context.run, func, *args)
+        # The thread stays taken until the work really ends, even after a timeout
+        future.add_done_callback(self._finished)
+        try:
+            remaining = max(deadline - time.monotonic(), 0) if deadline is not None else None
+            return await asyncio.wait_for(asyncio.shield(future), remaining)
+        except asyncio.TimeoutError:
+            DB_REJECTED.labels("qul", "timeout").inc()
+            # Consume the abandoned call's outcome so it is not reported as unretrieved
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            raise QueryTimeout()
+
+
+qul_db = QulDatabase(QUL_DB_PATH)
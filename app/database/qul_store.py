@@ -0,0 +1,252 @@
+"""
+In-memory QUL page store
+
+The QUL database is read-only between builds, so it is loaded once into
+slotted domain records and every read path works from memory. When a new
+build is swapped into place the manager loads it alongside the old store and
+switches over without a restart.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Callable, Dict, List, Optional, Tuple
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+
+from app.models.domain import Ayah, Chapter, Line, Page, Word, BASMALLAH_TEXT
+
+# Database path
+QUL_DB_PATH = "app/database/qul_complete.db"
+
+
+class QulStore:
+    """All pages, words, chapters and layouts of one QUL database build"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.loaded_at = time.time()
+        # Pre-encoded page bodies, set by a warmer (see app.database.page_bodies)
+        self.bodies = None
+
+        conn = sqlite3.connect(db_path)
+        try:
+            # Taken right after opening so it names the build being read
+            self.signature = file_signature(db_path)
+            self._load(conn)
+        finally:
+            conn.close()
+
+    def _load(self, conn: sqlite3.Connection):
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("SELECT source_fingerprint FROM build_info")
+            row = cursor.fetchone()
+            self.build_fingerprint = row[0] if row else None
+        except sqlite3.OperationalError:
+            # Builds made before build_info existed
+            self.build_fingerprint = None
+
+        cursor.execute("SELECT name, number_of_pages, lines_per_page, font_name FROM layout_info")
+        self.layouts = [
+            {
+                "name": row[0],
+                "number_of_pages": row[1],
+                "lines_per_page": row[2],
+                "font_name": row[3]
+            }
+            for row in cursor.fetchall()
+        ]
+
+        cursor.execute("SELECT id, name_simple, name_arabic, verses_count FROM chapters ORDER BY id")
+        self.chapters: Dict[int, Chapter] = {
+            row[0]: Chapter(*row) for row in cursor.fetchall()
+        }
+
+        # Words ordered by id; line ranges are resolved by bisecting word_ids.
+        # Lookup indexes are flat arrays rather than lists of int objects, so
+        # bisecting them never writes reference counts into memory shared
+        # with forked workers.
+        cursor.execute("SELECT id, surah, ayah, text FROM words ORDER BY id")
+        self.words: List[Word] = [Word(row[0], row[3], row[1], row[2]) for row in cursor]
+        self.word_ids = array("q", (word.id for word in self.words))
+
+        # Contiguous word index span of every ayah
+        self.ayah_spans: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        for index, word in enumerate(self.words):
+            key = (word.surah, word.ayah)
+            span = self.ayah_spans.get(key)
+            self.ayah_spans[key] = (span[0], index + 1) if span else (index, index + 1)
+
+        cursor.execute("""
+            SELECT page_number, line_number, line_type, is_centered,
+                   first_word_id, last_word_id, surah_number
+            FROM pages
+            ORDER BY page_number, line_number
+        """)
+        self.pages: Dict[int, Page] = {}
+        # (first_word_id, last_word_id, page_number) of every ayah line, by first id
+        line_ranges = []
+        for row in cursor:
+            page_number = row[0]
+            line = self.build_line(row)
+            if line.line_type == "ayah" and line.first_word_id and line.last_word_id:
+                line_ranges.append((line.first_word_id, line.last_word_id, page_number))
+
+            page = self.pages.get(page_number)
+            if page is None:
+                page = self.pages[page_number] = Page(page_number, [])
+            page.lines.append(line)
+
+        line_ranges.sort()
+        self._line_first_ids = array("q", (r[0] for r in line_ranges))
+        self._line_last_ids = array("q", (r[1] for r in line_ranges))
+        self._line_pages = array("i", (r[2] for r in line_ranges))
+
+    def build_line(self, row: Tuple) -> Line:
+        """Line from a (page_number, line_number, line_type, is_centered, first_word_id, last_word_id, surah_number) row"""
+        page_number, line_number, line_type, is_centered, first_id, last_id, surah_number = row
+        line = Line(line_number, line_type, bool(is_centered), first_id, last_id, surah_number)
+
+        if line_type == "surah_name":
+            chapter = self.chapters.get(surah_number) if surah_number else None
+            if chapter:
+                line.content = f"سورة {chapter.name_arabic}"
+        elif line_type == "basmallah":
+            line.content = BASMALLAH_TEXT
+        elif line_type == "ayah" and first_id and last_id:
+            line.words = tuple(self.words_between(first_id, last_id))
+            line.content = " ".join(word.text for word in line.words)
+        return line
+
+    def words_between(self, first_word_id: int, last_word_id: int) -> List[Word]:
+        """Words with ids in [first_word_id, last_word_id], in order"""
+        start = bisect_left(self.word_ids, first_word_id)
+        end = bisect_right(self.word_ids, last_word_id)
+        return self.words[start:end]
+
+    def page(self, page_number: int) -> Optional[Page]:
+        return self.pages.get(page_number)
+
+    def page_for_word(self, word_id: int) -> Optional[int]:
+        """Page whose ayah lines contain the given word"""
+        index = bisect_right(self._line_first_ids, word_id) - 1
+        if index < 0:
+            return None
+        return self._line_pages[index] if word_id <= self._line_last_ids[index] else None
+
+    def ayah(self, surah_number: int, ayah_number: int) -> Optional[Ayah]:
+        span = self.ayah_spans.get((surah_number, ayah_number))
+        if span is None:
+            return None
+        words = tuple(self.words[span[0]:span[1]])
+        return Ayah(surah_number, ayah_number, words, self.page_for_word(words[0].id))
+
+    @property
+    def total_pages(self) -> int:
+        return len(self.pages)
+
+
+def file_signature(path: str) -> Tuple[int, int, int]:
+    """(inode, size, mtime) identifying one build of the database file"""
+    stat = os.stat(path)
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+class QulStoreManager:
+    """
+    Holds the current QulStore and swaps in new database builds
+
+    Requests take a reference to the current store and keep using it, so a
+    swap only affects requests that start afterwards. New builds are loaded
+    and warmed in a worker thread before the switch.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.generation = 0
+        self._store: Optional[QulStore] = None
+        self._load_lock = threading.Lock()
+        self._warmers: List[Callable[[QulStore], None]] = []
+
+    def add_warmer(self, warmer: Callable[[QulStore], None]):
+        """Register a callable run on every new store before it goes live"""
+        if warmer not in self._warmers:
+            self._warmers.append(warmer)
+
+    def get_store(self) -> QulStore:
+        store = self._store
+        if store is None:
+            with self._load_lock:
+                store = self._store
+                if store is None:
+                    if not os.path.exists(self.db_path):
+                        raise FileNotFoundError("QUL database not found")
+                    store = self._activate(QulStore(self.db_path))
+        return store
+
+    @property
+    def current(self) -> Optional[QulStore]:
+        """The live store, or None if nothing is loaded yet; never loads"""
+        return self._store
+
+    def is_stale(self) -> bool:
+        """True when the file on disk is a different build from the loaded one"""
+        store = self._store
+        if store is None or not os.path.exists(self.db_path):
+            return False
+        return file_signature(self.db_path) != store.signature
+
+    def reload(self, force: bool = False) -> bool:
+        """Load, warm and switch to the current file; returns True if swapped"""
+        with self._load_lock:
+            if not os.path.exists(self.db_path):
+                return False
+            if not force and self._store is not None and not self.is_stale():
+                return False
+            self._activate(QulStore(self.db_path))
+            return True
+
+    def _activate(self, store: QulStore) -> QulStore:
+        for warmer in self._warmers:
+            try:
+                warmer(store)
+            except Exception as e:
+                print(f"Warming {getattr(warmer, '__name__', warmer)} failed: {e}")
+        # A single reference assignment: new requests see the new store at once
+        self._store = store
+        self.generation += 1
+        print(f"QUL database loaded (generation {self.generation}, {len(store.pages)} pages)")
+        return store
+
+    async def watch(self, interval: float):
+        """Poll the database file and hot-swap new builds"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if self.is_stale():
+                    await loop.run_in_executor(None, self.reload)
+            except Exception as e:
+                print(f"QUL database reload failed: {e}")
+
+    def request_reload(self):
+        """Reload in the background; safe to call from a signal handler"""
+        threading.Thread(target=self._reload_quietly, daemon=True).start()
+
+    def _reload_quietly(self):
+        try:
+            self.reload(force=True)
+        except Exception as e:
+            print(f"QUL database reload failed: {e}")
+
+
+qul_manager = QulStoreManager(QUL_DB_PATH)
+
+
+def get_qul_store() -> QulStore:
+    """Get the current QUL store, loading it on first use"""
+    return qul_manager.get_store()
@@ -0,0 +1,186 @@
+"""
+Recitation statistics materialized when audio timings are ingested
+
+Rows are kept at three levels in one table:
+  (surah, ayah)  per-ayah durations
+  (surah, 0)     per-surah roll-up of its ayah rows
+  (0, 0)         recitation-wide roll-up of its surah rows
+Totals and counts are stored instead of averages so levels compose.
+"""
+
+import os
+import sqlite3
+from typing import Iterable, Optional
+
+# surah_number/ayah_number of 0 mark the per-surah and recitation-wide rows
+RECITATION_STATS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS recitation_stats (
+        recitation_id INTEGER NOT NULL,
+        surah_number INTEGER NOT NULL,
+        ayah_number INTEGER NOT NULL,
+        word_count INTEGER NOT NULL,
+        total_duration_ms INTEGER NOT NULL,
+        min_duration_ms INTEGER NOT NULL,
+        max_duration_ms INTEGER NOT NULL,
+        ayahs_covered INTEGER NOT NULL,
+        surahs_covered INTEGER NOT NULL,
+        PRIMARY KEY (recitation_id, surah_number, ayah_number),
+        FOREIGN KEY (recitation_id) REFERENCES recitations(id)
+    )
+"""
+
+
+def create_recitation_stats_table(conn: sqlite3.Connection) -> bool:
+    """Create the table if missing; returns True when it was just created"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'recitation_stats'"
+    ).fetchone()
+    if exists:
+        return False
+    conn.execute(RECITATION_STATS_SCHEMA)
+    conn.commit()
+    return True
+
+
+def migrate_recitation_stats(db_path: str) -> bool:
+    """
+    Startup migration for databases created before recitation_stats existed
+
+    Creates the table and backfills it from the timings already loaded;
+    returns True when it did so.
+    """
+    if not os.path.exists(db_path):
+        return False
+    conn = sqlite3.connect(db_path)
+    try:
+        has_recitations = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'recitations'"
+        ).fetchone()
+        if not has_recitations or not create_recitation_stats_table(conn):
+            return False
+        refresh_all_recitation_stats(conn)
+        return True
+    finally:
+        conn.close()
+
+
+def _ayahs_for_words(cursor: sqlite3.Cursor, word_ids: Iterable[int]):
+    """Resolve word ids to their distinct (surah, ayah) pairs"""
+    word_ids = list(set(word_ids))
+    ayahs = set()
+    # Stay well below SQLite's bound-parameter limit
+    for i in range(0, len(word_ids), 500):
+        chunk = word_ids[i:i + 500]
+        placeholders = ",".join("?" * len(chunk))
+        cursor.execute(f"""
+            SELECT DISTINCT surah_number, ayah_number FROM words
+            WHERE id IN ({placeholders})
+        """, chunk)
+        ayahs.update(cursor.fetchall())
+    return ayahs
+
+
+def refresh_recitation_stats(conn: sqlite3.Connection, recitation_id: int,
+                             word_ids: Optional[Iterable[int]] = None):
+    """
+    Recompute stats for a recitation after its timings change
+
+    With `word_ids`, only the ayahs containing those words and their surahs are
+    recomputed; otherwise the whole recitation is rebuilt.
+    """
+    create_recitation_stats_table(conn)
+    cursor = conn.cursor()
+
+    if word_ids is None:
+        cursor.execute("DELETE FROM recitation_stats WHERE recitation_id = ?", (recitation_id,))
+        cursor.execute("""
+            INSERT INTO recitation_stats
+                (recitation_id, surah_number, ayah_number, word_count, total_duration_ms,
+                 min_duration_ms, max_duration_ms, ayahs_covered, surahs_covered)
+            SELECT at.recitation_id, w.surah_number, w.ayah_number, COUNT(*),
+                   SUM(at.end_time - at.start_time),
+                   MIN(at.end_time - at.start_time),
+                   MAX(at.end_time - at.start_time), 1, 1
+            FROM audio_timings at
+            JOIN words w ON at.word_id = w.id
+            WHERE at.recitation_id = ?
+            GROUP BY w.surah_number, w.ayah_number
+        """, (recitation_id,))
+        cursor.execute("""
+            SELECT DISTINCT surah_number FROM recitation_stats
+            WHERE recitation_id = ? AND ayah_number > 0
+        """, (recitation_id,))
+        surahs = {row[0] for row in cursor.fetchall()}
+    else:
+        ayahs = _ayahs_for_words(cursor, word_ids)
+        for surah_number, ayah_number in ayahs:
+            cursor.execute("""
+                DELETE FROM recitation_stats
+                WHERE recitation_id = ? AND surah_number = ? AND ayah_number = ?
+            """, (recitation_id, surah_number, ayah_number))
+            cursor.execute("""
+                INSERT INTO recitation_stats
+                    (recitation_id, surah_number, ayah_number, word_count, total_duration_ms,
+                     min_duration_ms, max_duration_ms, ayahs_covered, surahs_covered)
+                SELECT at.recitation_id, w.surah_number, w.ayah_number, COUNT(*),
+                       SUM(at.end_time - at.start_time),
+                       MIN(at.end_time - at.start_time),
+                       MAX(at.end_time - at.start_time), 1, 1
+                FROM audio_timings at
+                JOIN words w ON at.word_id = w.id
+                WHERE at.recitation_id = ? AND w.surah_number = ? AND w.ayah_number = ?
+                GROUP BY w.surah_number, w.ayah_number
+            """, (recitation_id, surah_number, ayah_number))
+        surahs = {surah_number for surah_number, _ in ayahs}
+
+    # Roll ayah rows up into their surahs
+    for surah_number in surahs:
+        cursor.execute("""
+            DELETE FROM recitation_stats
+            WHERE recitation_id = ? AND surah_number = ? AND ayah_number = 0
+        """, (recitation_id, surah_number))
+        cursor.execute("""
+            INSERT INTO recitation_stats
+                (recitation_id, surah_number, ayah_number, word_count, total_duration_ms,
+                 min_duration_ms, max_duration_ms, ayahs_covered, surahs_covered)
+            SELECT recitation_id, surah_number, 0, SUM(word_count), SUM(total_duration_ms),
+                   MIN(min_duration_ms), MAX(max_duration_ms), COUNT(*), 1
+            FROM recitation_stats
+            WHERE recitation_id = ? AND surah_number = ? AND ayah_number > 0
+            GROUP BY surah_number
+        """, (recitation_id, surah_number))
+
+    # Roll surah rows up into the recitation-wide row
+    cursor.execute("""
+        DELETE FROM recitation_stats
+        WHERE recitation_id = ? AND surah_number = 0
+    """, (recitation_id,))
+    cursor.execute("""
+        INSERT INTO recitation_stats
+            (recitation_id, surah_number, ayah_number, word_count, total_duration_ms,
+             min_duration_ms, max_duration_ms, ayahs_covered, surahs_covered)
+        SELECT recitation_id, 0, 0, SUM(word_count), SUM(total_duration_ms),
+               MIN(min_duration_ms), MAX(max_duration_ms), SUM(ayahs_covered), COUNT(*)
+        FROM recitation_stats
+        WHERE recitation_id = ? AND surah_number > 0 AND ayah_number = 0
+        GROUP BY recitation_id
+    """, (recitation_id,))
+
+    conn.commit()
+
+
+def refresh_all_recitation_stats(conn: sqlite3.Connection):
+    """Rebuild stats for every recitation"""
+    create_recitation_stats_table(conn)
+    cursor = conn.cursor()
+    cursor.execute("SELECT id FROM recitations")
+    for (recitation_id,) in cursor.fetchall():
+        refresh_recitation_stats(conn, recitation_id)
+
+
+if __name__ == "__main__":
+    # Backfill stats for a database whose timings were loaded before this table existed
+    conn = sqlite3.connect("app/database/quran.db")
+    refresh_all_recitation_stats(conn)
+    conn.close()
+    print("Recitation stats refreshed successfully!")
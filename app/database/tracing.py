@@ -0,0 +1,153 @@
+"""
+Per-request SQL tracing and slow-query log
+
+When enabled, every statement run through app.database.instrumentation is
+recorded with its duration and row count for the current request. Requests
+get a Server-Timing header, and statements slower than SLOW_QUERY_MS are
+written with their EXPLAIN QUERY PLAN to the slow-query log by a background
+thread. When disabled, the wrappers skip all of it after one attribute check.
+"""
+
+from contextvars import ContextVar
+from typing import List, Optional
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+import orjson
+
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", os.path.join("logs", "slow_queries.log"))
+
+# Statements listed individually in Server-Timing, slowest first
+SERVER_TIMING_STATEMENTS = 5
+
+
+class QueryTrace:
+    """Statements of one request: entries are [db_path, sql, params, seconds, rows]"""
+
+    __slots__ = ("path", "entries")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: List[list] = []
+
+
+class QueryTracer:
+    def __init__(self):
+        self.enabled = os.getenv("QUERY_TRACE", "0") == "1"
+        self.slow_ms = float(os.getenv("SLOW_QUERY_MS", "100"))
+        self.log_path = SLOW_QUERY_LOG
+        self._queue: Optional[queue.Queue] = None
+        self._lock = threading.Lock()
+
+    def toggle(self):
+        """Flip tracing on or off; safe to call from a signal handler"""
+        self.enabled = not self.enabled
+        print(f"Query tracing {'enabled' if self.enabled else 'disabled'}")
+
+    def start_statement(self, db_path: str, sql: str, params, seconds: float) -> Optional[list]:
+        """Record an executed statement; returns the entry fetches add to"""
+        trace = _request_trace.get()
+        if trace is None:
+            return None
+        entry = [db_path, sql, params, seconds, 0]
+        trace.entries.append(entry)
+        return entry
+
+    def finish_request(self, trace: QueryTrace):
+        """Queue the request's slow statements for the slow-query log"""
+        threshold = self.slow_ms / 1000
+        slow = [entry for entry in trace.entries if entry[3] >= threshold]
+        if slow:
+            self._writer_queue().put((time.time(), trace.path, slow))
+
+    def _writer_queue(self) -> queue.Queue:
+        if self._queue is None:
+            with self._lock:
+                if self._queue is None:
+                    self._queue = queue.Queue()
+                    threading.Thread(target=self._write_slow_queries, daemon=True).start()
+        return self._queue
+
+    def _write_slow_queries(self):
+        while True:
+            logged_at, path, entries = self._queue.get()
+            try:
+                os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+                with open(self.log_path, "ab") as log:
+                    for db_path, sql, params, seconds, rows in entries:
+                        log.write(orjson.dumps({
+                            "at": logged_at,
+                            "path": path,
+                            "db": db_path,
+                            "ms": round(seconds * 1000, 2),
+                            "rows": rows,
+                            "sql": " ".join(sql.split()),
+                            "params": list(params) if params else [],
+                            "plan": explain(db_path, sql, params)
+                        }, default=str) + b"\n")
+            except Exception as e:
+                print(f"Slow-query log write failed: {e}")
+
+
+def explain(db_path: str, sql: str, params) -> List[str]:
+    """EXPLAIN QUERY PLAN details for a statement, on a fresh read-only connection"""
+    try:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params or ()).fetchall()
+            return [row[-1] for row in rows]
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        return [f"unavailable: {e}"]
+
+
+def server_timing(trace: QueryTrace, elapsed: float) -> str:
+    """Server-Timing header value: DB total, app time so far and the slowest statements"""
+    db_seconds = sum(entry[3] for entry in trace.entries)
+    metrics = [
+        f'db;dur={db_seconds * 1000:.2f};desc="{len(trace.entries)} statements"',
+        f"app;dur={max(elapsed - db_seconds, 0) * 1000:.2f}"
+    ]
+    slowest = sorted(trace.entries, key=lambda entry: entry[3], reverse=True)
+    for index, entry in enumerate(slowest[:SERVER_TIMING_STATEMENTS], start=1):
+        statement = " ".join(entry[1].split())[:60].replace('"', "'")
+        metrics.append(f'sql{index};dur={entry[3] * 1000:.2f};desc="{statement} ({entry[4]} rows)"')
+    return ", ".join(metrics)
+
+
+class QueryTraceMiddleware:
+    """ASGI middleware collecting a QueryTrace per request while tracing is on"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        trace = QueryTrace(scope["path"])
+        token = _request_trace.set(trace)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(trace, time.perf_counter() - started).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_trace.reset(token)
+            tracer.finish_request(trace)
+
+
+_request_trace: ContextVar[Optional[QueryTrace]] = ContextVar("request_trace", default=None)
+
+tracer = QueryTracer()
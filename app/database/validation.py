@@ -0,0 +1,178 @@
+"""
+Consistency checks for a built QUL database
+
+Each table is read once in bulk into flat arrays and checked with linear
+passes, so the full Mushaf validates in well under a second.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional
+import os
+import sqlite3
+import time
+
+FONTS_DIR = os.path.join("static", "fonts")
+
+# Stop listing individual problems of one kind after this many
+MAX_ISSUES_PER_CHECK = 20
+
+
+class ValidationReport:
+    """Problems found by validate_qul_database()"""
+
+    def __init__(self):
+        self.errors: List[str] = []
+        self.warnings: List[str] = []
+        self.counts: Dict[str, int] = {}
+        self.elapsed_ms = 0.0
+
+    def fail(self, check: str, message: str):
+        count = self.counts.get(check, 0) + 1
+        self.counts[check] = count
+        if count <= MAX_ISSUES_PER_CHECK:
+            self.errors.append(f"[{check}] {message}")
+
+    @property
+    def ok(self) -> bool:
+        return not self.counts
+
+    def summary(self) -> str:
+        if self.ok:
+            return f"all checks passed in {self.elapsed_ms:.0f} ms"
+        totals = ", ".join(f"{check}: {count}" for check, count in sorted(self.counts.items()))
+        return f"{sum(self.counts.values())} problems ({totals}) in {self.elapsed_ms:.0f} ms"
+
+
+def _column(cursor: sqlite3.Cursor, sql: str, typecode: str = "q") -> array:
+    cursor.execute(sql)
+    return array(typecode, (row[0] if row[0] is not None else 0 for row in cursor))
+
+
+def validate_qul_database(db_path: str, fonts_dir: Optional[str] = FONTS_DIR) -> ValidationReport:
+    """
+    Check that a QUL database renders correctly
+
+    - ayah lines have word ranges that are ordered, contiguous and non-overlapping
+    - every word belongs to exactly one line and every line word exists
+    - each page numbers its lines 1..n and pages run 1..N
+    - surah name lines point at existing chapters
+    - each surah has as many ayahs as chapters.verses_count, numbered 1..n
+    - every page has its p{n}.woff font (skipped when fonts_dir is None, and
+      with a warning when the directory has no per-page fonts at all)
+    """
+    report = ValidationReport()
+    started = time.perf_counter()
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        cursor = conn.cursor()
+
+        word_ids = _column(cursor, "SELECT id FROM words ORDER BY id")
+        word_surahs = _column(cursor, "SELECT surah FROM words ORDER BY id", "i")
+        word_ayahs = _column(cursor, "SELECT ayah FROM words ORDER BY id", "i")
+
+        cursor.execute("""
+            SELECT page_number, line_number, line_type, first_word_id, last_word_id, surah_number
+            FROM pages ORDER BY page_number, line_number
+        """)
+        lines = cursor.fetchall()
+
+        cursor.execute("SELECT id, verses_count FROM chapters")
+        verses_count = dict(cursor.fetchall())
+    finally:
+        conn.close()
+
+    # Page and line numbering
+    page_numbers = sorted({line[0] for line in lines})
+    if page_numbers and page_numbers != list(range(1, page_numbers[-1] + 1)):
+        missing = sorted(set(range(1, page_numbers[-1] + 1)) - set(page_numbers))
+        report.fail("pages", f"missing pages {missing[:10]}")
+
+    expected_line = 1
+    previous_page = None
+    for page_number, line_number, line_type, first_id, last_id, surah_number in lines:
+        if page_number != previous_page:
+            expected_line = 1
+            previous_page = page_number
+        if line_number != expected_line:
+            report.fail("lines", f"page {page_number} has line {line_number}, expected {expected_line}")
+        expected_line = line_number + 1
+
+        if line_type == "surah_name" and surah_number not in verses_count:
+            report.fail("surah_names", f"page {page_number} line {line_number} names unknown surah {surah_number}")
+
+    # Word ranges of ayah lines, in reading order
+    ranges = [
+        (line[3], line[4], line[0], line[1])
+        for line in lines if line[2] == "ayah"
+    ]
+    previous_last = None
+    covered = 0
+    for first_id, last_id, page_number, line_number in ranges:
+        where = f"page {page_number} line {line_number}"
+        if not first_id or not last_id or first_id > last_id:
+            report.fail("ranges", f"{where} has invalid word range {first_id}-{last_id}")
+            continue
+        if previous_last is not None:
+            if first_id <= previous_last:
+                report.fail("ranges", f"{where} overlaps the previous line ({first_id} <= {previous_last})")
+            elif first_id != previous_last + 1:
+                report.fail("ranges", f"{where} leaves a gap after word {previous_last}")
+        previous_last = last_id
+
+        in_range = bisect_right(word_ids, last_id) - bisect_left(word_ids, first_id)
+        if in_range != last_id - first_id + 1:
+            report.fail("words", f"{where} references {last_id - first_id + 1 - in_range} missing words")
+        covered += in_range
+
+    # With non-overlapping ranges, full coverage means each word is on exactly one line
+    if covered != len(word_ids):
+        report.fail("words", f"{len(word_ids) - covered} of {len(word_ids)} words are not on exactly one line")
+
+    # Ayah numbering and counts per surah
+    ayah_counts: Dict[int, int] = {}
+    previous = (None, None)
+    for surah, ayah in zip(word_surahs, word_ayahs):
+        if (surah, ayah) == previous:
+            continue
+        if surah != previous[0]:
+            if ayah != 1:
+                report.fail("ayahs", f"surah {surah} starts at ayah {ayah}")
+        elif ayah != previous[1] + 1:
+            report.fail("ayahs", f"surah {surah} jumps from ayah {previous[1]} to {ayah}")
+        ayah_counts[surah] = ayah_counts.get(surah, 0) + 1
+        previous = (surah, ayah)
+
+    for surah, count in sorted(ayah_counts.items()):
+        if surah not in verses_count:
+            report.fail("ayahs", f"surah {surah} has words but no chapter")
+        elif verses_count[surah] != count:
+            report.fail("ayahs", f"surah {surah} has {count} ayahs, chapters says {verses_count[surah]}")
+
+    # Fonts, from one directory listing
+    if fonts_dir is not None:
+        fonts = set(os.listdir(fonts_dir)) if os.path.isdir(fonts_dir) else set()
+        if not any(name.startswith("p") and name.endswith(".woff") for name in fonts):
+            # A checkout without the per-page font set, such as this repository
+            report.warnings.append(f"no per-page fonts in {fonts_dir}, font check skipped")
+        else:
+            for page_number in page_numbers:
+                if f"p{page_number}.woff" not in fonts:
+                    report.fail("fonts", f"font p{page_number}.woff is missing")
+
+    report.elapsed_ms = (time.perf_counter() - started) * 1000
+    return report
+
+
+if __name__ == "__main__":
+    import sys
+
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "app/database/qul_complete.db"
+    report = validate_qul_database(db_path, None if "--no-fonts" in sys.argv else FONTS_DIR)
+    for error in report.errors:
+        print(f"   ❌ {error}")
+    for warning in report.warnings:
+        print(f"   ⚠️ {warning}")
+    print(("✅ " if report.ok else "❌ ") + report.summary())
+    sys.exit(0 if report.ok else 1)
@@ -0,0 +1,290 @@
+"""
+HTTP caching headers and in-process response cache
+
+An ASGI middleware that applies a Cache-Control policy per route, adds a
+strong ETag to complete (non-streamed) 200 responses and answers matching
+If-None-Match requests with 304. Headers set by a handler win over the
+policy. When HTTP_CACHE_MB is set, GET responses of cacheable routes are
+also kept in an LRU cache keyed by the data version, path, query and the
+request headers the response varies on.
+"""
+
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+import hashlib
+import os
+import time
+
+from app.metrics import CACHE_EVICTIONS, CACHE_HITS, CACHE_MISSES
+
+# Memory budget of the in-process response cache (0 disables it)
+HTTP_CACHE_MB = float(os.getenv("HTTP_CACHE_MB", "0"))
+
+# Scope keys: the middleware serving a request, and a flag on its own prefetch requests
+CACHE_SCOPE_KEY = "http_cache"
+PREFETCH_SCOPE_KEY = "http_cache.prefetch"
+
+# Request headers of a browser <link rel=preload as=fetch>, which prefetches stand in for
+PRELOAD_REQUEST_HEADERS = [(b"accept", b"*/*")]
+
+# Headers a 304 repeats from the full response
+NOT_MODIFIED_HEADERS = (b"cache-control", b"etag", b"vary", b"expires", b"content-location")
+
+
+class CachePolicy(NamedTuple):
+    cache_control: str
+    etag: bool = True
+    # Seconds a response may be served from the in-process cache (0 never)
+    shared_ttl: float = 0
+
+
+DATA = CachePolicy("public, max-age=3600, stale-while-revalidate=86400", shared_ttl=3600)
+SEARCH = CachePolicy("public, max-age=60", shared_ttl=60)
+REVALIDATE = CachePolicy("no-cache")
+NO_STORE = CachePolicy("no-store", etag=False)
+
+# Request paths map to policies, first match wins; unlisted paths are left alone
+CACHE_POLICIES: Tuple[Tuple[str, CachePolicy], ...] = (
+    ("/api/v1/qul/qul/search", SEARCH),
+    ("/api/v1/qul/qul/changes", REVALIDATE),
+    ("/api/v1/qul/qul/version", REVALIDATE),
+    ("/api/v1/qul/", DATA),
+    ("/api/v1/mushaf/", DATA),
+    ("/api/v1/search", SEARCH),
+    ("/api/v1/audio/", DATA),
+    ("/api/v1/fonts/", DATA),
+    ("/api/v1/offline/manifest", REVALIDATE),
+    ("/api/v1/offline/changes", REVALIDATE),
+    ("/api/v1/health", NO_STORE),
+    ("/metrics", NO_STORE),
+)
+
+
+def policy_for(path: str) -> Optional[CachePolicy]:
+    for prefix, policy in CACHE_POLICIES:
+        if path.startswith(prefix):
+            return policy
+    return None
+
+
+def make_etag(body: bytes) -> bytes:
+    return b'"' + hashlib.blake2b(body, digest_size=12).hexdigest().encode() + b'"'
+
+
+def etag_matches(if_none_match: bytes, etag: bytes) -> bool:
+    """If-None-Match comparison; weak validators match their strong form"""
+    for candidate in if_none_match.split(b","):
+        candidate = candidate.strip()
+        if candidate == b"*" or candidate.removeprefix(b"W/") == etag:
+            return True
+    return False
+
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+class _Entry(NamedTuple):
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+    etag: Optional[bytes]
+    expires: float
+
+
+class ResponseCache:
+    """LRU of complete 200 responses within a byte budget, for one data version at a time"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._version = None
+        self._entries: "OrderedDict[tuple, _Entry]" = OrderedDict()
+        # Request header names each path varies on, learned from its responses,
+        # and the number of entries holding each path alive
+        self._vary: Dict[str, Tuple[bytes, ...]] = {}
+        self._path_entries: Dict[str, int] = {}
+
+    def _key(self, base: tuple, request_headers: Dict[bytes, bytes]) -> tuple:
+        return base + tuple(request_headers.get(name, b"") for name in self._vary.get(base[1], ()))
+
+    def _check_version(self, version):
+        # Entries of an older data version can never be served again
+        if version != self._version:
+            if self._entries:
+                CACHE_EVICTIONS.labels("http_response").inc(len(self._entries))
+            self._version = version
+            self._entries.clear()
+            self._vary.clear()
+            self._path_entries.clear()
+            self.size = 0
+
+    def contains(self, base: tuple, request_headers: Dict[bytes, bytes]) -> bool:
+        """True when a fresh entry exists, without counting a hit or miss"""
+        if base[0] != self._version:
+            return False
+        entry = self._entries.get(self._key(base, request_headers))
+        return entry is not None and entry.expires >= time.monotonic()
+
+    def get(self, base: tuple, request_headers: Dict[bytes, bytes]) -> Optional[_Entry]:
+        self._check_version(base[0])
+        key = self._key(base, request_headers)
+        entry = self._entries.get(key)
+        if entry is None or entry.expires < time.monotonic():
+            if entry is not None:
+                self._remove(key)
+            CACHE_MISSES.labels("http_response").inc()
+            return None
+        self._entries.move_to_end(key)
+        CACHE_HITS.labels("http_response").inc()
+        return entry
+
+    def put(self, base: tuple, request_headers: Dict[bytes, bytes], entry: _Entry):
+        if len(entry.body) > self.max_bytes // 8:
+            return
+        self._check_version(base[0])
+        path = base[1]
+        vary = _header(entry.headers, b"vary") or b""
+        vary_names = tuple(sorted(
+            name.strip().lower() for name in vary.split(b",") if name.strip() and name.strip() != b"*"
+        ))
+        if self._vary.get(path, vary_names) != vary_names:
+            # The route changed what it varies on; earlier keys no longer line up
+            for stale in [key for key in self._entries if key[1] == path]:
+                self._remove(stale)
+        self._vary[path] = vary_names
+        key = self._key(base, request_headers)
+        if key in self._entries:
+            self._remove(key)
+            self._vary[path] = vary_names
+        self._entries[key] = entry
+        self._path_entries[path] = self._path_entries.get(path, 0) + 1
+        self.size += len(entry.body)
+        while self.size > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            CACHE_EVICTIONS.labels("http_response").inc()
+
+    def _remove(self, key: tuple):
+        self.size -= len(self._entries.pop(key).body)
+        path = key[1]
+        remaining = self._path_entries[path] - 1
+        if remaining:
+            self._path_entries[path] = remaining
+        else:
+            del self._path_entries[path]
+            self._vary.pop(path, None)
+
+
+class HttpCacheMiddleware:
+    """ASGI middleware applying CACHE_POLICIES; `version` names the data being served"""
+
+    def __init__(self, app, version: Callable[[], object] = lambda: 0):
+        self.app = app
+        self.version = version
+        self.cache = ResponseCache(int(HTTP_CACHE_MB * 1024 * 1024)) if HTTP_CACHE_MB > 0 else None
+
+    async def __call__(self, scope, receive, send):
+        if self.cache is not None and scope["type"] == "http":
+            # Lets handlers prefetch responses into this cache
+            scope[CACHE_SCOPE_KEY] = self
+        method = scope.get("method")
+        policy = policy_for(scope["path"]) if scope["type"] == "http" and method in ("GET", "HEAD") else None
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = dict(scope["headers"])
+        if_none_match = request_headers.get(b"if-none-match")
+
+        shared = self.cache is not None and policy.shared_ttl > 0 and method == "GET"
+        base = (self.version(), scope["path"], scope.get("query_string", b"")) if shared else None
+        if shared:
+            entry = self.cache.get(base, request_headers)
+            if entry is not None:
+                await self._send(send, entry.headers, entry.body, entry.etag, if_none_match)
+                return
+
+        start = None
+
+        async def send_wrapper(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                # Held back until the body shows whether it is complete
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+
+            headers = list(start.get("headers", []))
+            status = start["status"]
+            if status == 200 and _header(headers, b"cache-control") is None:
+                headers.append((b"cache-control", policy.cache_control.encode()))
+
+            complete = not message.get("more_body", False)
+            if status != 200 or not complete or method == "HEAD" or not policy.etag:
+                await send({**start, "headers": headers})
+                start = None
+                await send(message)
+                return
+            start = None
+
+            body = message.get("body", b"")
+            etag = _header(headers, b"etag")
+            if etag is None:
+                etag = make_etag(body)
+                headers.append((b"etag", etag))
+            await self._send(send, headers, body, etag, if_none_match)
+
+            cache_control = _header(headers, b"cache-control") or b""
+            if shared and b"no-store" not in cache_control and b"private" not in cache_control \
+                    and _header(headers, b"set-cookie") is None:
+                self.cache.put(base, request_headers, _Entry(headers, body, etag, time.monotonic() + policy.shared_ttl))
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def prefetch(self, path: str, headers: List[Tuple[bytes, bytes]] = PRELOAD_REQUEST_HEADERS):
+        """Fill the cache with the response to a GET of `path` sent with `headers`, if not cached yet"""
+        policy = policy_for(path)
+        if policy is None or policy.shared_ttl <= 0:
+            return
+        if self.cache.contains((self.version(), path, b""), dict(headers)):
+            return
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": list(headers),
+            "client": None,
+            "server": None,
+            PREFETCH_SCOPE_KEY: True,
+        }
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def discard(message):
+            pass
+
+        await self(scope, receive, discard)
+
+    async def _send(self, send, headers, body: bytes, etag: Optional[bytes], if_none_match: Optional[bytes]):
+        if etag is not None and if_none_match is not None and etag_matches(if_none_match, etag):
+            await send({
+                "type": "http.response.start",
+                "status": 304,
+                "headers": [(key, value) for key, value in headers if key.lower() in NOT_MODIFIED_HEADERS]
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,319 @@
+"""
+Prometheus metrics
+
+Every metric and label set is registered up front, so recording a sample
+only bumps numbers on a pre-built child. `/metrics` renders the text
+exposition format on demand.
+"""
+
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import threading
+import time
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# Request paths are grouped into a fixed set of routes, first match wins
+ROUTE_PREFIXES = (
+    ("/api/v1/qul/qul/page/", "qul_page"),
+    ("/api/v1/qul/qul/search", "qul_search"),
+    ("/api/v1/qul/", "qul"),
+    ("/api/v1/mushaf/", "mushaf"),
+    ("/api/v1/search", "search"),
+    ("/api/v1/audio/", "audio"),
+    ("/api/v1/fonts/", "fonts"),
+    ("/static/fonts/", "fonts"),
+    ("/static/", "static"),
+    ("/api/v1/offline/", "offline"),
+    ("/api/v1/health", "health"),
+    ("/metrics", "metrics"),
+)
+ROUTES = tuple(dict.fromkeys(route for _, route in ROUTE_PREFIXES)) + ("other",)
+STATUS_CLASSES = ("2xx", "3xx", "4xx", "5xx")
+DATABASES = ("quran", "qul")
+CACHES = ("bundle", "hls_manifest", "mp3_index", "http_response", "changes")
+# Lookups behind app.singleflight
+FLIGHTS = ("mushaf_page", "search", "advanced_search", "qul_search", "surah_timings", "ayah_timings")
+
+
+class _Child:
+    __slots__ = ("_lock",)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+
+class _CounterChild(_Child):
+    __slots__ = ("value",)
+
+    def __init__(self):
+        super().__init__()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild(_Child):
+    __slots__ = ("value",)
+
+    def __init__(self):
+        super().__init__()
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+
+class _HistogramChild(_Child):
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: Sequence[float]):
+        super().__init__()
+        self.buckets = buckets
+        # One slot per bucket plus +Inf; cumulated only when rendering
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], _Child] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _new_child(self) -> _Child:
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def preregister(self, *label_values: Sequence[str]):
+        """Create children for every combination of the given label values"""
+        combinations = [()]
+        for values in label_values:
+            combinations = [combo + (value,) for combo in combinations for value in values]
+        for combo in combinations:
+            self.labels(*combo)
+        return self
+
+    def _label_text(self, values: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{value}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values, child) -> List[str]:
+        return [f"{self.name}{self._label_text(values)} {_number(child.value)}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, help, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def _render_child(self, values, child) -> List[str]:
+        with child._lock:
+            counts = list(child.counts)
+            total = child.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else _number(bound)
+            labels = self._label_text(values, f'le="{le}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        lines.append(f"{self.name}_sum{self._label_text(values)} {_number(total)}")
+        lines.append(f"{self.name}_count{self._label_text(values)} {cumulative}")
+        return lines
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+REGISTRY: List[Metric] = []
+_refresh_hooks: List[Callable[[], None]] = []
+
+
+def add_refresh_hook(hook: Callable[[], None]):
+    """Run `hook` before every scrape, for values read from elsewhere"""
+    _refresh_hooks.append(hook)
+
+
+def render_metrics() -> str:
+    for hook in _refresh_hooks:
+        try:
+            hook()
+        except Exception:
+            pass
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# HTTP
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time from request start to the last response byte",
+    ("route", "status")
+).preregister(ROUTES, STATUS_CLASSES)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "Response body size", ("route",), SIZE_BUCKETS
+).preregister(ROUTES)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requests currently being served"
+).preregister()
+
+# Database
+DB_QUERIES = Counter(
+    "db_queries_total", "SQL statements executed", ("db",)
+).preregister(DATABASES)
+DB_STATEMENT_DURATION = Histogram(
+    "db_statement_duration_seconds", "Time to execute a statement, excluding row fetches", ("db",)
+).preregister(DATABASES)
+DB_FETCH_SECONDS = Counter(
+    "db_fetch_seconds_total", "Time spent fetching result rows", ("db",)
+).preregister(DATABASES)
+DB_CONNECT_DURATION = Histogram(
+    "db_connect_duration_seconds", "Time to open a database connection (there is no pool)", ("db",)
+).preregister(DATABASES)
+DB_REJECTED = Counter(
+    "db_rejected_total", "Calls shed because too many were waiting, or abandoned at their deadline",
+    ("db", "reason")
+).preregister(DATABASES, ("overloaded", "timeout"))
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "SQL statements executed per request", ("route",), COUNT_BUCKETS
+).preregister(ROUTES)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Database time per request", ("route",)
+).preregister(ROUTES)
+
+# Application state
+QUL_STORE_GENERATION = Gauge(
+    "qul_store_generation", "QUL database builds loaded since startup"
+).preregister()
+CACHES_WARM = Gauge(
+    "caches_warm", "1 once startup cache warming has finished"
+).preregister()
+
+# Caches
+CACHE_HITS = Counter("cache_hits_total", "Cache hits", ("cache",)).preregister(CACHES)
+CACHE_MISSES = Counter("cache_misses_total", "Cache misses", ("cache",)).preregister(CACHES)
+CACHE_EVICTIONS = Counter("cache_evictions_total", "Cache entries evicted", ("cache",)).preregister(CACHES)
+
+# Request coalescing
+SINGLEFLIGHT_CALLS = Counter(
+    "singleflight_calls_total",
+    "Coalesced lookups: leaders ran the work, followers shared a result already in flight",
+    ("flight", "role")
+).preregister(FLIGHTS, ("leader", "follower"))
+
+# Database time of the current request: [statements, seconds]
+_request_db: ContextVar[Optional[list]] = ContextVar("request_db", default=None)
+
+
+def record_statement(db: str, seconds: float):
+    DB_QUERIES.labels(db).inc()
+    DB_STATEMENT_DURATION.labels(db).observe(seconds)
+    usage = _request_db.get()
+    if usage is not None:
+        usage[0] += 1
+        usage[1] += seconds
+
+
+def record_fetch(db: str, seconds: float):
+    DB_FETCH_SECONDS.labels(db).inc(seconds)
+    usage = _request_db.get()
+    if usage is not None:
+        usage[1] += seconds
+
+
+def route_of(path: str) -> str:
+    for prefix, route in ROUTE_PREFIXES:
+        if path.startswith(prefix):
+            return route
+    return "other"
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request, including streamed bodies"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = route_of(scope["path"])
+        started = time.perf_counter()
+        usage = [0, 0.0]
+        token = _request_db.set(usage)
+        in_flight = REQUESTS_IN_FLIGHT.labels()
+        in_flight.value += 1
+        state = {"status": 500, "size": 0}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                state["size"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.value -= 1
+            _request_db.reset(token)
+            status = f"{min(max(state['status'] // 100, 2), 5)}xx"
+            REQUEST_DURATION.labels(route, status).observe(time.perf_counter() - started)
+            RESPONSE_SIZE.labels(route).observe(state["size"])
+            REQUEST_DB_QUERIES.labels(route).observe(usage[0])
+            REQUEST_DB_SECONDS.labels(route).observe(usage[1])
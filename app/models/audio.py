@@ -0,0 +1,95 @@
+"""
+Pydantic models describing audio responses (used for OpenAPI)
+"""
+
+from pydantic import BaseModel
+from typing import List, Optional
+
+class Recitation(BaseModel):
+    id: int
+    reciter_name: str
+    style: str
+
+class RecitationsResponse(BaseModel):
+    recitations: List[Recitation]
+
+class WordAudioTiming(BaseModel):
+    word_id: int
+    recitation_id: int
+    start_time: int
+    end_time: int
+    duration: int
+    audio_url: str
+
+class WordTiming(BaseModel):
+    word_id: int
+    start_time: float
+    end_time: float
+
+class AyahAudioTiming(BaseModel):
+    surah: int
+    ayah: int
+    recitation_id: int
+    audio_url: str
+    word_timings: List[WordTiming]
+
+class SurahTimingWord(BaseModel):
+    word_id: int
+    position: int
+    text: str
+    start_time: int
+    end_time: int
+    duration: int
+    audio_url: str
+
+class SurahTimingAyah(BaseModel):
+    ayah_number: int
+    words: List[SurahTimingWord]
+
+class SurahTimingsResponse(BaseModel):
+    surah_number: int
+    recitation_id: int
+    total_ayahs: int
+    ayahs: List[SurahTimingAyah]
+
+class PlaylistAyah(BaseModel):
+    ayah_number: int
+    audio_url: str
+    offset_ms: float
+    duration_ms: float
+    word_timings: List[WordTiming]
+
+class SurahPlaylist(BaseModel):
+    surah_number: int
+    recitation_id: int
+    stream_url: str
+    total_duration_ms: float
+    total_bytes: int
+    ayahs: List[PlaylistAyah]
+
+class RecitationStatistics(BaseModel):
+    total_words: int
+    total_duration_ms: int
+    average_word_duration_ms: float
+    min_word_duration_ms: int
+    max_word_duration_ms: int
+    surahs_covered: int
+    ayahs_covered: int
+
+class AyahStatistics(RecitationStatistics):
+    ayah_number: int
+
+class SurahStatistics(BaseModel):
+    surah_number: int
+    statistics: Optional[RecitationStatistics] = None
+    ayahs: List[AyahStatistics]
+
+class RecitationStatsResponse(BaseModel):
+    recitation_id: int
+    reciter_name: str
+    style: str
+    statistics: RecitationStatistics
+    surah: Optional[SurahStatistics] = None
+
+class AllRecitationStatsResponse(BaseModel):
+    recitations: List[RecitationStatsResponse]
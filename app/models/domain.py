@@ -0,0 +1,216 @@
+"""
+Lightweight domain records for read paths
+
+These are plain slotted classes rather than Pydantic models: they are built
+from trusted database rows, so they skip validation and serialize straight to
+the dict shapes the API returns.
+"""
+
+from typing import List, Optional, Tuple
+
+BASMALLAH_TEXT = "بِسۡمِ ٱللَّهِ ٱلرَّحۡمَٰنِ ٱلرَّحِيمِ"
+
+# Version of the compact page layout produced by Page.to_compact()
+COMPACT_PAGE_VERSION = 1
+
+# Small-int codes for line types in the compact page layout
+LINE_TYPE_CODES = {"ayah": 0, "surah_name": 1, "basmallah": 2}
+LINE_TYPES = {code: line_type for line_type, code in LINE_TYPE_CODES.items()}
+
+
+class Word:
+    __slots__ = ("id", "text", "surah", "ayah", "position", "translation", "transliteration")
+
+    def __init__(self, id: int, text: str, surah: int, ayah: int,
+                 position: Optional[Tuple[int, int, int, int]] = None,
+                 translation: Optional[str] = None,
+                 transliteration: Optional[str] = None):
+        self.id = id
+        self.text = text
+        self.surah = surah
+        self.ayah = ayah
+        self.position = position
+        self.translation = translation
+        self.transliteration = transliteration
+
+    def to_ref(self) -> dict:
+        """Compact {word_id, text} form used by QUL lines and ayahs"""
+        return {"word_id": self.id, "text": self.text}
+
+    def to_dict(self) -> dict:
+        """Full form used by the positioned Mushaf layout"""
+        x, y, width, height = self.position or (0, 0, 0, 0)
+        return {
+            "id": self.id,
+            "text": self.text,
+            "surah": self.surah,
+            "ayah": self.ayah,
+            "position": {"x": x, "y": y, "width": width, "height": height},
+            "translation": self.translation,
+            "transliteration": self.transliteration
+        }
+
+
+class Line:
+    __slots__ = ("line_number", "line_type", "is_centered", "first_word_id",
+                 "last_word_id", "surah_number", "words", "content")
+
+    def __init__(self, line_number: int, line_type: str, is_centered: bool,
+                 first_word_id: Optional[int], last_word_id: Optional[int],
+                 surah_number: Optional[int], words: Tuple[Word, ...] = (),
+                 content: str = ""):
+        self.line_number = line_number
+        self.line_type = line_type
+        self.is_centered = is_centered
+        self.first_word_id = first_word_id
+        self.last_word_id = last_word_id
+        self.surah_number = surah_number
+        self.words = words
+        self.content = content
+
+    def to_dict(self) -> dict:
+        if self.line_type == "ayah":
+            words = [word.to_ref() for word in self.words]
+        elif self.content:
+            # Surah name and basmallah lines render as a single pseudo-word
+            words = [{"word_id": 0, "text": self.content}]
+        else:
+            words = []
+
+        return {
+            "line_number": self.line_number,
+            "line_type": self.line_type,
+            "is_centered": self.is_centered,
+            "words": words,
+            "content": self.content,
+            "first_word_id": self.first_word_id,
+            "last_word_id": self.last_word_id,
+            "surah_number": self.surah_number
+        }
+
+
+class Page:
+    __slots__ = ("page_number", "lines")
+
+    def __init__(self, page_number: int, lines: List[Line]):
+        self.page_number = page_number
+        self.lines = lines
+
+    @property
+    def font_file(self) -> str:
+        return f"p{self.page_number}.woff"
+
+    def to_compact(self) -> dict:
+        """
+        Compact form for binary encodings
+
+        {"v": version, "p": page_number,
+         "l": [[line_number, type_code, is_centered, surah_number, word_count, content], ...],
+         "i": word id deltas (first id absolute), "t": word texts}
+
+        Words of all ayah lines are flattened into "i" and "t" in line order;
+        each line takes the next `word_count` of them. Ayah line content is the
+        space-joined texts, so it is only sent for surah name and basmallah
+        lines. Missing surah numbers are sent as 0.
+        """
+        lines = []
+        ids = []
+        texts = []
+        previous_id = 0
+        for line in self.lines:
+            is_ayah = line.line_type == "ayah"
+            lines.append([
+                line.line_number,
+                LINE_TYPE_CODES.get(line.line_type, 0),
+                1 if line.is_centered else 0,
+                line.surah_number or 0,
+                len(line.words) if is_ayah else 0,
+                None if is_ayah else line.content
+            ])
+            if is_ayah:
+                for word in line.words:
+                    ids.append(word.id - previous_id)
+                    texts.append(word.text)
+                    previous_id = word.id
+
+        return {"v": COMPACT_PAGE_VERSION, "p": self.page_number, "l": lines, "i": ids, "t": texts}
+
+    def to_dict(self) -> dict:
+        return {
+            "page_number": self.page_number,
+            "total_lines": len(self.lines),
+            "lines": [line.to_dict() for line in self.lines],
+            "font_file": self.font_file,
+            "font_path": f"/static/fonts/{self.font_file}"
+        }
+
+
+class Ayah:
+    __slots__ = ("surah_number", "ayah_number", "words", "page_number")
+
+    def __init__(self, surah_number: int, ayah_number: int,
+                 words: Tuple[Word, ...], page_number: Optional[int]):
+        self.surah_number = surah_number
+        self.ayah_number = ayah_number
+        self.words = words
+        self.page_number = page_number
+
+    @property
+    def text(self) -> str:
+        return " ".join(word.text for word in self.words)
+
+    def to_dict(self, chapter: Optional["Chapter"] = None) -> dict:
+        return {
+            "surah_number": self.surah_number,
+            "ayah_number": self.ayah_number,
+            "text": self.text,
+            "words": [word.to_ref() for word in self.words],
+            "page_number": self.page_number,
+            "surah_name": chapter.name_simple if chapter else None,
+            "surah_arabic": chapter.name_arabic if chapter else None
+        }
+
+
+class Chapter:
+    __slots__ = ("id", "name_simple", "name_arabic", "verses_count")
+
+    def __init__(self, id: int, name_simple: str, name_arabic: str, verses_count: int):
+        self.id = id
+        self.name_simple = name_simple
+        self.name_arabic = name_arabic
+        self.verses_count = verses_count
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "name_simple": self.name_simple,
+            "name_arabic": self.name_arabic,
+            "verses_count": self.verses_count
+        }
+
+
+def expand_compact_page(data: dict) -> dict:
+    """Rebuild the JSON page shape from Page.to_compact() output"""
+    lines = []
+    word_id = 0
+    cursor = 0
+    for line_number, type_code, is_centered, surah_number, word_count, content in data["l"]:
+        line_type = LINE_TYPES.get(type_code, "ayah")
+        words = []
+        for delta, text in zip(data["i"][cursor:cursor + word_count],
+                               data["t"][cursor:cursor + word_count]):
+            word_id += delta
+            words.append(Word(word_id, text, 0, 0))
+        cursor += word_count
+
+        line = Line(
+            line_number, line_type, bool(is_centered),
+            words[0].id if words else None,
+            words[-1].id if words else None,
+            surah_number or None,
+            tuple(words),
+            " ".join(word.text for word in words) if line_type == "ayah" else (content or "")
+        )
+        lines.append(line)
+
+    return Page(data["p"], lines).to_dict()
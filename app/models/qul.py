@@ -0,0 +1,78 @@
+"""
+Pydantic models describing QUL Mushaf responses (used for OpenAPI)
+"""
+
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+
+class QulLayout(BaseModel):
+    name: str
+    number_of_pages: int
+    lines_per_page: int
+    font_name: str
+
+class QulLayoutsResponse(BaseModel):
+    layouts: List[QulLayout]
+
+class QulWordRef(BaseModel):
+    word_id: int
+    text: str
+
+class QulLine(BaseModel):
+    line_number: int
+    line_type: str
+    is_centered: bool
+    words: List[QulWordRef]
+    content: str
+    first_word_id: Optional[int] = None
+    last_word_id: Optional[int] = None
+    surah_number: Optional[int] = None
+
+class QulPage(BaseModel):
+    page_number: int
+    total_lines: int
+    lines: List[QulLine]
+    font_file: str
+    font_path: str
+
+class QulSurah(BaseModel):
+    id: int
+    name_simple: str
+    name_arabic: str
+    verses_count: Optional[int] = None
+
+class QulSurahNamesResponse(BaseModel):
+    surah_names: Dict[int, str]
+    surahs: List[QulSurah]
+
+class QulSearchResult(BaseModel):
+    word_id: int
+    word_key: str
+    surah: int
+    ayah: int
+    text: str
+    surah_name: str
+    surah_arabic: str
+    page: Optional[int] = None
+
+class QulSearchResponse(BaseModel):
+    results: List[QulSearchResult]
+    total_found: int
+    query: str
+
+class QulAyah(BaseModel):
+    surah_number: int
+    ayah_number: int
+    text: str
+    words: List[QulWordRef]
+    page_number: Optional[int] = None
+    surah_name: Optional[str] = None
+    surah_arabic: Optional[str] = None
+
+class QulStats(BaseModel):
+    total_words: int
+    total_pages: int
+    total_surahs: int
+    total_ayahs: Optional[int] = None
+    layout_name: str
+    font_system: str
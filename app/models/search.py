@@ -0,0 +1,37 @@
+"""
+Pydantic models describing search responses (used for OpenAPI)
+"""
+
+from pydantic import BaseModel
+from typing import List, Optional
+
+class SearchResult(BaseModel):
+    word_id: int
+    surah: int
+    ayah: int
+    text: str
+    translation: Optional[str] = None
+    transliteration: Optional[str] = None
+    page: Optional[int] = None
+    line: Optional[int] = None
+
+class SearchResponse(BaseModel):
+    query: str
+    results_count: int
+    results: List[SearchResult]
+
+class SuggestionsResponse(BaseModel):
+    query: str
+    suggestions: List[str]
+
+class SearchFilters(BaseModel):
+    arabic: Optional[str] = None
+    translation: Optional[str] = None
+    transliteration: Optional[str] = None
+    surah: Optional[int] = None
+    ayah: Optional[int] = None
+
+class AdvancedSearchResponse(BaseModel):
+    filters: SearchFilters
+    results_count: int
+    results: List[SearchResult]
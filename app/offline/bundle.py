@@ -0,0 +1,158 @@
+"""
+Offline bundle export
+
+A bundle is a zip of every piece of static Mushaf data plus a manifest of
+per-part SHA-256 hashes. Clients download the bundle once, then compare
+manifests to fetch only the parts that changed.
+"""
+
+from typing import Dict, Iterator, Optional, Tuple
+import hashlib
+import os
+import threading
+import zipfile
+
+import orjson
+
+from app.database.qul_store import QulStore
+from app.metrics import CACHE_EVICTIONS, CACHE_HITS, CACHE_MISSES
+
+BUNDLE_DIR = os.path.join("cache", "bundles")
+FONTS_DIR = os.path.join("static", "fonts")
+
+# Bump when the layout of parts inside the bundle changes
+BUNDLE_FORMAT = 1
+
+# Fixed timestamp so identical data always produces an identical zip
+ZIP_DATE_TIME = (2000, 1, 1, 0, 0, 0)
+
+
+def encode_part(data) -> bytes:
+    """Deterministic JSON encoding so unchanged data hashes the same"""
+    return orjson.dumps(data, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+
+
+def iter_data_parts(store: QulStore) -> Iterator[Tuple[str, bytes]]:
+    """Yield (part name, bytes) for layouts, chapters, pages and words"""
+    yield "layouts.json", encode_part(store.layouts)
+    yield "chapters.json", encode_part([chapter.to_dict() for chapter in store.chapters.values()])
+
+    for page_number in sorted(store.pages):
+        yield f"pages/{page_number:03d}.json", encode_part(store.pages[page_number].to_dict())
+
+    # Words grouped per surah as [word_id, ayah, text] rows
+    surah_words: Dict[int, list] = {}
+    for word in store.words:
+        surah_words.setdefault(word.surah, []).append([word.id, word.ayah, word.text])
+    for surah_number in sorted(surah_words):
+        yield f"words/{surah_number:03d}.json", encode_part(
+            {"surah": surah_number, "words": surah_words[surah_number]}
+        )
+
+
+def iter_font_parts(fonts_dir: str = FONTS_DIR) -> Iterator[Tuple[str, bytes]]:
+    """Yield (part name, bytes) for every page-specific font"""
+    if not os.path.isdir(fonts_dir):
+        return
+    for name in sorted(os.listdir(fonts_dir)):
+        if name.startswith("p") and name.endswith(".woff"):
+            with open(os.path.join(fonts_dir, name), "rb") as f:
+                yield f"fonts/{name}", f.read()
+
+
+def version_of(parts: Dict[str, dict], salt: str = "") -> str:
+    """Version string derived from the hashes of all parts"""
+    digest = hashlib.sha256(salt.encode())
+    for name in sorted(parts):
+        digest.update(f"{name}:{parts[name]['sha256']};".encode())
+    return digest.hexdigest()[:16]
+
+
+def build_bundle(store: QulStore, include_fonts: bool = False,
+                 output_dir: str = BUNDLE_DIR) -> dict:
+    """
+    Write a versioned bundle zip and return its manifest
+
+    The version is a hash of every part hash, so it only changes when some
+    part's content changes. `build_version` is the version of the whole build,
+    fonts included, as accepted by `/qul/changes?since=`.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    tmp_path = os.path.join(output_dir, f".bundle-{os.getpid()}-{threading.get_ident()}.tmp")
+
+    parts = {}
+    with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=9) as bundle:
+        sources = [iter_data_parts(store)]
+        if include_fonts:
+            sources.append(iter_font_parts())
+
+        for source in sources:
+            for name, data in source:
+                parts[name] = {"sha256": hashlib.sha256(data).hexdigest(), "size": len(data)}
+                info = zipfile.ZipInfo(name, date_time=ZIP_DATE_TIME)
+                # Fonts are already compressed
+                info.compress_type = zipfile.ZIP_STORED if name.startswith("fonts/") else zipfile.ZIP_DEFLATED
+                bundle.writestr(info, data)
+
+        version = version_of(parts, salt=str(BUNDLE_FORMAT))
+
+        # Same parts and hashing as the content store's build manifest
+        build_parts = dict(parts)
+        if not include_fonts:
+            for name, data in iter_font_parts():
+                build_parts[name] = {"sha256": hashlib.sha256(data).hexdigest()}
+
+        manifest = {
+            "format": BUNDLE_FORMAT,
+            "version": version,
+            "build_version": version_of(build_parts),
+            "includes_fonts": include_fonts,
+            "parts": parts
+        }
+        bundle.writestr(zipfile.ZipInfo("manifest.json", date_time=ZIP_DATE_TIME), encode_part(manifest))
+
+    filename = f"mushaf-{version}{'-fonts' if include_fonts else ''}.zip"
+    bundle_path = os.path.join(output_dir, filename)
+    os.replace(tmp_path, bundle_path)
+
+    manifest["bundle"] = {"filename": filename, "size": os.path.getsize(bundle_path)}
+    return manifest
+
+
+class BundleCache:
+    """Builds each bundle variant once per loaded store"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._built: Dict[Tuple[tuple, bool], dict] = {}
+
+    def get(self, store: QulStore, include_fonts: bool = False) -> dict:
+        key = (store.signature, include_fonts)
+        manifest = self._built.get(key)
+        if manifest is None:
+            with self._lock:
+                manifest = self._built.get(key)
+                if manifest is None:
+                    CACHE_MISSES.labels("bundle").inc()
+                    manifest = build_bundle(store, include_fonts)
+                    # Only the current store's bundles are worth keeping
+                    kept = {k: v for k, v in self._built.items() if k[0] == store.signature}
+                    if len(kept) < len(self._built):
+                        CACHE_EVICTIONS.labels("bundle").inc(len(self._built) - len(kept))
+                    self._built = kept
+                    self._built[key] = manifest
+                    return manifest
+        CACHE_HITS.labels("bundle").inc()
+        return manifest
+
+    def bundle_path(self, manifest: dict) -> str:
+        return os.path.join(BUNDLE_DIR, manifest["bundle"]["filename"])
+
+    def read_part(self, manifest: dict, name: str) -> Optional[bytes]:
+        if name not in manifest["parts"]:
+            return None
+        with zipfile.ZipFile(self.bundle_path(manifest)) as bundle:
+            return bundle.read(name)
+
+
+bundle_cache = BundleCache()
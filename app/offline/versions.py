@@ -0,0 +1,261 @@
+"""
+Content-addressed versions of every Mushaf part across database builds
+
+Each build records a manifest (part name -> SHA-256) and stores the part
+bytes by hash. Comparing a client's build manifest with the current one tells
+it exactly which pages, chapters or fonts changed; small edits are shipped as
+splice deltas against the bytes the client already has.
+"""
+
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Tuple
+import base64
+import hashlib
+import os
+import threading
+import zlib
+
+import orjson
+
+from app.database.qul_store import QulStore
+from app.metrics import CACHE_EVICTIONS, CACHE_HITS, CACHE_MISSES
+from app.offline.bundle import FONTS_DIR, iter_data_parts, iter_font_parts, version_of
+
+CONTENT_STORE_DIR = os.path.join("app", "database", "content_store")
+
+# A delta is only offered when it is at most this fraction of the full part
+MAX_DELTA_RATIO = 0.5
+
+# Bytes compared at once when looking for the common prefix and suffix
+COMPARE_CHUNK = 4096
+
+# Change lists kept per client version for the current build
+MAX_CACHED_CHANGES = 64
+
+
+def _object_path(sha256: str, store_dir: str) -> str:
+    return os.path.join(store_dir, "objects", sha256[:2], sha256)
+
+
+def _write_atomic(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def record_build(parts: Iterable[Tuple[str, bytes]], store_dir: str = CONTENT_STORE_DIR) -> dict:
+    """Store every part by hash and write the manifest for this build"""
+    manifest_parts = {}
+    for name, data in parts:
+        sha256 = hashlib.sha256(data).hexdigest()
+        manifest_parts[name] = {"sha256": sha256, "size": len(data)}
+        object_path = _object_path(sha256, store_dir)
+        if not os.path.exists(object_path):
+            _write_atomic(object_path, zlib.compress(data, 9))
+
+    manifest = {"version": version_of(manifest_parts), "parts": manifest_parts}
+    _write_atomic(
+        os.path.join(store_dir, "manifests", f"{manifest['version']}.json"),
+        orjson.dumps(manifest, option=orjson.OPT_SORT_KEYS)
+    )
+    _write_atomic(os.path.join(store_dir, "LATEST"), manifest["version"].encode())
+    return manifest
+
+
+def record_store_build(store: QulStore, store_dir: str = CONTENT_STORE_DIR) -> dict:
+    """Record the data and font parts of a loaded QUL store"""
+    def parts():
+        yield from iter_data_parts(store)
+        yield from iter_font_parts()
+    return record_build(parts(), store_dir)
+
+
+def load_build_manifest(version: str, store_dir: str = CONTENT_STORE_DIR) -> Optional[dict]:
+    # Versions are hex digests; anything else cannot name a manifest file
+    if not version or not all(c in "0123456789abcdef" for c in version):
+        return None
+    path = os.path.join(store_dir, "manifests", f"{version}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return orjson.loads(f.read())
+
+
+def read_object(sha256: str, store_dir: str = CONTENT_STORE_DIR) -> Optional[bytes]:
+    path = _object_path(sha256, store_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return zlib.decompress(f.read())
+
+
+def _common_prefix_length(a: bytes, b: bytes, limit: int) -> int:
+    """Length of the common prefix of a and b, at most `limit`"""
+    length = 0
+    # Whole chunks compare in C; only the chunk holding the first difference is walked
+    while length + COMPARE_CHUNK <= limit and a[length:length + COMPARE_CHUNK] == b[length:length + COMPARE_CHUNK]:
+        length += COMPARE_CHUNK
+    while length < limit and a[length] == b[length]:
+        length += 1
+    return length
+
+
+def make_delta(old: bytes, new: bytes) -> dict:
+    """
+    Splice delta: new = old[:prefix] + insert + old[len(old) - suffix:]
+
+    Cheap to compute and apply, and compact for the typical correction of a
+    few words inside an otherwise unchanged page.
+    """
+    limit = min(len(old), len(new))
+    prefix = _common_prefix_length(old, new, limit)
+    suffix = _common_prefix_length(old[::-1], new[::-1], limit - prefix)
+    return {"prefix": prefix, "suffix": suffix, "insert": new[prefix:len(new) - suffix]}
+
+
+def apply_delta(old: bytes, delta: dict) -> bytes:
+    """Inverse of make_delta(), with `insert` as bytes"""
+    return old[:delta["prefix"]] + delta["insert"] + old[len(old) - delta["suffix"]:]
+
+
+def changes_between(old: dict, new: dict, store_dir: str = CONTENT_STORE_DIR) -> dict:
+    """List parts added, changed and removed between two build manifests"""
+    changed = []
+    for name, part in sorted(new["parts"].items()):
+        previous = old["parts"].get(name)
+        if previous and previous["sha256"] == part["sha256"]:
+            continue
+
+        entry = {"part": name, "sha256": part["sha256"], "size": part["size"]}
+        if previous:
+            old_bytes = read_object(previous["sha256"], store_dir)
+            new_bytes = read_object(part["sha256"], store_dir)
+            if old_bytes is not None and new_bytes is not None:
+                delta = make_delta(old_bytes, new_bytes)
+                if len(delta["insert"]) <= len(new_bytes) * MAX_DELTA_RATIO:
+                    entry["delta"] = {
+                        "base_sha256": previous["sha256"],
+                        "prefix": delta["prefix"],
+                        "suffix": delta["suffix"],
+                        "insert": base64.b64encode(delta["insert"]).decode("ascii")
+                    }
+        changed.append(entry)
+
+    removed = sorted(name for name in old["parts"] if name not in new["parts"])
+    return {"changed": changed, "removed": removed}
+
+
+class FontHashes:
+    """
+    Short content hashes naming page fonts in versioned font URLs
+
+    Hashes are taken from the bytes on disk by refresh(), which runs as a
+    store warmer on every build load (the reload watcher and SIGHUP included)
+    and in the warm-up, and are only looked up while serving. A font replaced
+    without a database rebuild gets a new URL at the next reload instead of
+    going out under the old immutable one; unchanged files only cost a stat.
+    """
+
+    def __init__(self, fonts_dir: str = FONTS_DIR):
+        self.fonts_dir = fonts_dir
+        self._lock = threading.Lock()
+        # page -> ((size, mtime_ns), hash) of the files last hashed
+        self._signatures: Dict[int, Tuple[Tuple[int, int], str]] = {}
+        self._hashes: Optional[Dict[int, str]] = None
+
+    def path(self, page_number: int) -> str:
+        return os.path.join(self.fonts_dir, f"p{page_number}.woff")
+
+    @property
+    def loaded(self) -> bool:
+        return self._hashes is not None
+
+    def get(self, page_number: int) -> Optional[str]:
+        """Hash of the page's font as of the last refresh, None if it had none"""
+        hashes = self._hashes
+        return hashes.get(page_number) if hashes is not None else None
+
+    def all(self) -> Dict[int, str]:
+        return dict(self._hashes or {})
+
+    def refresh(self, store: Optional[QulStore] = None) -> Dict[int, str]:
+        """Re-hash the fonts whose size or mtime changed; usable as a store warmer"""
+        with self._lock:
+            signatures = {}
+            for page_number in range(1, 605):
+                path = self.path(page_number)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                signature = (stat.st_size, stat.st_mtime_ns)
+                cached = self._signatures.get(page_number)
+                if cached is None or cached[0] != signature:
+                    with open(path, "rb") as f:
+                        cached = (signature, hashlib.sha256(f.read()).hexdigest()[:16])
+                signatures[page_number] = cached
+            self._signatures = signatures
+            # A single reference assignment: lookups see the old or the new hashes
+            self._hashes = {page_number: font_hash for page_number, (_, font_hash) in signatures.items()}
+            return self._hashes
+
+
+class ChangesCache:
+    """Change lists for the current build, keyed by the client's version"""
+
+    def __init__(self, max_entries: int = MAX_CACHED_CHANGES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._generation = None
+        self._entries: "OrderedDict[tuple, dict]" = OrderedDict()
+
+    def get(self, generation: int, key: tuple, compute: Callable[[], dict]) -> dict:
+        """Cached result for `key`, or compute() stored until the store generation changes"""
+        with self._lock:
+            if self._generation != generation:
+                self._generation = generation
+                self._entries.clear()
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                CACHE_HITS.labels("changes").inc()
+                return result
+
+        CACHE_MISSES.labels("changes").inc()
+        result = compute()
+        with self._lock:
+            if self._generation == generation:
+                self._entries[key] = result
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    CACHE_EVICTIONS.labels("changes").inc()
+        return result
+
+
+class CurrentBuild:
+    """Manifest of the loaded store, recorded into the content store once"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._signature = None
+        self._manifest = None
+
+    def get(self, store: QulStore) -> dict:
+        if self._signature != store.signature:
+            with self._lock:
+                if self._signature != store.signature:
+                    self._manifest = record_store_build(store)
+                    self._signature = store.signature
+        return self._manifest
+
+    def peek(self, store: QulStore) -> Optional[dict]:
+        """Manifest of the store if already recorded, without recording it"""
+        manifest = self._manifest
+        return manifest if self._signature == store.signature else None
+
+
+current_build = CurrentBuild()
+font_hashes = FontHashes()
+changes_cache = ChangesCache()
@@ -0,0 +1,94 @@
+"""
+Project-wide response classes
+
+Handlers on read paths return these directly with data built from trusted
+database rows. FastAPI skips response_model validation and jsonable_encoder
+for Response instances, so the declared models only feed the OpenAPI schema.
+"""
+
+from typing import Any
+
+import orjson
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import msgpack
+except ImportError:  # Binary pages are optional; JSON is always available
+    msgpack = None
+
+# Accept values that select the compact MessagePack encoding
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+
+def encode_json(content: Any) -> bytes:
+    # Surah name maps are keyed by int; orjson needs the flag to allow that
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def encode_msgpack(content: Any) -> bytes:
+    return msgpack.packb(content, use_bin_type=True)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded with orjson"""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content  # Already encoded, e.g. a page body from app.database.page_bodies
+        return encode_json(content)
+
+
+class MsgPackResponse(Response):
+    """MessagePack response for clients that ask for a binary encoding"""
+
+    media_type = "application/msgpack"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return encode_msgpack(content)
+
+
+def _quality(params) -> float:
+    for param in params:
+        name, _, value = param.partition("=")
+        if name.strip() == "q":
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def wants_msgpack(request: Request) -> bool:
+    """
+    True when the Accept header ranks MessagePack above JSON and it is available
+
+    JSON's quality comes from application/json, else application/* or */*.
+    Against a wildcard of equal quality the explicitly named MessagePack wins;
+    against an explicit application/json it must rank strictly higher.
+    """
+    if msgpack is None:
+        return False
+
+    accept = request.headers.get("accept", "")
+    if "msgpack" not in accept:
+        return False
+
+    msgpack_quality = 0.0
+    json_quality = {}
+    for part in accept.split(","):
+        media_type, *params = [item.strip() for item in part.split(";")]
+        media_type = media_type.lower()
+        if media_type in MSGPACK_MEDIA_TYPES:
+            msgpack_quality = max(msgpack_quality, _quality(params))
+        elif media_type in ("application/json", "application/*", "*/*"):
+            json_quality[media_type] = max(json_quality.get(media_type, 0.0), _quality(params))
+
+    if msgpack_quality <= 0:
+        return False
+    if "application/json" in json_quality:
+        return msgpack_quality > json_quality["application/json"]
+    wildcard = json_quality.get("application/*", json_quality.get("*/*", 0.0))
+    return msgpack_quality >= wildcard
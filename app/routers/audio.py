@@ -2,13 +2,30 @@
 Audio router - API endpoints for audio recitations and timing
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
 import aiosqlite
+import os
 from app.database.connection import get_async_db
+from app.http_cache import DATA
+from app.audio.playlist import build_playlist, iter_joined_frames, resolve_audio_path
+from app.audio.hls import get_manifest_path, parse_range_header
+from app.audio.timings import group_surah_timings
+from app.models.audio import (
+    RecitationsResponse, WordAudioTiming, AyahAudioTiming, SurahTimingsResponse, SurahPlaylist,
+    RecitationStatsResponse, AllRecitationStatsResponse
+)
+from app.responses import FastJSONResponse
+from app.singleflight import SingleFlight
 
 router = APIRouter()
 
-@router.get("/recitations")
+ayah_timings = SingleFlight("ayah_timings")
+surah_timings = SingleFlight("surah_timings")
+
+@router.get("/recitations", response_model=RecitationsResponse)
 async def get_recitations(db: aiosqlite.Connection = Depends(get_async_db)):
     """Get all available recitations"""
     try:
@@ -27,12 +44,12 @@ async def get_recitations(db: aiosqlite.Connection = Depends(get_async_db)):
                 "style": row[2]
             })
         
-        return {"recitations": recitations}
+        return FastJSONResponse({"recitations": recitations})
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
-@router.get("/word/{word_id}/recitation/{recitation_id}")
+@router.get("/word/{word_id}/recitation/{recitation_id}", response_model=WordAudioTiming)
 async def get_word_audio_timing(
     word_id: int,
     recitation_id: int,
@@ -53,21 +70,21 @@ async def get_word_audio_timing(
                 detail=f"Audio timing not found for word {word_id} and recitation {recitation_id}"
             )
         
-        return {
+        return FastJSONResponse({
             "word_id": word_id,
             "recitation_id": recitation_id,
             "start_time": row[0],
             "end_time": row[1],
             "duration": row[1] - row[0],
             "audio_url": row[2]
-        }
+        })
     
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
-@router.get("/ayah/{surah_number}/{ayah_number}/recitation/{recitation_id}")
+@router.get("/ayah/{surah_number}/{ayah_number}/recitation/{recitation_id}", response_model=AyahAudioTiming)
 async def get_ayah_audio_timing(
     surah_number: int,
     ayah_number: int,
@@ -76,14 +93,17 @@ async def get_ayah_audio_timing(
 ):
     """Get audio timing for all words in an ayah"""
     try:
-        cursor = await db.execute("""
-            SELECT w.id, at.start_time, at.end_time, at.audio_file_url
-            FROM words w
-            JOIN audio_timings at ON w.id = at.word_id
-            WHERE w.surah_number = ? AND w.ayah_number = ? AND at.recitation_id = ?
-            ORDER BY w.word_position
-        """, (surah_number, ayah_number, recitation_id))
-        rows = await cursor.fetchall()
+        async def lookup():
+            cursor = await db.execute("""
+                SELECT w.id, at.start_time, at.end_time, at.audio_file_url
+                FROM words w
+                JOIN audio_timings at ON w.id = at.word_id
+                WHERE w.surah_number = ? AND w.ayah_number = ? AND at.recitation_id = ?
+                ORDER BY w.word_position
+            """, (surah_number, ayah_number, recitation_id))
+            return await cursor.fetchall()
+        
+        rows = await ayah_timings.do((surah_number, ayah_number, recitation_id), lookup)
         
         if not rows:
             raise HTTPException(
@@ -101,15 +121,373 @@ async def get_ayah_audio_timing(
                 "end_time": row[2]
             })
         
-        return {
+        return FastJSONResponse({
             "surah": surah_number,
             "ayah": ayah_number,
             "recitation_id": recitation_id,
             "audio_url": audio_url,
             "word_timings": word_timings
-        }
+        })
     
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+@router.get("/surah/{surah_number}/recitation/{recitation_id}/timings", response_model=SurahTimingsResponse)
+async def get_surah_timings(
+    surah_number: int,
+    recitation_id: int,
+    db: aiosqlite.Connection = Depends(get_async_db)
+):
+    """
+    Get all word timings for a complete surah
+    
+    Useful for preloading timing data for an entire surah.
+    """
+    try:
+        async def lookup():
+            cursor = await db.execute("""
+                SELECT 
+                    w.id, w.ayah_number, w.word_position, w.word_text_uthmani,
+                    at.start_time, at.end_time, at.audio_file_url
+                FROM words w
+                JOIN audio_timings at ON w.id = at.word_id
+                WHERE w.surah_number = ? AND at.recitation_id = ?
+                ORDER BY w.ayah_number, w.word_position
+            """, (surah_number, recitation_id))
+            rows = await cursor.fetchall()
+            
+            if not rows:
+                raise HTTPException(
+                    status_code=404, 
+                    detail=f"No audio timings found for surah {surah_number} with recitation {recitation_id}"
+                )
+            
+            return group_surah_timings(rows)
+        
+        # Identical concurrent requests share one query and grouping pass
+        ayahs = await surah_timings.do((surah_number, recitation_id), lookup)
+        
+        return FastJSONResponse({
+            "surah_number": surah_number,
+            "recitation_id": recitation_id,
+            "total_ayahs": len(ayahs),
+            "ayahs": ayahs
+        })
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+async def load_surah_playlist(
+    db: aiosqlite.Connection,
+    surah_number: int,
+    recitation_id: int,
+    start_ayah: int,
+    end_ayah: Optional[int]
+):
+    """Fetch word timings for an ayah range and compute joined-stream offsets"""
+    cursor = await db.execute("""
+        SELECT w.ayah_number, w.id, at.start_time, at.end_time, at.audio_file_url
+        FROM words w
+        JOIN audio_timings at ON w.id = at.word_id
+        WHERE w.surah_number = ? AND at.recitation_id = ?
+            AND w.ayah_number >= ? AND w.ayah_number <= ?
+        ORDER BY w.ayah_number, w.word_position
+    """, (surah_number, recitation_id, start_ayah, end_ayah if end_ayah is not None else 10**6))
+    rows = await cursor.fetchall()
+
+    if not rows:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No audio timings found for surah {surah_number} with recitation {recitation_id}"
+        )
+
+    try:
+        return await run_in_threadpool(build_playlist, rows)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@router.get("/surah/{surah_number}/recitation/{recitation_id}/playlist", response_model=SurahPlaylist)
+async def get_surah_playlist(
+    surah_number: int,
+    recitation_id: int,
+    start_ayah: int = Query(1, ge=1, description="First ayah of the range"),
+    end_ayah: Optional[int] = Query(None, ge=1, description="Last ayah of the range (inclusive)"),
+    db: aiosqlite.Connection = Depends(get_async_db)
+):
+    """
+    Get cumulative offsets for a gapless ayah range
+
+    Word timings are shifted so they stay valid against the joined stream.
+    """
+    try:
+        playlist = await load_surah_playlist(db, surah_number, recitation_id, start_ayah, end_ayah)
+
+        stream_url = (
+            f"/api/v1/audio/surah/{surah_number}/recitation/{recitation_id}/stream"
+            f"?start_ayah={start_ayah}" + (f"&end_ayah={end_ayah}" if end_ayah else "")
+        )
+
+        return FastJSONResponse({
+            "surah_number": surah_number,
+            "recitation_id": recitation_id,
+            "stream_url": stream_url,
+            "total_duration_ms": playlist["total_duration_ms"],
+            "total_bytes": playlist["total_bytes"],
+            "ayahs": [
+                {
+                    "ayah_number": ayah["ayah_number"],
+                    "audio_url": ayah["audio_url"],
+                    "offset_ms": ayah["offset_ms"],
+                    "duration_ms": ayah["duration_ms"],
+                    "word_timings": ayah["words"]
+                }
+                for ayah in playlist["ayahs"]
+            ]
+        })
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+@router.get("/surah/{surah_number}/recitation/{recitation_id}/stream")
+async def stream_surah_audio(
+    surah_number: int,
+    recitation_id: int,
+    start_ayah: int = Query(1, ge=1, description="First ayah of the range"),
+    end_ayah: Optional[int] = Query(None, ge=1, description="Last ayah of the range (inclusive)"),
+    db: aiosqlite.Connection = Depends(get_async_db)
+):
+    """
+    Stream an ayah range as one MP3 by joining the per-ayah frames
+
+    Frames are copied as-is (no transcoding) in fixed-size chunks, so memory
+    use does not grow with the length of the range.
+    """
+    try:
+        playlist = await load_surah_playlist(db, surah_number, recitation_id, start_ayah, end_ayah)
+
+        spans = [(ayah["path"], *ayah["byte_range"]) for ayah in playlist["ayahs"]]
+
+        return StreamingResponse(
+            iter_joined_frames(spans),
+            media_type="audio/mpeg",
+            headers={
+                "Content-Length": str(playlist["total_bytes"]),
+                "X-Audio-Duration-Ms": str(playlist["total_duration_ms"])
+            }
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+@router.get("/surah/{surah_number}/recitation/{recitation_id}/hls.m3u8")
+async def get_surah_hls_manifest(
+    surah_number: int,
+    recitation_id: int,
+    db: aiosqlite.Connection = Depends(get_async_db)
+):
+    """
+    Get an HLS playlist for a surah recitation
+
+    Segments are ayah-aligned byte ranges into the original MP3 files and the
+    manifest is cached on disk until the audio files change.
+    """
+    try:
+        cursor = await db.execute("""
+            SELECT w.ayah_number, at.audio_file_url
+            FROM words w
+            JOIN audio_timings at ON w.id = at.word_id
+            WHERE w.surah_number = ? AND at.recitation_id = ?
+            ORDER BY w.ayah_number, w.word_position
+        """, (surah_number, recitation_id))
+        rows = await cursor.fetchall()
+
+        if not rows:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No audio timings found for surah {surah_number} with recitation {recitation_id}"
+            )
+
+        # One file per ayah, taken from its first word
+        ayah_files = []
+        for ayah_number, audio_url in rows:
+            if not ayah_files or ayah_files[-1][0] != ayah_number:
+                ayah_files.append((ayah_number, audio_url))
+
+        try:
+            manifest_path = await run_in_threadpool(
+                get_manifest_path, recitation_id, surah_number, ayah_files, "/api/v1/audio/segment"
+            )
+        except FileNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+        return FileResponse(
+            manifest_path,
+            media_type="application/vnd.apple.mpegurl",
+            headers={"Cache-Control": "public, max-age=3600"}
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+@router.get("/segment/{audio_filename}")
+async def get_audio_segment(audio_filename: str, request: Request):
+    """
+    Serve an audio file or the byte range requested by an HLS segment
+    """
+    audio_path = resolve_audio_path(audio_filename)
+    if not os.path.exists(audio_path):
+        raise HTTPException(status_code=404, detail=f"Audio file {audio_filename} not found")
+
+    file_size = os.path.getsize(audio_path)
+    range_header = request.headers.get("range")
+    if not range_header:
+        return FileResponse(audio_path, media_type="audio/mpeg", headers={"Accept-Ranges": "bytes"})
+
+    try:
+        start, end = parse_range_header(range_header, file_size)
+    except ValueError:
+        raise HTTPException(
+            status_code=416,
+            detail=f"Invalid range for {audio_filename}",
+            headers={"Content-Range": f"bytes */{file_size}"}
+        )
+
+    return StreamingResponse(
+        iter_joined_frames([(audio_path, start, end)]),
+        status_code=206,
+        media_type="audio/mpeg",
+        headers={
+            "Accept-Ranges": "bytes",
+            "Content-Range": f"bytes {start}-{end - 1}/{file_size}",
+            "Content-Length": str(end - start),
+            # The URL is not versioned and the file may be replaced, like the other audio routes
+            "Cache-Control": DATA.cache_control
+        }
+    )
+
+def _format_stats_row(row):
+    """Shape a recitation_stats row for the API"""
+    word_count, total_ms, min_ms, max_ms, ayahs_covered, surahs_covered = row
+    return {
+        "total_words": word_count,
+        "total_duration_ms": total_ms,
+        "average_word_duration_ms": round(total_ms / word_count, 2) if word_count else 0,
+        "min_word_duration_ms": min_ms,
+        "max_word_duration_ms": max_ms,
+        "surahs_covered": surahs_covered,
+        "ayahs_covered": ayahs_covered
+    }
+
+@router.get("/stats/recitations", response_model=AllRecitationStatsResponse)
+async def get_all_recitation_stats(db: aiosqlite.Connection = Depends(get_async_db)):
+    """
+    Get recitation-wide statistics for every recitation in one query
+    """
+    try:
+        cursor = await db.execute("""
+            SELECT r.id, r.reciter_name, r.style,
+                   s.word_count, s.total_duration_ms, s.min_duration_ms, s.max_duration_ms,
+                   s.ayahs_covered, s.surahs_covered
+            FROM recitations r
+            LEFT JOIN recitation_stats s
+                ON s.recitation_id = r.id AND s.surah_number = 0 AND s.ayah_number = 0
+            ORDER BY r.reciter_name
+        """)
+        rows = await cursor.fetchall()
+
+        return FastJSONResponse({
+            "recitations": [
+                {
+                    "recitation_id": row[0],
+                    "reciter_name": row[1],
+                    "style": row[2],
+                    "statistics": _format_stats_row(row[3:] if row[3] is not None else (0, 0, 0, 0, 0, 0))
+                }
+                for row in rows
+            ]
+        })
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+@router.get("/stats/recitation/{recitation_id}", response_model=RecitationStatsResponse)
+async def get_recitation_stats(
+    recitation_id: int,
+    surah: Optional[int] = Query(None, description="Include per-ayah stats for this surah"),
+    db: aiosqlite.Connection = Depends(get_async_db)
+):
+    """
+    Get statistics for a specific recitation
+
+    Reads the recitation_stats table materialized when timings are ingested.
+    """
+    try:
+        cursor = await db.execute("""
+            SELECT reciter_name, style FROM recitations WHERE id = ?
+        """, (recitation_id,))
+        recitation_row = await cursor.fetchone()
+
+        if not recitation_row:
+            raise HTTPException(status_code=404, detail=f"Recitation {recitation_id} not found")
+
+        stats_columns = """
+            word_count, total_duration_ms, min_duration_ms, max_duration_ms,
+            ayahs_covered, surahs_covered
+        """
+
+        cursor = await db.execute(f"""
+            SELECT {stats_columns} FROM recitation_stats
+            WHERE recitation_id = ? AND surah_number = 0 AND ayah_number = 0
+        """, (recitation_id,))
+        stats_row = await cursor.fetchone()
+
+        result = {
+            "recitation_id": recitation_id,
+            "reciter_name": recitation_row[0],
+            "style": recitation_row[1],
+            "statistics": _format_stats_row(stats_row or (0, 0, 0, 0, 0, 0))
+        }
+
+        if surah is not None:
+            cursor = await db.execute(f"""
+                SELECT ayah_number, {stats_columns} FROM recitation_stats
+                WHERE recitation_id = ? AND surah_number = ?
+                ORDER BY ayah_number
+            """, (recitation_id, surah))
+            rows = await cursor.fetchall()
+
+            if not rows:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"No statistics found for surah {surah} with recitation {recitation_id}"
+                )
+
+            result["surah"] = {
+                "surah_number": surah,
+                "statistics": _format_stats_row(rows[0][1:]) if rows[0][0] == 0 else None,
+                "ayahs": [
+                    {"ayah_number": row[0], **_format_stats_row(row[1:])}
+                    for row in rows if row[0] > 0
+                ]
+            }
+
+        return FastJSONResponse(result)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
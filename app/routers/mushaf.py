@@ -6,14 +6,37 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List, Optional
 import aiosqlite
 
-from app.models.mushaf import (
-    MushafLayout, LayoutsResponse, Page, PageResponse, 
-    Word, WordPosition, Line, ErrorResponse
-)
+from app.models.mushaf import MushafLayout, LayoutsResponse, PageResponse, ErrorResponse
+from app.models import domain
+from app.responses import FastJSONResponse
 from app.database.connection import get_async_db
+from app.singleflight import SingleFlight
 
 router = APIRouter()
 
+mushaf_pages = SingleFlight("mushaf_page")
+
+def line_words(word_rows) -> List[dict]:
+    """
+    Word dicts of one line
+
+    `word_rows` are (id, word_position, surah, ayah, text, translation,
+    transliteration, x, y, width, height) ordered by word position.
+    """
+    # Rows are trusted, so build slotted records and skip per-word validation
+    return [
+        domain.Word(
+            id=word_id,
+            text=text,
+            surah=surah,
+            ayah=ayah,
+            position=(x or 0, y or 0, w or 0, h or 0),
+            translation=translation,
+            transliteration=transliteration
+        ).to_dict()
+        for word_id, word_pos, surah, ayah, text, translation, transliteration, x, y, w, h in word_rows
+    ]
+
 @router.get("/layouts", response_model=LayoutsResponse)
 async def get_mushaf_layouts(db: aiosqlite.Connection = Depends(get_async_db)):
     """
@@ -31,15 +54,15 @@ async def get_mushaf_layouts(db: aiosqlite.Connection = Depends(get_async_db)):
         
         layouts = []
         for row in rows:
-            layouts.append(MushafLayout(
-                id=row[0],
-                name=row[1],
-                total_pages=row[2],
-                lines_per_page=row[3],
-                font_name=row[4]
-            ))
+            layouts.append({
+                "id": row[0],
+                "name": row[1],
+                "total_pages": row[2],
+                "lines_per_page": row[3],
+                "font_name": row[4]
+            })
         
-        return LayoutsResponse(layouts=layouts)
+        return FastJSONResponse({"layouts": layouts})
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
@@ -65,13 +88,13 @@ async def get_mushaf_layout(
         if not row:
             raise HTTPException(status_code=404, detail=f"Mushaf layout {layout_id} not found")
         
-        return MushafLayout(
-            id=row[0],
-            name=row[1],
-            total_pages=row[2],
-            lines_per_page=row[3],
-            font_name=row[4]
-        )
+        return FastJSONResponse({
+            "id": row[0],
+            "name": row[1],
+            "total_pages": row[2],
+            "lines_per_page": row[3],
+            "font_name": row[4]
+        })
     
     except HTTPException:
         raise
@@ -90,92 +113,73 @@ async def get_mushaf_page(
     Returns all words, their positions, and line organization for the specified page.
     """
     try:
-        # Verify layout exists
-        cursor = await db.execute("""
-            SELECT id FROM mushaf_layouts WHERE id = ?
-        """, (layout_id,))
-        if not await cursor.fetchone():
-            raise HTTPException(status_code=404, detail=f"Mushaf layout {layout_id} not found")
-        
-        # Get page information
-        cursor = await db.execute("""
-            SELECT id, page_number, image_url 
-            FROM pages 
-            WHERE mushaf_layout_id = ? AND page_number = ?
-        """, (layout_id, page_number))
-        page_row = await cursor.fetchone()
+        async def build_page():
+            # Verify layout exists
+            cursor = await db.execute("""
+                SELECT id FROM mushaf_layouts WHERE id = ?
+            """, (layout_id,))
+            if not await cursor.fetchone():
+                raise HTTPException(status_code=404, detail=f"Mushaf layout {layout_id} not found")
         
-        if not page_row:
-            raise HTTPException(
-                status_code=404, 
-                detail=f"Page {page_number} not found for layout {layout_id}"
-            )
+            # Get page information
+            cursor = await db.execute("""
+                SELECT id, page_number, image_url 
+                FROM pages 
+                WHERE mushaf_layout_id = ? AND page_number = ?
+            """, (layout_id, page_number))
+            page_row = await cursor.fetchone()
         
-        page_id = page_row[0]
-        image_url = page_row[2]
+            if not page_row:
+                raise HTTPException(
+                    status_code=404, 
+                    detail=f"Page {page_number} not found for layout {layout_id}"
+                )
         
-        # Get all lines for this page
-        cursor = await db.execute("""
-            SELECT id, line_number 
-            FROM lines 
-            WHERE page_id = ? 
-            ORDER BY line_number
-        """, (page_id,))
-        line_rows = await cursor.fetchall()
+            page_id = page_row[0]
+            image_url = page_row[2]
         
-        lines = []
-        for line_row in line_rows:
-            line_id, line_number = line_row
-            
-            # Get all words for this line with their positions
+            # Get all lines for this page
             cursor = await db.execute("""
-                SELECT 
-                    w.id, w.word_position, w.surah_number, w.ayah_number,
-                    w.word_text_uthmani, w.translation_en, w.transliteration_en,
-                    wp.x_coordinate, wp.y_coordinate, wp.width, wp.height
-                FROM words w
-                LEFT JOIN word_positions wp ON w.id = wp.word_id 
-                    AND wp.mushaf_layout_id = ? AND wp.page_number = ?
-                WHERE w.line_id = ?
-                ORDER BY w.word_position
-            """, (layout_id, page_number, line_id))
-            word_rows = await cursor.fetchall()
+                SELECT id, line_number 
+                FROM lines 
+                WHERE page_id = ? 
+                ORDER BY line_number
+            """, (page_id,))
+            line_rows = await cursor.fetchall()
+        
+            lines = []
+            for line_row in line_rows:
+                line_id, line_number = line_row
             
-            words = []
-            for word_row in word_rows:
-                word_id, word_pos, surah, ayah, text, translation, transliteration, x, y, w, h = word_row
-                
-                # Create word position (default to 0,0 if not found)
-                position = WordPosition(
-                    x=x or 0,
-                    y=y or 0,
-                    width=w or 0,
-                    height=h or 0
-                )
-                
-                word = Word(
-                    id=word_id,
-                    text=text,
-                    surah=surah,
-                    ayah=ayah,
-                    position=position,
-                    translation=translation,
-                    transliteration=transliteration
-                )
-                words.append(word)
+                # Get all words for this line with their positions
+                cursor = await db.execute("""
+                    SELECT 
+                        w.id, w.word_position, w.surah_number, w.ayah_number,
+                        w.word_text_uthmani, w.translation_en, w.transliteration_en,
+                        wp.x_coordinate, wp.y_coordinate, wp.width, wp.height
+                    FROM words w
+                    LEFT JOIN word_positions wp ON w.id = wp.word_id 
+                        AND wp.mushaf_layout_id = ? AND wp.page_number = ?
+                    WHERE w.line_id = ?
+                    ORDER BY w.word_position
+                """, (layout_id, page_number, line_id))
+                words = line_words(await cursor.fetchall())
             
-            if words:  # Only add lines that have words
-                line = Line(line_number=line_number, words=words)
-                lines.append(line)
+                if words:  # Only add lines that have words
+                    lines.append({"line_number": line_number, "words": words})
+        
+            return {
+                "page_number": page_number,
+                "layout_id": layout_id,
+                "image_url": image_url,
+                "lines": lines
+            }
         
-        page = Page(
-            page_number=page_number,
-            layout_id=layout_id,
-            image_url=image_url,
-            lines=lines
-        )
+        # Identical concurrent requests share one set of queries
+        page = await mushaf_pages.do((layout_id, page_number), build_page)
         
-        return PageResponse(page=page)
+        # Returning a response directly keeps PageResponse for OpenAPI only
+        return FastJSONResponse({"page": page})
     
     except HTTPException:
         raise
@@ -213,13 +217,13 @@ async def get_ayah_page_location(
                 detail=f"Ayah {surah_number}:{ayah_number} not found in layout {layout_id}"
             )
         
-        return {
+        return FastJSONResponse({
             "surah": surah_number,
             "ayah": ayah_number,
             "layout_id": layout_id,
             "page_number": result[0],
             "line_number": result[1]
-        }
+        })
     
     except HTTPException:
         raise
@@ -0,0 +1,84 @@
+"""
+Offline router - versioned bundles of the whole Mushaf for offline-first clients
+"""
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse, Response
+from starlette.concurrency import run_in_threadpool
+import os
+
+from app.database.qul_store import get_qul_store
+from app.offline.bundle import BUNDLE_DIR, bundle_cache
+from app.responses import FastJSONResponse
+
+router = APIRouter()
+
+async def load_manifest(include_fonts: bool) -> dict:
+    """Get the manifest of the current bundle, building it on first use"""
+    try:
+        store = await run_in_threadpool(get_qul_store)
+    except FileNotFoundError:
+        raise HTTPException(status_code=500, detail="QUL database not found")
+    return await run_in_threadpool(bundle_cache.get, store, include_fonts)
+
+@router.get("/manifest")
+async def get_bundle_manifest(
+    fonts: bool = Query(False, description="Include page-specific fonts in the bundle")
+):
+    """
+    Get the current bundle manifest
+
+    Lists every part with its SHA-256 hash so clients can fetch only the
+    parts that changed since the bundle they already have.
+    """
+    try:
+        manifest = await load_manifest(fonts)
+        return FastJSONResponse({
+            **manifest,
+            "bundle_url": f"/api/v1/offline/bundle/{manifest['bundle']['filename']}",
+            "part_url": "/api/v1/offline/part/{name}" + ("?fonts=true" if fonts else "")
+        })
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error building bundle: {str(e)}")
+
+@router.get("/bundle/{filename}")
+async def get_bundle(filename: str):
+    """Download a bundle; bundle filenames are versioned so they never change"""
+    bundle_path = os.path.join(BUNDLE_DIR, os.path.basename(filename))
+    if not filename.endswith(".zip") or not os.path.exists(bundle_path):
+        raise HTTPException(status_code=404, detail=f"Bundle {filename} not found")
+
+    return FileResponse(
+        bundle_path,
+        media_type="application/zip",
+        filename=os.path.basename(filename),
+        headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
+
+@router.get("/part/{name:path}")
+async def get_bundle_part(
+    name: str,
+    fonts: bool = Query(False, description="Look the part up in the bundle that includes fonts")
+):
+    """Get a single part of the current bundle"""
+    try:
+        manifest = await load_manifest(fonts or name.startswith("fonts/"))
+        data = await run_in_threadpool(bundle_cache.read_part, manifest, name)
+
+        if data is None:
+            raise HTTPException(status_code=404, detail=f"Bundle part {name} not found")
+
+        media_type = "font/woff" if name.endswith(".woff") else "application/json"
+        return Response(
+            data,
+            media_type=media_type,
+            headers={"ETag": f'"{manifest["parts"][name]["sha256"]}"'}
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reading bundle part: {str(e)}")
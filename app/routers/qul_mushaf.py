@@ -2,315 +2,369 @@
 QUL-compatible Mushaf router following QUL rendering logic
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import RedirectResponse
 from typing import List, Dict, Any, Optional
-import sqlite3
-import os
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+
+from app.database.qul_access import Overloaded, QueryTimeout, qul_db
+from app.database.qul_store import QulStore, get_qul_store, qul_manager
+from app.http_cache import CACHE_SCOPE_KEY, PREFETCH_SCOPE_KEY
+from app.models.qul import (
+    QulLayoutsResponse, QulPage, QulSurahNamesResponse, QulSearchResponse,
+    QulAyah, QulStats
+)
+from app.offline.versions import (
+    changes_between, changes_cache, current_build, font_hashes, load_build_manifest
+)
+from app.responses import FastJSONResponse, MsgPackResponse, wants_msgpack
+from app.singleflight import SingleFlight
+from app.warmup import adjacent_pages, page_prefetcher
 
 router = APIRouter(prefix="/qul", tags=["QUL Mushaf"])
 
-# Database path
-QUL_DB_PATH = "app/database/qul_complete.db"
+qul_searches = SingleFlight("qul_search")
+
+# Immutable URLs: page URLs name the build version, font URLs the font's content hash
+VERSIONED_PAGE_URL = "/api/v1/qul/qul/v/{version}/page/{page_number}"
+VERSIONED_FONT_URL = "/static/fonts/{font_hash}/p{page_number}.woff"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
 
-def get_qul_connection():
-    """Get connection to QUL database"""
-    if not os.path.exists(QUL_DB_PATH):
+async def qul_call(method, *args, **kwargs):
+    """Await a qul_db call, turning its failures into HTTP errors"""
+    try:
+        return await method(*args, **kwargs)
+    except FileNotFoundError:
         raise HTTPException(status_code=500, detail="QUL database not found")
-    return sqlite3.connect(QUL_DB_PATH)
+    except Overloaded:
+        raise HTTPException(status_code=503, detail="QUL database is busy, retry shortly",
+                            headers={"Retry-After": "1"})
+    except QueryTimeout:
+        raise HTTPException(status_code=504, detail="QUL database call timed out")
+
+def build_search_results(rows, store: QulStore) -> List[Dict[str, Any]]:
+    """Result dicts from (id, location, surah, ayah, text, name_simple, name_arabic) rows"""
+    # Page lookups come from the in-memory line index instead of one query per hit
+    return [
+        {
+            "word_id": word_id,
+            "word_key": location,
+            "surah": surah,
+            "ayah": ayah,
+            "text": text,
+            "surah_name": surah_name,
+            "surah_arabic": surah_arabic,
+            "page": store.page_for_word(word_id)
+        }
+        for word_id, location, surah, ayah, text, surah_name, surah_arabic in rows
+    ]
+
+async def load_qul_store() -> QulStore:
+    """Get the in-memory QUL store, loading it off the event loop on first use"""
+    store = qul_manager.current
+    if store is not None:
+        return store
+    # Loading the whole build takes longer than any query deadline
+    return await qul_call(qul_db.run, get_qul_store, bounded=False)
 
-@router.get("/layouts")
+async def current_manifest(store: QulStore) -> dict:
+    """Build manifest of the store, normally recorded by its warmer before it went live"""
+    return current_build.peek(store) or await run_in_threadpool(current_build.get, store)
+
+@router.get("/layouts", response_model=QulLayoutsResponse)
 async def get_layouts():
     """Get available QUL layouts"""
     try:
-        conn = get_qul_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM layout_info")
-        layouts = cursor.fetchall()
-        conn.close()
-        
-        layout_list = []
-        for layout in layouts:
-            layout_list.append({
-                "name": layout[0],
-                "number_of_pages": layout[1],
-                "lines_per_page": layout[2],
-                "font_name": layout[3]
-            })
-        
-        return {"layouts": layout_list}
+        store = await load_qul_store()
+        return FastJSONResponse({"layouts": store.layouts})
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching layouts: {str(e)}")
 
-@router.get("/page/{page_number}")
-async def get_page(page_number: int):
-    """Get QUL page data with proper rendering structure"""
+def page_url(store: QulStore, page_number: int) -> str:
+    """Versioned URL of a page once the build's manifest is known, else the plain one"""
+    manifest = current_build.peek(store)
+    if manifest is None:
+        return f"/api/v1/qul/qul/page/{page_number}"
+    return VERSIONED_PAGE_URL.format(version=manifest["version"], page_number=page_number)
+
+def preload_links(page_number: int, pages: List[int], page_urls: Dict[int, str]) -> str:
+    """Link header preloading this page's font and the adjacent pages with their fonts"""
+    links = []
+    for number in [page_number, *pages]:
+        if number != page_number:
+            links.append(f"<{page_urls[number]}>; rel=preload; as=fetch; crossorigin=anonymous")
+        font_hash = font_hashes.get(number)
+        font_url = VERSIONED_FONT_URL.format(font_hash=font_hash, page_number=number) \
+            if font_hash else f"/api/v1/fonts/{number}"
+        links.append(f'<{font_url}>; rel=preload; as=font; type="font/woff"; crossorigin=anonymous')
+    return ", ".join(links)
+
+async def warm_adjacent(store: QulStore, request: Request, page_urls: Dict[int, str]):
+    """Background task: warm what the preload links will fetch"""
+    # Fonts are read into the OS file cache once per page and build
+    pending = page_prefetcher.claim(store, list(page_urls))
+    if pending:
+        await run_in_threadpool(page_prefetcher.warm, store, pending)
+    # Page responses go into the HTTP response cache, when HTTP_CACHE_MB enables it
+    http_cache = request.scope.get(CACHE_SCOPE_KEY)
+    if http_cache is not None:
+        for url in page_urls.values():
+            await http_cache.prefetch(url)
+
+def page_response(store: QulStore, page_number: int, request: Request, headers: Dict[str, str]):
+    """
+    JSON or MessagePack body of a page, 400/404 for pages outside the build
+
+    The response preloads the adjacent pages and fonts (PREFETCH_PAGES either
+    side). Once the body is sent their fonts are read into the OS file cache
+    and, with HTTP_CACHE_MB set, the preloaded page URLs are rendered into the
+    response cache, so page turns hit warm data.
+    """
+    if page_number < 1 or page_number > 604:
+        raise HTTPException(status_code=400, detail="Page number must be between 1 and 604")
+    
+    page = store.page(page_number)
+    
+    if page is None:
+        raise HTTPException(status_code=404, detail=f"Page {page_number} not found")
+    
+    pages = [number for number in adjacent_pages(page_number) if store.page(number) is not None]
+    page_urls = {number: page_url(store, number) for number in pages}
+    headers = {"Vary": "Accept", "Link": preload_links(page_number, pages, page_urls), **headers}
+    # Pages fetched by a prefetch do not prefetch their own neighbours in turn
+    background = BackgroundTask(warm_adjacent, store, request, page_urls) \
+        if page_urls and not request.scope.get(PREFETCH_SCOPE_KEY) else None
+    
+    # Slices of the pre-encoded bodies when the build has them
+    bodies = store.bodies
+    if wants_msgpack(request):
+        content = bodies.msgpack(page_number) if bodies else None
+        return MsgPackResponse(content or page.to_compact(), headers=headers, background=background)
+    content = bodies.json(page_number) if bodies else None
+    return FastJSONResponse(content or page.to_dict(), headers=headers, background=background)
+
+@router.get(
+    "/page/{page_number}",
+    response_model=QulPage,
+    responses={200: {"content": {"application/msgpack": {}}}}
+)
+async def get_page(page_number: int, request: Request):
+    """
+    Get QUL page data with proper rendering structure
+
+    Clients sending `Accept: application/msgpack` get the compact page layout
+    (see `Page.to_compact`) encoded as MessagePack instead of JSON. This URL
+    always serves the current build; `Content-Location` names its immutable
+    versioned equivalent.
+    """
     try:
-        if page_number < 1 or page_number > 604:
-            raise HTTPException(status_code=400, detail="Page number must be between 1 and 604")
-        
-        conn = get_qul_connection()
-        cursor = conn.cursor()
-        
-        # Get page lines
-        cursor.execute('''
-            SELECT line_number, line_type, is_centered, first_word_id, last_word_id, surah_number
-            FROM pages 
-            WHERE page_number = ? 
-            ORDER BY line_number
-        ''', (page_number,))
-        
-        page_lines = cursor.fetchall()
-        
-        if not page_lines:
-            raise HTTPException(status_code=404, detail=f"Page {page_number} not found")
-        
-        # Process each line according to QUL rendering logic
-        lines = []
-        for line_data in page_lines:
-            line_number, line_type, is_centered, first_word_id, last_word_id, surah_number = line_data
-            
-            line = {
-                "line_number": line_number,
-                "line_type": line_type,
-                "is_centered": bool(is_centered),
-                "words": [],
-                "content": "",
-                "first_word_id": first_word_id,
-                "last_word_id": last_word_id,
-                "surah_number": surah_number
-            }
-            
-            if line_type == "surah_name":
-                # Get surah name
-                if surah_number:
-                    cursor.execute("SELECT name_arabic FROM chapters WHERE id = ?", (surah_number,))
-                    surah_result = cursor.fetchone()
-                    if surah_result:
-                        line["content"] = f"سورة {surah_result[0]}"
-                        line["words"] = [{"word_id": 0, "text": line["content"]}]
-            
-            elif line_type == "basmallah":
-                line["content"] = "بِسۡمِ ٱللَّهِ ٱلرَّحۡمَٰنِ ٱلرَّحِيمِ"
-                line["words"] = [{"word_id": 0, "text": line["content"]}]
-            
-            elif line_type == "ayah":
-                # Get words for this line
-                if first_word_id and last_word_id:
-                    cursor.execute('''
-                        SELECT id, text FROM words 
-                        WHERE id BETWEEN ? AND ?
-                        ORDER BY id
-                    ''', (first_word_id, last_word_id))
-                    
-                    word_results = cursor.fetchall()
-                    words = []
-                    word_texts = []
-                    
-                    for word_id, text in word_results:
-                        words.append({"word_id": word_id, "text": text})
-                        word_texts.append(text)
-                    
-                    line["words"] = words
-                    line["content"] = " ".join(word_texts)
-            
-            lines.append(line)
-        
-        conn.close()
-        
-        # Get page-specific font info
-        font_file = f"p{page_number}.woff"
-        
-        return {
-            "page_number": page_number,
-            "total_lines": len(lines),
-            "lines": lines,
-            "font_file": font_file,
-            "font_path": f"/static/fonts/{font_file}"
-        }
+        store = await load_qul_store()
+        
+        headers = {}
+        manifest = current_build.peek(store)
+        if manifest is not None:
+            headers["Content-Location"] = VERSIONED_PAGE_URL.format(
+                version=manifest["version"], page_number=page_number
+            )
+        return page_response(store, page_number, request, headers)
     
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching page: {str(e)}")
 
-@router.get("/surah-names")
+@router.get(
+    "/v/{version}/page/{page_number}",
+    response_model=QulPage,
+    responses={200: {"content": {"application/msgpack": {}}}}
+)
+async def get_versioned_page(version: str, page_number: int, request: Request):
+    """
+    Get a page of a given data version, cacheable forever
+
+    Other versions than the current one are redirected (uncached) to the
+    current version's URL.
+    """
+    try:
+        store = await load_qul_store()
+        manifest = await current_manifest(store)
+        
+        if version != manifest["version"]:
+            return RedirectResponse(
+                VERSIONED_PAGE_URL.format(version=manifest["version"], page_number=page_number),
+                status_code=307,
+                headers={"Cache-Control": "no-cache"}
+            )
+        return page_response(store, page_number, request, {"Cache-Control": IMMUTABLE_CACHE_CONTROL})
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching page: {str(e)}")
+
+@router.get("/version")
+async def get_data_version():
+    """
+    Get the current data version and the immutable URLs built from it
+
+    The version hashes the database build and the fonts, so it changes with
+    any of them; each font URL carries the hash of that font as on disk.
+    """
+    try:
+        store = await load_qul_store()
+        manifest = await current_manifest(store)
+        version = manifest["version"]
+        
+        # Hashed when the build was loaded (see FontHashes)
+        return FastJSONResponse({
+            "version": version,
+            "page_url": VERSIONED_PAGE_URL.replace("{version}", version),
+            "font_url": VERSIONED_FONT_URL,
+            "fonts": font_hashes.all()
+        })
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching data version: {str(e)}")
+
+@router.get("/surah-names", response_model=QulSurahNamesResponse)
 async def get_surah_names():
     """Get all surah names"""
     try:
-        conn = get_qul_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT id, name_simple, name_arabic, verses_count FROM chapters ORDER BY id")
-        chapters = cursor.fetchall()
-        conn.close()
+        store = await load_qul_store()
         
         surah_names = {}
         surahs = []
         
-        for chapter in chapters:
-            chapter_id, name_simple, name_arabic, verses_count = chapter
-            surah_names[chapter_id] = name_arabic
-            surahs.append({
-                "id": chapter_id,
-                "name_simple": name_simple,
-                "name_arabic": name_arabic,
-                "verses_count": verses_count
-            })
+        for chapter in store.chapters.values():
+            surah_names[chapter.id] = chapter.name_arabic
+            surahs.append(chapter.to_dict())
         
-        return {"surah_names": surah_names, "surahs": surahs}
+        return FastJSONResponse({"surah_names": surah_names, "surahs": surahs})
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching surah names: {str(e)}")
 
-@router.get("/search")
+@router.get("/search", response_model=QulSearchResponse)
 async def search_quran(
     query: str = Query(..., min_length=1),
     limit: int = Query(default=20, ge=1, le=100)
 ):
     """Search in the Quran text"""
     try:
-        conn = get_qul_connection()
-        cursor = conn.cursor()
-        
         # Search in Arabic text
-        cursor.execute('''
-            SELECT w.id, w.location, w.surah, w.ayah, w.text,
-                   c.name_simple, c.name_arabic
-            FROM words w
-            JOIN chapters c ON w.surah = c.id
-            WHERE w.text LIKE ?
-            ORDER BY w.surah, w.ayah, w.id
-            LIMIT ?
-        ''', (f'%{query}%', limit))
-        
-        results = cursor.fetchall()
-        
-        search_results = []
-        for result in results:
-            word_id, location, surah, ayah, text, surah_name, surah_arabic = result
-            
-            # Find which page this word is on
-            cursor.execute('''
-                SELECT page_number FROM pages 
-                WHERE first_word_id <= ? AND last_word_id >= ?
-                LIMIT 1
-            ''', (word_id, word_id))
-            
-            page_result = cursor.fetchone()
-            page_number = page_result[0] if page_result else None
-            
-            search_results.append({
-                "word_id": word_id,
-                "word_key": location,
-                "surah": surah,
-                "ayah": ayah,
-                "text": text,
-                "surah_name": surah_name,
-                "surah_arabic": surah_arabic,
-                "page": page_number
-            })
-        
-        conn.close()
-        
-        return {
+        async def lookup():
+            return await qul_call(qul_db.fetchall, '''
+                SELECT w.id, w.location, w.surah, w.ayah, w.text,
+                       c.name_simple, c.name_arabic
+                FROM words w
+                JOIN chapters c ON w.surah = c.id
+                WHERE w.text LIKE ?
+                ORDER BY w.surah, w.ayah, w.id
+                LIMIT ?
+            ''', (f'%{query}%', limit))
+        
+        # Identical concurrent searches share one query
+        results = await qul_searches.do((query, limit), lookup)
+        
+        search_results = build_search_results(results, await load_qul_store())
+        
+        return FastJSONResponse({
             "results": search_results,
             "total_found": len(search_results),
             "query": query
-        }
+        })
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error searching: {str(e)}")
 
-@router.get("/ayah/{surah_number}/{ayah_number}")
+@router.get("/ayah/{surah_number}/{ayah_number}", response_model=QulAyah)
 async def get_ayah(surah_number: int, ayah_number: int):
     """Get specific ayah and find which page it's on"""
     try:
         if surah_number < 1 or surah_number > 114:
             raise HTTPException(status_code=400, detail="Surah number must be between 1 and 114")
         
-        conn = get_qul_connection()
-        cursor = conn.cursor()
-        
-        # Get ayah words
-        cursor.execute('''
-            SELECT id, text FROM words 
-            WHERE surah = ? AND ayah = ?
-            ORDER BY word
-        ''', (surah_number, ayah_number))
+        store = await load_qul_store()
+        ayah = store.ayah(surah_number, ayah_number)
         
-        words = cursor.fetchall()
-        
-        if not words:
+        if ayah is None:
             raise HTTPException(status_code=404, detail=f"Ayah {surah_number}:{ayah_number} not found")
         
-        # Find page containing this ayah
-        first_word_id = words[0][0]
-        cursor.execute('''
-            SELECT page_number FROM pages 
-            WHERE first_word_id <= ? AND last_word_id >= ?
-            LIMIT 1
-        ''', (first_word_id, first_word_id))
-        
-        page_result = cursor.fetchone()
-        page_number = page_result[0] if page_result else None
-        
-        # Get surah info
-        cursor.execute("SELECT name_simple, name_arabic FROM chapters WHERE id = ?", (surah_number,))
-        surah_info = cursor.fetchone()
-        
-        conn.close()
-        
-        ayah_text = " ".join([word[1] for word in words])
-        
-        return {
-            "surah_number": surah_number,
-            "ayah_number": ayah_number,
-            "text": ayah_text,
-            "words": [{"word_id": w[0], "text": w[1]} for w in words],
-            "page_number": page_number,
-            "surah_name": surah_info[0] if surah_info else None,
-            "surah_arabic": surah_info[1] if surah_info else None
-        }
+        return FastJSONResponse(ayah.to_dict(store.chapters.get(surah_number)))
     
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching ayah: {str(e)}")
 
-@router.get("/stats")
+@router.get("/stats", response_model=QulStats)
 async def get_quran_stats():
     """Get Quran statistics"""
     try:
-        conn = get_qul_connection()
-        cursor = conn.cursor()
-        
-        # Get total counts
-        cursor.execute("SELECT COUNT(*) FROM words")
-        total_words = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(DISTINCT page_number) FROM pages")
-        total_pages = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM chapters")
-        total_surahs = cursor.fetchone()[0]
-        
-        # Get total ayahs
-        cursor.execute("SELECT SUM(verses_count) FROM chapters")
-        total_ayahs = cursor.fetchone()[0]
+        store = await load_qul_store()
         
-        conn.close()
-        
-        return {
-            "total_words": total_words,
-            "total_pages": total_pages,
-            "total_surahs": total_surahs,
-            "total_ayahs": total_ayahs,
+        return FastJSONResponse({
+            "total_words": len(store.words),
+            "total_pages": store.total_pages,
+            "total_surahs": len(store.chapters),
+            "total_ayahs": sum(chapter.verses_count or 0 for chapter in store.chapters.values()),
             "layout_name": "QPC HAFS Complete",
             "font_system": "Page-specific WOFF fonts"
-        }
+        })
     
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching stats: {str(e)}")
+
+@router.get("/changes")
+async def get_changes(
+    since: Optional[str] = Query(None, description="Build version the client currently has")
+):
+    """
+    List the pages, chapters and fonts that changed since a previous build
+
+    Changed parts carry their new SHA-256 and, when much smaller than the part
+    itself, a splice delta against the client's copy. Unknown or missing
+    versions get every part with `full_refresh` set.
+    """
+    try:
+        generation = qul_manager.generation
+        store = await load_qul_store()
+        current = await current_manifest(store)
+
+        def list_changes():
+            previous = load_build_manifest(since) if since else None
+            if since == current["version"]:
+                changes = {"changed": [], "removed": []}
+            elif previous is None:
+                changes = changes_between({"parts": {}}, current)
+            else:
+                changes = changes_between(previous, current)
+            return {
+                "since": since,
+                "version": current["version"],
+                "full_refresh": since != current["version"] and previous is None,
+                **changes
+            }
+
+        # Every client polling from the same version gets the same answer until the next build
+        payload = await run_in_threadpool(
+            changes_cache.get, generation, (since, current["version"]), list_changes
+        )
+        return FastJSONResponse(payload)
+    
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching stats: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error listing changes: {str(e)}")
@@ -5,11 +5,33 @@ Search router - API endpoints for searching Quranic text
 from fastapi import APIRouter, Depends, HTTPException, Query
 import aiosqlite
 from app.database.connection import get_async_db
+from app.models.search import SearchResponse, SuggestionsResponse, AdvancedSearchResponse
+from app.responses import FastJSONResponse
+from app.singleflight import SingleFlight
 from typing import List, Optional
 
 router = APIRouter()
 
-@router.get("/")
+searches = SingleFlight("search")
+advanced_searches = SingleFlight("advanced_search")
+
+def format_search_results(rows) -> List[dict]:
+    """Result dicts from (id, surah, ayah, text, translation, transliteration, page, line) rows"""
+    return [
+        {
+            "word_id": row[0],
+            "surah": row[1],
+            "ayah": row[2],
+            "text": row[3],
+            "translation": row[4],
+            "transliteration": row[5],
+            "page": row[6],
+            "line": row[7]
+        }
+        for row in rows
+    ]
+
+@router.get("/", response_model=SearchResponse)
 async def search_quran(
     q: str = Query(..., description="Search query"),
     limit: int = Query(20, description="Maximum number of results"),
@@ -19,45 +41,35 @@ async def search_quran(
     try:
         search_term = f"%{q.strip()}%"
         
-        cursor = await db.execute("""
-            SELECT DISTINCT
-                w.id, w.surah_number, w.ayah_number, w.word_text_uthmani,
-                w.translation_en, w.transliteration_en,
-                wp.page_number, wp.line_number
-            FROM words w
-            LEFT JOIN word_positions wp ON w.id = wp.word_id
-            WHERE w.word_text_uthmani LIKE ? 
-                OR w.translation_en LIKE ? 
-                OR w.transliteration_en LIKE ?
-            ORDER BY w.surah_number, w.ayah_number, w.word_position
-            LIMIT ?
-        """, (search_term, search_term, search_term, limit))
-        
-        rows = await cursor.fetchall()
-        
-        results = []
-        for row in rows:
-            results.append({
-                "word_id": row[0],
-                "surah": row[1],
-                "ayah": row[2],
-                "text": row[3],
-                "translation": row[4],
-                "transliteration": row[5],
-                "page": row[6],
-                "line": row[7]
-            })
-        
-        return {
+        async def lookup():
+            cursor = await db.execute("""
+                SELECT DISTINCT
+                    w.id, w.surah_number, w.ayah_number, w.word_text_uthmani,
+                    w.translation_en, w.transliteration_en,
+                    wp.page_number, wp.line_number
+                FROM words w
+                LEFT JOIN word_positions wp ON w.id = wp.word_id
+                WHERE w.word_text_uthmani LIKE ? 
+                    OR w.translation_en LIKE ? 
+                    OR w.transliteration_en LIKE ?
+                ORDER BY w.surah_number, w.ayah_number, w.word_position
+                LIMIT ?
+            """, (search_term, search_term, search_term, limit))
+            return format_search_results(await cursor.fetchall())
+        
+        # Identical concurrent searches share one query
+        results = await searches.do((search_term, limit), lookup)
+        
+        return FastJSONResponse({
             "query": q,
             "results_count": len(results),
             "results": results
-        }
+        })
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
-@router.get("/suggestions")
+@router.get("/suggestions", response_model=SuggestionsResponse)
 async def get_search_suggestions(
     q: str = Query(..., description="Search query for suggestions"),
     limit: int = Query(10, description="Maximum number of suggestions"),
@@ -79,15 +91,15 @@ async def get_search_suggestions(
         
         suggestions = [row[0] for row in rows if row[0]]
         
-        return {
+        return FastJSONResponse({
             "query": q,
             "suggestions": suggestions
-        }
+        })
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
-@router.get("/advanced")
+@router.get("/advanced", response_model=AdvancedSearchResponse)
 async def advanced_search(
     arabic: Optional[str] = Query(None, description="Arabic text search"),
     translation: Optional[str] = Query(None, description="English translation search"),
@@ -140,23 +152,13 @@ async def advanced_search(
             LIMIT ?
         """
         
-        cursor = await db.execute(query, params)
-        rows = await cursor.fetchall()
+        async def lookup():
+            cursor = await db.execute(query, params)
+            return format_search_results(await cursor.fetchall())
         
-        results = []
-        for row in rows:
-            results.append({
-                "word_id": row[0],
-                "surah": row[1],
-                "ayah": row[2],
-                "text": row[3],
-                "translation": row[4],
-                "transliteration": row[5],
-                "page": row[6],
-                "line": row[7]
-            })
-        
-        return {
+        results = await advanced_searches.do((where_clause, tuple(params)), lookup)
+        
+        return FastJSONResponse({
             "filters": {
                 "arabic": arabic,
                 "translation": translation,
@@ -166,7 +168,7 @@ async def advanced_search(
             },
             "results_count": len(results),
             "results": results
-        }
+        })
     
     except HTTPException:
         raise
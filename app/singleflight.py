@@ -0,0 +1,56 @@
+"""
+Request coalescing
+
+When identical lookups arrive while one is already running, the later ones
+wait for it and share its result (or its error) instead of repeating the
+queries. Nothing is kept once the call finishes: this only merges
+concurrent work, and results must be treated as read-only by every caller.
+"""
+
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+import asyncio
+
+from app.metrics import SINGLEFLIGHT_CALLS
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with equal keys into one computation"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self._leaders = SINGLEFLIGHT_CALLS.labels(name, "leader")
+        self._followers = SINGLEFLIGHT_CALLS.labels(name, "follower")
+
+    async def do(self, key: Hashable, compute: Callable[[], Awaitable[T]]) -> T:
+        """Result of compute(), shared with every concurrent call for `key`"""
+        task = self._calls.get(key)
+        leader = task is None
+        if leader:
+            # A task of its own, so a caller that goes away does not cancel it for the others
+            task = asyncio.ensure_future(compute())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+            self._leaders.inc()
+        else:
+            self._followers.inc()
+
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if leader and not task.done():
+                # compute() may be using the leader's request resources, such as its connection
+                await asyncio.wait([task])
+            raise
+
+    def _finished(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # Retrieved here so unawaited failures are not logged
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
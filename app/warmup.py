@@ -0,0 +1,218 @@
+"""
+Startup cache warming
+
+A fresh worker loads the QUL store with its pre-encoded page bodies and
+reads the fonts of the hottest pages and the databases behind search into
+the OS file cache before it reports ready. The hot pages come from
+WARMUP_PAGES or, when WARMUP_ACCESS_LOG is set, from the most requested
+pages in that log.
+While serving, the pages around each requested page are warmed the same way.
+"""
+
+from collections import Counter
+from typing import Dict, List, Optional
+import asyncio
+import os
+import re
+import time
+
+from app.database.page_bodies import encode_page_bodies
+from app.database.qul_store import QUL_DB_PATH, QulStore, qul_manager
+from app.offline.versions import font_hashes
+
+LEGACY_DB_PATH = "app/database/quran.db"
+FONTS_DIR = os.path.join("static", "fonts")
+
+# Pages to warm, e.g. "1-20,50,604"
+WARMUP_PAGES = os.getenv("WARMUP_PAGES", "1-20")
+# Access log to replay instead of the fixed page list (uvicorn or combined format)
+WARMUP_ACCESS_LOG = os.getenv("WARMUP_ACCESS_LOG")
+# Most requested pages taken from the access log
+WARMUP_TOP_PAGES = int(os.getenv("WARMUP_TOP_PAGES", "50"))
+# Pages either side of a requested page that are hinted and warmed (0 disables)
+PREFETCH_PAGES = int(os.getenv("PREFETCH_PAGES", "2"))
+
+# Page and font requests: /api/v1/qul/qul/page/3, /api/v1/fonts/3, /static/fonts/p3.woff
+PAGE_REQUEST_RE = re.compile(r'"GET [^" ]*?/(?:page|fonts)/p?(\d+)(?:\.woff)?[/? ]')
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+# Warming steps a worker cannot serve pages without; the others only make it slower
+REQUIRED_STEPS = ("page_store", "page_bodies")
+
+
+def parse_page_list(spec: str) -> List[int]:
+    """Pages named by a spec such as "1-20,50,604", in order without duplicates"""
+    pages = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            first, last = part.split("-", 1)
+            pages.extend(range(int(first), int(last) + 1))
+        else:
+            pages.append(int(part))
+    return list(dict.fromkeys(page for page in pages if 1 <= page <= 604))
+
+
+def hot_pages_from_log(log_path: str, top: int) -> List[int]:
+    """Most requested pages in an access log, hottest first"""
+    counts = Counter()
+    with open(log_path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            match = PAGE_REQUEST_RE.search(line)
+            if match:
+                page = int(match.group(1))
+                if 1 <= page <= 604:
+                    counts[page] += 1
+    return [page for page, _ in counts.most_common(top)]
+
+
+def read_through(path: str) -> int:
+    """Read a file once so it sits in the OS page cache; returns bytes read"""
+    total = 0
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                return total
+            total += len(chunk)
+
+
+def adjacent_pages(page_number: int, lookahead: int = PREFETCH_PAGES) -> List[int]:
+    """Pages a reader may turn to next: the following ones first, then the previous ones"""
+    following = range(page_number + 1, page_number + lookahead + 1)
+    previous = range(page_number - 1, page_number - lookahead - 1, -1)
+    return [page for page in [*following, *previous] if 1 <= page <= 604]
+
+
+class PagePrefetcher:
+    """Warms the fonts of the pages around the ones being read, each once per build"""
+
+    def __init__(self):
+        self._signature = None
+        self._claimed = set()
+
+    def claim(self, store: QulStore, pages: List[int]) -> List[int]:
+        """Pages of `pages` not warmed yet for this build, marked as taken"""
+        if self._signature != store.signature:
+            self._signature = store.signature
+            self._claimed = set()
+        pending = [page for page in pages if page not in self._claimed]
+        self._claimed.update(pending)
+        return pending
+
+    def warm(self, store: QulStore, pages: List[int]):
+        """Read the pages' fonts into the OS file cache"""
+        for page_number in pages:
+            font_path = os.path.join(FONTS_DIR, f"p{page_number}.woff")
+            if os.path.exists(font_path):
+                read_through(font_path)
+
+
+class WarmupState:
+    """Progress of startup warming, read by the health endpoint"""
+
+    def __init__(self):
+        self.ready = False
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.pages: List[int] = []
+        # Inventory taken once while warming, so probes never touch the disk
+        self.font_files = 0
+        self.legacy_database = False
+        self.steps: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+
+    @property
+    def degraded(self) -> List[str]:
+        """Optional steps that failed"""
+        return [name for name in self.errors if name not in REQUIRED_STEPS]
+
+    def to_dict(self) -> dict:
+        return {
+            "ready": self.ready,
+            "degraded": self.degraded,
+            "pages": len(self.pages),
+            "font_files": self.font_files,
+            "steps_ms": self.steps,
+            "errors": self.errors,
+            "duration_ms": round((self.finished_at - self.started_at) * 1000, 1)
+            if self.finished_at and self.started_at else None
+        }
+
+
+def select_pages() -> List[int]:
+    """Hot pages from the access log when configured, else WARMUP_PAGES"""
+    if WARMUP_ACCESS_LOG and os.path.exists(WARMUP_ACCESS_LOG):
+        pages = hot_pages_from_log(WARMUP_ACCESS_LOG, WARMUP_TOP_PAGES)
+        if pages:
+            return pages
+    return parse_page_list(WARMUP_PAGES)
+
+
+def warm_caches(state: WarmupState):
+    """Run every warming step, recording its duration or its error"""
+    state.started_at = time.time()
+    # A worker warms again when the parent's warming failed
+    state.finished_at = None
+    state.errors.clear()
+    state.pages = select_pages()
+
+    def step(name, func):
+        started = time.perf_counter()
+        try:
+            func()
+        except Exception as e:
+            state.errors[name] = str(e)
+        state.steps[name] = round((time.perf_counter() - started) * 1000, 1)
+
+    def page_bodies():
+        # Normally encoded by the store warmer; covers a store loaded without it
+        store = qul_manager.get_store()
+        if store.bodies is None:
+            encode_page_bodies(store)
+
+    def fonts():
+        available = set(os.listdir(FONTS_DIR)) if os.path.isdir(FONTS_DIR) else set()
+        state.font_files = sum(1 for name in available if name.endswith(".woff"))
+        for page_number in state.pages:
+            font_file = f"p{page_number}.woff"
+            if font_file in available:
+                read_through(os.path.join(FONTS_DIR, font_file))
+        # Versioned font URLs and preload links need every font's hash
+        font_hashes.refresh()
+
+    def search_indexes():
+        # Search scans words with LIKE, so it reads both files end to end
+        state.legacy_database = os.path.exists(LEGACY_DB_PATH)
+        for path in (QUL_DB_PATH, LEGACY_DB_PATH):
+            if os.path.exists(path):
+                read_through(path)
+
+    step("page_store", qul_manager.get_store)
+    step("page_bodies", page_bodies)
+    step("fonts", fonts)
+    step("search_indexes", search_indexes)
+
+    state.finished_at = time.time()
+    state.ready = not any(name in state.errors for name in REQUIRED_STEPS)
+    if not state.ready:
+        print(f"Warming failed: {', '.join(name for name in REQUIRED_STEPS if name in state.errors)}")
+    elif state.degraded:
+        print(f"Caches warm ({len(state.pages)} pages) in {state.to_dict()['duration_ms']} ms, "
+              f"degraded: {', '.join(state.degraded)}")
+    else:
+        print(f"Caches warm ({len(state.pages)} pages) in {state.to_dict()['duration_ms']} ms")
+
+
+async def run_warmup(state: WarmupState):
+    """Warm caches in a worker thread so probes are answered meanwhile"""
+    if state.ready:
+        return  # Warmed in the parent before serve.py forked this worker
+    await asyncio.get_running_loop().run_in_executor(None, warm_caches, state)
+
+
+warmup_state = WarmupState()
+page_prefetcher = PagePrefetcher()
@@ -0,0 +1,421 @@
+"""
+Synthetic full-size Mushaf for performance testing
+
+Generates a schema-correct tree with the real scale of the Quran - 114 surahs
+with their true ayah counts, 83,668 words and 604 pages of 15 lines - without
+the QUL source databases. Text is random Arabic drawn from a Zipf vocabulary,
+ayah lengths are lognormal around a per-surah mean, and the same seed always
+produces byte-identical databases.
+
+The output directory mirrors the repository layout, so the app and the load
+test can run against it directly:
+
+    <output>/app/database/qul_complete.db   QUL schema, validated on completion
+    <output>/app/database/quran.db          legacy schema: two layouts, three recitations with timings
+    <output>/static/fonts/p{n}.woff         placeholder page fonts (not renderable)
+    <output>/static/audio/*.mp3             silent per-ayah MP3s, only for --audio-surahs
+
+The legacy schema ties each word to a single line, so words belong to layout
+1 and layout 2 (16 lines per page) only carries pages, lines and positions.
+
+Usage:
+    python -m benchmarks.fixtures --seed 1 --output fixtures/synthetic
+    python -m benchmarks.load_test --root fixtures/synthetic
+"""
+
+from math import log
+from typing import List, Tuple
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from app.database.recitation_stats import refresh_all_recitation_stats
+from app.database.validation import validate_qul_database
+from app.warmup import parse_page_list
+from create_complete_qul_database import INDEXES, TABLES
+from init_db import create_database
+
+# Ayahs per surah, 6,236 in total
+VERSE_COUNTS = (
+    7, 286, 200, 176, 120, 165, 206, 75, 129, 109, 123, 111, 43, 52, 99, 128, 111, 110, 98, 135,
+    112, 78, 118, 64, 77, 227, 93, 88, 69, 60, 34, 30, 73, 54, 45, 83, 182, 88, 75, 85,
+    54, 53, 89, 59, 37, 35, 38, 29, 18, 45, 60, 49, 62, 55, 78, 96, 29, 22, 24, 13,
+    14, 11, 11, 18, 12, 12, 30, 52, 52, 44, 28, 28, 20, 56, 40, 31, 50, 40, 46, 42,
+    29, 19, 36, 25, 22, 17, 19, 26, 30, 20, 15, 21, 11, 8, 8, 19, 5, 8, 8, 11,
+    11, 8, 3, 9, 5, 4, 7, 3, 6, 3, 5, 4, 5, 6,
+)
+TOTAL_WORDS = 83668
+# Pages 1 and 2 are the short opening pages
+PAGE_LINES = (8, 8) + (15,) * 602
+# Surah 1 fills page 1: its name line and one line per ayah
+FATIHA_LINES = 7
+# Surahs 1 and 9 have no basmallah line
+NO_BASMALLAH = (1, 9)
+
+VOCABULARY_SIZE = 15000
+ZIPF_EXPONENT = 1.1
+
+LETTERS = "ابتثجحخدذرزسشصضطظعغفقكلمنهوي"
+MARKS = "َُِّْ"
+LATIN = dict(zip(LETTERS, (
+    "a", "b", "t", "th", "j", "h", "kh", "d", "dh", "r", "z", "s", "sh", "s",
+    "d", "t", "z", "'", "gh", "f", "q", "k", "l", "m", "n", "h", "w", "y"
+)))
+ARABIC_DIGITS = "٠١٢٣٤٥٦٧٨٩"
+ENGLISH = (
+    "the", "and", "of", "those", "who", "believe", "Lord", "day", "mercy", "earth", "heavens", "guidance",
+    "path", "people", "book", "signs", "truth", "light", "patience", "reward", "knowing", "wise", "forgiving",
+    "prayer", "charity", "messenger", "fire", "garden", "water", "night", "morning", "witness", "covenant",
+)
+
+# (reciter_name, style, tempo): tempo scales word durations
+RECITATIONS = (
+    ("Synthetic Reciter Murattal", "Murattal", 1.0),
+    ("Synthetic Reciter Mujawwad", "Mujawwad", 1.7),
+    ("Synthetic Reciter Muallim", "Muallim", 2.3),
+)
+
+# Legacy layouts: (id, name, lines_per_page, font_name)
+LAYOUTS = (
+    (1, "Synthetic Madani 15 lines", 15, "synthetic-15-lines"),
+    (2, "Synthetic Reflow 16 lines", 16, "synthetic-16-lines"),
+)
+PAGE_WIDTH = 1000
+LINE_HEIGHT = 70
+MARGIN = 50
+
+# Silent MPEG-1 Layer III frame: 32 kbps mono at 44.1 kHz, 1152 samples
+MP3_FRAME = b"\xff\xfb\x10\xc0" + bytes(100)
+MP3_FRAME_MS = 1152 / 44100 * 1000
+
+
+def arabic_digits(number: int) -> str:
+    return "".join(ARABIC_DIGITS[int(digit)] for digit in str(number))
+
+
+def largest_remainder(total: int, weights: List[float], minimum: int = 0) -> List[int]:
+    """Split `total` into integers proportional to `weights`, each at least `minimum`"""
+    spare = total - minimum * len(weights)
+    scale = spare / sum(weights)
+    shares = [weight * scale for weight in weights]
+    counts = [minimum + int(share) for share in shares]
+    order = sorted(range(len(weights)), key=lambda i: shares[i] - int(shares[i]), reverse=True)
+    for i in order[:total - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+
+class Mushaf:
+    """The generated text and its 15-line layout"""
+
+    def __init__(self, seed: int):
+        rng = random.Random(seed)
+        self.vocabulary = self._vocabulary(rng)
+        self.ayah_lengths = self._ayah_lengths(rng)
+        # words: (id, surah, ayah, position, text, vocabulary index or None for ayah markers)
+        self.words: List[Tuple[int, int, int, int, str, int]] = []
+        self._write_words(rng)
+        # lines: (page, line, line_type, is_centered, first_id, last_id, surah)
+        self.lines: List[Tuple] = []
+        self._lay_out(rng)
+
+    def _vocabulary(self, rng: random.Random) -> List[str]:
+        words = {}
+        while len(words) < VOCABULARY_SIZE:
+            word = "".join(rng.choice(LETTERS) + rng.choice(MARKS) for _ in range(rng.randint(2, 6)))
+            words.setdefault(word, None)
+        return list(words)
+
+    def _ayah_lengths(self, rng: random.Random) -> List[List[int]]:
+        """Words per ayah, ayah marker included, summing to TOTAL_WORDS"""
+        lengths = []
+        for verses in VERSE_COUNTS:
+            # Long surahs tend to have long ayahs
+            mean = rng.uniform(4, 10) + 12 * min(verses, 200) / 200 * rng.random()
+            lengths.append([max(2, round(rng.lognormvariate(log(mean), 0.45))) for _ in range(verses)])
+
+        flat = [length for surah in lengths for length in surah]
+        scaled = largest_remainder(TOTAL_WORDS, flat, 2)
+        position = 0
+        for surah in lengths:
+            surah[:] = scaled[position:position + len(surah)]
+            position += len(surah)
+        return lengths
+
+    def _write_words(self, rng: random.Random):
+        cumulative, total = [], 0.0
+        for rank in range(1, VOCABULARY_SIZE + 1):
+            total += 1 / rank ** ZIPF_EXPONENT
+            cumulative.append(total)
+        drawn = iter(rng.choices(range(VOCABULARY_SIZE), cum_weights=cumulative, k=TOTAL_WORDS))
+
+        word_id = 1
+        for surah, ayahs in enumerate(self.ayah_lengths, start=1):
+            for ayah, length in enumerate(ayahs, start=1):
+                for position in range(1, length):
+                    index = next(drawn)
+                    self.words.append((word_id, surah, ayah, position, self.vocabulary[index], index))
+                    word_id += 1
+                self.words.append((word_id, surah, ayah, length, arabic_digits(ayah), None))
+                word_id += 1
+
+    def _lay_out(self, rng: random.Random):
+        """Assign ayah lines to surahs by word count, then fill PAGE_LINES in order"""
+        surah_words = [sum(ayahs) for ayahs in self.ayah_lengths]
+        headers = len(VERSE_COUNTS) * 2 - len(NO_BASMALLAH)
+        ayah_lines = sum(PAGE_LINES) - headers
+        surah_lines = [FATIHA_LINES] + largest_remainder(ayah_lines - FATIHA_LINES, surah_words[1:], 1)
+
+        sequence = []
+        first_id = 1
+        for surah, (words, count) in enumerate(zip(surah_words, surah_lines), start=1):
+            sequence.append(("surah_name", 1, None, None, surah))
+            if surah not in NO_BASMALLAH:
+                sequence.append(("basmallah", 1, None, None, None))
+            if surah == 1:
+                # Surah 1 keeps one ayah per line
+                sizes = self.ayah_lengths[0]
+            else:
+                sizes = largest_remainder(words, [rng.uniform(0.75, 1.25) for _ in range(count)], 1)
+            for size in sizes:
+                sequence.append(("ayah", int(size < 5), first_id, first_id + size - 1, None))
+                first_id += size
+
+        position = 0
+        for page, capacity in enumerate(PAGE_LINES, start=1):
+            for line in range(1, capacity + 1):
+                self.lines.append((page, line) + sequence[position])
+                position += 1
+
+
+def write_qul_database(path: str, mushaf: Mushaf, seed: int):
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        cursor = conn.cursor()
+        for table in TABLES:
+            cursor.execute(table["create"])
+
+        cursor.executemany(TABLES[0]["insert"], (
+            (word_id, f"{surah}:{ayah}:{position}", surah, ayah, position, text)
+            for word_id, surah, ayah, position, text, _ in mushaf.words
+        ))
+        cursor.executemany(TABLES[1]["insert"], mushaf.lines)
+
+        rng = random.Random(seed)
+        order = list(range(1, len(VERSE_COUNTS) + 1))
+        rng.shuffle(order)
+        cursor.executemany(TABLES[2]["insert"], (
+            (surah, f"Surah {surah}", f"Surah {surah}", mushaf.vocabulary[surah], order[surah - 1],
+             "madinah" if rng.random() < 0.25 else "makkah", verses, int(surah != 9))
+            for surah, verses in enumerate(VERSE_COUNTS, start=1)
+        ))
+
+        cursor.execute("CREATE TABLE layout_info (name TEXT, number_of_pages INTEGER, lines_per_page INTEGER, font_name TEXT)")
+        cursor.execute("INSERT INTO layout_info VALUES ('Synthetic QPC Hafs', ?, 15, 'synthetic-page-specific')",
+                       (len(PAGE_LINES),))
+        cursor.execute("CREATE TABLE build_info (source_fingerprint TEXT, built_at TEXT)")
+        cursor.execute("INSERT INTO build_info VALUES (?, '2000-01-01 00:00:00')", (f"synthetic-seed-{seed}",))
+
+        for index_sql in INDEXES:
+            cursor.execute(index_sql)
+        cursor.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def word_widths(mushaf: Mushaf) -> List[int]:
+    """Rendered width of every word, by its letter count"""
+    return [40 + 22 * (len(text) // 2) for _, _, _, _, text, _ in mushaf.words]
+
+
+def layout_positions(mushaf: Mushaf, widths: List[int], lines_per_page: int):
+    """(page, line, [(word_id, x, width)]) of every line when reflowed to `lines_per_page`"""
+    for index, (_, _, line_type, _, first_id, last_id, _) in enumerate(mushaf.lines):
+        page, line = divmod(index, lines_per_page)
+        placed = []
+        if line_type == "ayah":
+            # Right to left, spread across the line
+            x = PAGE_WIDTH - MARGIN
+            for word_id in range(first_id, last_id + 1):
+                x -= widths[word_id - 1]
+                placed.append((word_id, x, widths[word_id - 1]))
+                x -= 8
+        yield page + 1, line + 1, placed
+
+
+def write_legacy_database(path: str, mushaf: Mushaf, seed: int):
+    create_database(path)
+    rng = random.Random(seed + 1)
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        cursor = conn.cursor()
+        widths = word_widths(mushaf)
+
+        pages, lines, positions = [], [], []
+        word_lines = {}
+        page_id = line_id = 0
+        for layout_id, name, lines_per_page, font_name in LAYOUTS:
+            total_pages = -(-len(mushaf.lines) // lines_per_page)
+            cursor.execute("INSERT INTO mushaf_layouts VALUES (?, ?, ?, ?, ?)",
+                           (layout_id, name, total_pages, lines_per_page, font_name))
+            for page, line, placed in layout_positions(mushaf, widths, lines_per_page):
+                if line == 1:
+                    page_id += 1
+                    pages.append((page_id, layout_id, page, f"/static/images/{layout_id}/page_{page:03d}.png"))
+                line_id += 1
+                lines.append((line_id, page_id, line))
+                y = MARGIN + (line - 1) * LINE_HEIGHT
+                for word_id, x, width in placed:
+                    positions.append((word_id, layout_id, page, line, x, y, width, LINE_HEIGHT - 10))
+                    if layout_id == 1:
+                        word_lines[word_id] = line_id
+
+        cursor.executemany("INSERT INTO pages VALUES (?, ?, ?, ?)", pages)
+        cursor.executemany("INSERT INTO lines VALUES (?, ?, ?)", lines)
+
+        line_starts = {}
+        words = []
+        for word_id, surah, ayah, _, text, index in mushaf.words:
+            line_id = word_lines[word_id]
+            position = word_id - line_starts.setdefault(line_id, word_id) + 1
+            if index is None:
+                translation, transliteration = f"({ayah})", f"({ayah})"
+            else:
+                first, second = index % len(ENGLISH), index // len(ENGLISH) % len(ENGLISH)
+                translation = f"{ENGLISH[first]} {ENGLISH[second]}" if index >= len(ENGLISH) else ENGLISH[first]
+                transliteration = "".join(LATIN.get(char, "") for char in text)
+            words.append((word_id, line_id, position, surah, ayah, text, translation, transliteration))
+        cursor.executemany("""
+            INSERT INTO words (id, line_id, word_position, surah_number, ayah_number,
+                               word_text_uthmani, translation_en, transliteration_en)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, words)
+        cursor.executemany("""
+            INSERT INTO word_positions (word_id, mushaf_layout_id, page_number, line_number,
+                                        x_coordinate, y_coordinate, width, height)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, positions)
+
+        timings = []
+        for recitation_id, (reciter, style, tempo) in enumerate(RECITATIONS, start=1):
+            cursor.execute("INSERT INTO recitations VALUES (?, ?, ?)", (recitation_id, reciter, style))
+            slug = style.lower()
+            clock, current = 0, None
+            for word_id, surah, ayah, _, text, _ in mushaf.words:
+                if (surah, ayah) != current:
+                    # Each ayah is its own file, timed from zero
+                    clock, current = rng.randint(80, 200), (surah, ayah)
+                duration = int((140 + 35 * len(text)) * tempo * rng.uniform(0.8, 1.25))
+                timings.append((word_id, recitation_id, clock, clock + duration,
+                                f"/static/audio/{surah:03d}{ayah:03d}_{slug}.mp3"))
+                clock += duration + rng.randint(20, 90)
+        cursor.executemany("""
+            INSERT INTO audio_timings (word_id, recitation_id, start_time, end_time, audio_file_url)
+            VALUES (?, ?, ?, ?, ?)
+        """, timings)
+        conn.commit()
+
+        refresh_all_recitation_stats(conn)
+        cursor.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def write_fonts(fonts_dir: str, pages: int):
+    os.makedirs(fonts_dir, exist_ok=True)
+    for page in range(1, pages + 1):
+        with open(os.path.join(fonts_dir, f"p{page}.woff"), "wb") as f:
+            f.write(b"wOFF" + f"synthetic placeholder for page {page}".encode())
+
+
+def write_audio(audio_dir: str, quran_db: str, surahs: List[int]) -> int:
+    """Silent MP3s long enough for every timed ayah of `surahs`; returns the file count"""
+    os.makedirs(audio_dir, exist_ok=True)
+    conn = sqlite3.connect(quran_db)
+    try:
+        placeholders = ",".join("?" * len(surahs))
+        rows = conn.execute(f"""
+            SELECT at.audio_file_url, MAX(at.end_time)
+            FROM audio_timings at JOIN words w ON at.word_id = w.id
+            WHERE w.surah_number IN ({placeholders})
+            GROUP BY at.audio_file_url
+            ORDER BY at.audio_file_url
+        """, surahs).fetchall()
+    finally:
+        conn.close()
+    for url, end_ms in rows:
+        frames = int((end_ms + 300) / MP3_FRAME_MS) + 1
+        with open(os.path.join(audio_dir, os.path.basename(url)), "wb") as f:
+            f.write(MP3_FRAME * frames)
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic full-size Mushaf for performance tests")
+    parser.add_argument("--seed", type=int, default=1, help="Seed; the same seed gives identical databases")
+    parser.add_argument("--output", default="fixtures/synthetic", help="Root directory to write the tree to")
+    parser.add_argument("--no-fonts", action="store_true", help="Skip the placeholder page fonts")
+    parser.add_argument("--audio-surahs", default="", help='Surahs to write silent MP3s for, e.g. "1,112-114"')
+    args = parser.parse_args()
+
+    print("🧪 SYNTHETIC MUSHAF FIXTURE")
+    print("=" * 60)
+    started = time.perf_counter()
+
+    database_dir = os.path.join(args.output, "app", "database")
+    os.makedirs(database_dir, exist_ok=True)
+    qul_db = os.path.join(database_dir, "qul_complete.db")
+    quran_db = os.path.join(database_dir, "quran.db")
+    for path in (qul_db, quran_db):
+        if os.path.exists(path):
+            os.remove(path)
+
+    print(f"\n📝 Generating text and layout (seed {args.seed})...")
+    mushaf = Mushaf(args.seed)
+    print(f"   ✅ {len(mushaf.words):,} words, {len(mushaf.lines):,} lines on {len(PAGE_LINES)} pages")
+
+    print("\n📦 Writing QUL database...")
+    write_qul_database(qul_db, mushaf, args.seed)
+    print(f"   ✅ {qul_db}")
+
+    print("\n📦 Writing legacy database...")
+    write_legacy_database(quran_db, mushaf, args.seed)
+    print(f"   ✅ {quran_db} ({len(LAYOUTS)} layouts, {len(RECITATIONS)} recitations)")
+
+    fonts_dir = os.path.join(args.output, "static", "fonts")
+    if not args.no_fonts:
+        write_fonts(fonts_dir, len(PAGE_LINES))
+        print(f"\n🔤 Wrote {len(PAGE_LINES)} placeholder fonts to {fonts_dir}")
+
+    surahs = [surah for surah in parse_page_list(args.audio_surahs) if surah <= len(VERSE_COUNTS)]
+    if surahs:
+        count = write_audio(os.path.join(args.output, "static", "audio"), quran_db, surahs)
+        print(f"\n🔊 Wrote {count:,} silent ayah recordings")
+
+    print("\n🔍 Validating QUL database...")
+    report = validate_qul_database(qul_db, None if args.no_fonts else fonts_dir)
+    for error in report.errors:
+        print(f"   ❌ {error}")
+    for warning in report.warnings:
+        print(f"   ⚠️ {warning}")
+    print(("   ✅ " if report.ok else "   ❌ ") + report.summary())
+
+    print(f"\n✅ Fixture written to {args.output} in {time.perf_counter() - started:.1f}s")
+    sys.exit(0 if report.ok else 1)
+
+
+if __name__ == "__main__":
+    main()
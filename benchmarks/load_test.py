@@ -0,0 +1,310 @@
+"""
+Load test for the Mushaf API
+
+Boots the app in-process against a fixture directory (or targets a running
+server over HTTP), drives a mix of realistic client sessions at a fixed
+concurrency and writes throughput and latency percentiles per endpoint to
+a JSON file. A previous result file can be given as a baseline; the run
+fails when any endpoint's p95 regresses by more than the threshold.
+
+Usage:
+    python -m benchmarks.load_test --root fixtures/full --concurrency 32 --duration 30
+    python -m benchmarks.load_test --url http://localhost:8000 --output after.json --baseline before.json
+"""
+
+from typing import Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import importlib
+import os
+import random
+import sqlite3
+import sys
+import time
+from urllib.parse import quote
+
+import httpx
+import orjson
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUL_PAGE = "/api/v1/qul/qul/page/{page}"
+QUL_SEARCH = "/api/v1/qul/qul/search?query={query}"
+AUDIO_TIMINGS = "/api/v1/audio/surah/{surah}/recitation/{recitation}/timings"
+AYAH_AUDIO = "/api/v1/audio/ayah/{surah}/{ayah}/recitation/{recitation}"
+
+# Relative weight of each session type in the default mix
+DEFAULT_MIX = {
+    "sequential_reading": 50,
+    "random_pages": 25,
+    "search_burst": 15,
+    "audio_timings": 10,
+}
+
+FALLBACK_WORDS = ["ٱللَّهِ", "ٱلرَّحْمَٰنِ", "رَبِّ", "ٱلْحَمْدُ"]
+
+
+class Fixture:
+    """What the traffic generator needs to know about the data being served"""
+
+    def __init__(self, root: str):
+        self.total_pages = 604
+        self.words: List[str] = []
+        self.recited_ayahs: List[Tuple[int, int, int]] = []
+
+        qul_db = os.path.join(root, "app", "database", "qul_complete.db")
+        if os.path.exists(qul_db):
+            conn = sqlite3.connect(f"file:{qul_db}?mode=ro", uri=True)
+            try:
+                self.total_pages = conn.execute("SELECT MAX(page_number) FROM pages").fetchone()[0] or 604
+                self.words = [row[0] for row in conn.execute(
+                    "SELECT text FROM words WHERE length(text) >= 3 ORDER BY id LIMIT 2000"
+                )]
+            finally:
+                conn.close()
+
+        quran_db = os.path.join(root, "app", "database", "quran.db")
+        if os.path.exists(quran_db):
+            conn = sqlite3.connect(f"file:{quran_db}?mode=ro", uri=True)
+            try:
+                self.recited_ayahs = conn.execute("""
+                    SELECT DISTINCT at.recitation_id, w.surah_number, w.ayah_number
+                    FROM audio_timings at JOIN words w ON at.word_id = w.id
+                """).fetchall()
+            finally:
+                conn.close()
+
+        if not self.words:
+            self.words = FALLBACK_WORDS
+
+
+def sequential_reading(rng: random.Random, fixture: Fixture) -> List[Tuple[str, str]]:
+    """A reader turning several pages forward from a random starting page"""
+    start = rng.randint(1, fixture.total_pages)
+    count = rng.randint(3, 10)
+    return [("qul_page", QUL_PAGE.format(page=min(start + i, fixture.total_pages))) for i in range(count)]
+
+
+def random_pages(rng: random.Random, fixture: Fixture) -> List[Tuple[str, str]]:
+    """Jumps between unrelated pages, e.g. from a table of contents"""
+    return [("qul_page", QUL_PAGE.format(page=rng.randint(1, fixture.total_pages)))
+            for _ in range(rng.randint(1, 4))]
+
+
+def search_burst(rng: random.Random, fixture: Fixture) -> List[Tuple[str, str]]:
+    """Type-ahead search: one request per typed character"""
+    word = rng.choice(fixture.words)
+    return [("qul_search", QUL_SEARCH.format(query=quote(word[:length])))
+            for length in range(1, len(word) + 1)]
+
+
+def audio_timings(rng: random.Random, fixture: Fixture) -> List[Tuple[str, str]]:
+    """Loading a surah's timings, then a few ayahs of it"""
+    if not fixture.recited_ayahs:
+        return [("audio_timings", AUDIO_TIMINGS.format(surah=1, recitation=1))]
+    recitation, surah, ayah = rng.choice(fixture.recited_ayahs)
+    requests = [("audio_timings", AUDIO_TIMINGS.format(surah=surah, recitation=recitation))]
+    for offset in range(rng.randint(1, 3)):
+        requests.append(("ayah_audio", AYAH_AUDIO.format(surah=surah, ayah=ayah + offset, recitation=recitation)))
+    return requests
+
+
+SESSIONS = {
+    "sequential_reading": sequential_reading,
+    "random_pages": random_pages,
+    "search_burst": search_burst,
+    "audio_timings": audio_timings,
+}
+
+
+def parse_mix(spec: Optional[str]) -> Dict[str, float]:
+    """Session weights from "sequential_reading=3,search_burst=1" (default mix if empty)"""
+    if not spec:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SESSIONS:
+            raise ValueError(f"Unknown session type {name!r}; choose from {', '.join(SESSIONS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(fraction * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(samples: Dict[str, List[Tuple[float, int]]], elapsed: float) -> dict:
+    endpoints = {}
+    for endpoint, values in sorted(samples.items()):
+        latencies = sorted(latency for latency, _ in values)
+        # 4xx answers (e.g. an ayah past the end of a surah) are valid responses
+        errors = sum(1 for _, status in values if status >= 500 or status == 0)
+        endpoints[endpoint] = {
+            "requests": len(values),
+            "errors": errors,
+            "throughput_rps": round(len(values) / elapsed, 2),
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+            "max_ms": round(latencies[-1] * 1000, 3),
+        }
+    total = sum(endpoint["requests"] for endpoint in endpoints.values())
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "total_requests": total,
+        "total_errors": sum(endpoint["errors"] for endpoint in endpoints.values()),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "endpoints": endpoints,
+    }
+
+
+async def run_worker(client: httpx.AsyncClient, rng: random.Random, fixture: Fixture,
+                     mix: Dict[str, float], deadline: float, remaining: List[int],
+                     samples: Dict[str, List[Tuple[float, int]]]):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    while time.perf_counter() < deadline and remaining[0] > 0:
+        session = SESSIONS[rng.choices(names, weights)[0]]
+        for endpoint, path in session(rng, fixture):
+            if time.perf_counter() >= deadline or remaining[0] <= 0:
+                return
+            remaining[0] -= 1
+            started = time.perf_counter()
+            try:
+                response = await client.get(path)
+                await response.aread()
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 0
+            samples.setdefault(endpoint, []).append((time.perf_counter() - started, status))
+
+
+async def start_app(root: str):
+    """Import the app with `root` as working directory and run its startup"""
+    os.chdir(root)
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    main = importlib.import_module("main")
+    warmup = importlib.import_module("app.warmup")
+    await main.app.router.startup()
+    while not warmup.warmup_state.ready:
+        await asyncio.sleep(0.05)
+    return main.app
+
+
+async def run_load_test(args) -> dict:
+    root = os.path.abspath(args.root)
+    fixture = Fixture(root)
+    mix = parse_mix(args.mix)
+
+    app = None
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout,
+                                   limits=httpx.Limits(max_connections=args.concurrency))
+    else:
+        app = await start_app(root)
+        client = httpx.AsyncClient(app=app, base_url="http://bench", timeout=args.timeout)
+
+    samples: Dict[str, List[Tuple[float, int]]] = {}
+    remaining = [args.requests or sys.maxsize]
+    try:
+        # Short warm-up so connection setup and first-touch costs stay out of the results
+        if args.warmup:
+            await run_worker(client, random.Random(args.seed - 1), fixture, mix,
+                             time.perf_counter() + args.warmup, [sys.maxsize], {})
+
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(
+            run_worker(client, random.Random(args.seed + worker), fixture, mix, deadline, remaining, samples)
+            for worker in range(args.concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+    finally:
+        await client.aclose()
+        if app is not None:
+            await app.router.shutdown()
+
+    return {
+        "meta": {
+            "target": args.url or "in-process",
+            "root": root,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "request_limit": args.requests,
+            "seed": args.seed,
+            "mix": mix,
+            "python": sys.version.split()[0],
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        **summarize(samples, elapsed),
+    }
+
+
+def compare(result: dict, baseline: dict, threshold: float) -> List[str]:
+    """Endpoints whose p95 got slower than the baseline by more than `threshold` percent"""
+    regressions = []
+    for endpoint, stats in result["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(endpoint)
+        if not before or not before["p95_ms"]:
+            continue
+        change = (stats["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100
+        if change > threshold:
+            regressions.append(f"{endpoint}: p95 {before['p95_ms']:.2f} -> {stats['p95_ms']:.2f} ms (+{change:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Mushaf API")
+    parser.add_argument("--root", default=REPO_ROOT, help="Directory holding app/database and static (in-process mode)")
+    parser.add_argument("--url", help="Target a running server instead of booting the app in-process")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent simulated clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run")
+    parser.add_argument("--requests", type=int, default=0, help="Stop after this many requests (0 = no limit)")
+    parser.add_argument("--warmup", type=float, default=1.0, help="Seconds of unrecorded traffic first")
+    parser.add_argument("--mix", help="Session weights, e.g. sequential_reading=3,search_burst=1")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for the traffic")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--output", default="bench_results/load.json", help="Where to write the JSON results")
+    parser.add_argument("--baseline", help="Earlier results to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed p95 regression in percent")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+
+    print("🚦 LOAD TEST")
+    print("=" * 60)
+    result = asyncio.run(run_load_test(args))
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "wb") as f:
+        f.write(orjson.dumps(result, option=orjson.OPT_INDENT_2))
+
+    print(f"{'endpoint':<16}{'requests':>10}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for endpoint, stats in result["endpoints"].items():
+        print(f"{endpoint:<16}{stats['requests']:>10}{stats['errors']:>8}{stats['throughput_rps']:>10.1f}"
+              f"{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+    print(f"\n📊 {result['total_requests']:,} requests at {result['throughput_rps']:.1f} req/s")
+    print(f"✅ Results written to {output}")
+
+    if baseline_path:
+        with open(baseline_path, "rb") as f:
+            regressions = compare(result, orjson.loads(f.read()), args.threshold)
+        if regressions:
+            print(f"\n❌ p95 regressions over {args.threshold:.0f}%:")
+            for regression in regressions:
+                print(f"   {regression}")
+            sys.exit(1)
+        print(f"✅ No p95 regression over {args.threshold:.0f}% against {baseline_path}")
+
+
+if __name__ == "__main__":
+    main()
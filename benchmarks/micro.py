@@ -0,0 +1,255 @@
+"""
+Micro-benchmarks for the CPU hot paths
+
+Each case isolates one function that dominates request CPU and runs it on
+deterministic synthetic rows, so results do not depend on the databases on
+disk. Timings are calibrated pyperf-style: the loop count is raised until one
+sample takes at least --min-time, then several samples are taken with the
+garbage collector paused and the median time per call is reported.
+
+Usage:
+    python -m benchmarks.micro --output bench_results/micro.json
+    python -m benchmarks.micro --baseline bench_results/micro-main.json --threshold 20
+"""
+
+from statistics import mean, median, stdev
+from typing import Callable, Dict, List, Tuple
+import argparse
+import fnmatch
+import gc
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+import orjson
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from app.audio.timings import group_surah_timings
+from app.database.qul_store import QulStore
+from app.models.domain import Page
+from app.responses import FastJSONResponse, MsgPackResponse, msgpack
+from app.routers.mushaf import line_words
+from app.routers.qul_mushaf import build_search_results
+from app.routers.search import format_search_results
+
+LETTERS = "ابتثجحخدذرزسشصضطظعغفقكلمنهوي"
+MARKS = "َُِّْ"
+
+# Al-Baqarah sized surah for the timings case
+TIMING_AYAHS = 286
+WORDS_PER_LINE = 9
+LINES_PER_PAGE = 15
+
+
+def arabic_word(rng: random.Random) -> str:
+    return "".join(rng.choice(LETTERS) + rng.choice(MARKS) for _ in range(rng.randint(2, 6)))
+
+
+def write_qul_database(path: str, rng: random.Random, pages: int = 20):
+    """Small QUL-schema database: `pages` full pages of ayah lines"""
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE words (id INTEGER PRIMARY KEY, location TEXT, surah INTEGER, ayah INTEGER, word INTEGER, text TEXT);
+        CREATE TABLE pages (page_number INTEGER, line_number INTEGER, line_type TEXT, is_centered INTEGER,
+                            first_word_id INTEGER, last_word_id INTEGER, surah_number INTEGER);
+        CREATE TABLE chapters (id INTEGER PRIMARY KEY, name TEXT, name_simple TEXT, name_arabic TEXT,
+                               revelation_order INTEGER, revelation_place TEXT, verses_count INTEGER, bismillah_pre INTEGER);
+        CREATE TABLE layout_info (name TEXT, number_of_pages INTEGER, lines_per_page INTEGER, font_name TEXT);
+    """)
+    words, lines = [], []
+    word_id, ayah, position = 1, 1, 1
+    for page in range(1, pages + 1):
+        for line in range(1, LINES_PER_PAGE + 1):
+            first = word_id
+            for _ in range(WORDS_PER_LINE):
+                words.append((word_id, f"2:{ayah}:{position}", 2, ayah, position, arabic_word(rng)))
+                word_id += 1
+                position += 1
+                if rng.random() < 0.08:
+                    ayah, position = ayah + 1, 1
+            lines.append((page, line, "ayah", 0, first, word_id - 1, None))
+    conn.executemany("INSERT INTO words VALUES (?, ?, ?, ?, ?, ?)", words)
+    conn.executemany("INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)", lines)
+    conn.execute("INSERT INTO chapters VALUES (2, 'Al-Baqarah', 'Al-Baqarah', 'البقرة', 87, 'madinah', ?, 1)", (ayah,))
+    conn.execute("INSERT INTO layout_info VALUES ('Synthetic', ?, 15, 'synthetic')", (pages,))
+    conn.commit()
+    conn.close()
+
+
+class Data:
+    """Synthetic inputs shared by the cases"""
+
+    def __init__(self, seed: int):
+        rng = random.Random(seed)
+        self._tmpdir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(self._tmpdir.name, "qul.db")
+        write_qul_database(db_path, rng)
+        self.store = QulStore(db_path)
+
+        self.page_rows = [
+            (1, line.line_number, line.line_type, int(line.is_centered),
+             line.first_word_id, line.last_word_id, line.surah_number)
+            for line in self.store.page(1).lines
+        ]
+        self.page = self.store.page(1)
+        self.page_dict = self.page.to_dict()
+        self.page_compact = self.page.to_compact()
+
+        self.legacy_lines = [
+            [
+                (word.id, position, word.surah, word.ayah, word.text, f"translation {word.id}",
+                 f"translit {word.id}", rng.random() * 800, rng.random() * 1200, 40.0, 30.0)
+                for position, word in enumerate(line.words, start=1)
+            ]
+            for line in self.page.lines
+        ]
+
+        words = self.store.words
+        self.qul_search_rows = [
+            (word.id, f"{word.surah}:{word.ayah}:{i}", word.surah, word.ayah, word.text, "Al-Baqarah", "البقرة")
+            for i, word in enumerate(rng.sample(words, 100))
+        ]
+        self.legacy_search_rows = [
+            (word.id, word.surah, word.ayah, word.text, f"translation {word.id}", f"translit {word.id}",
+             rng.randint(1, 604), rng.randint(1, 15))
+            for word in rng.sample(words, 100)
+        ]
+
+        self.timing_rows = []
+        word_id = 1
+        for ayah in range(1, TIMING_AYAHS + 1):
+            clock = 0
+            for position in range(1, rng.randint(5, 40)):
+                duration = rng.randint(200, 900)
+                self.timing_rows.append((word_id, ayah, position, arabic_word(rng), clock, clock + duration,
+                                         f"/static/audio/002{ayah:03d}.mp3"))
+                word_id += 1
+                clock += duration
+
+    def close(self):
+        self._tmpdir.cleanup()
+
+
+def cases(data: Data) -> Dict[str, Callable[[], object]]:
+    store = data.store
+    benchmarks = {
+        "qul_page_build": lambda: Page(1, [store.build_line(row) for row in data.page_rows]).to_dict(),
+        "qul_page_to_dict": data.page.to_dict,
+        "qul_page_to_compact": data.page.to_compact,
+        "mushaf_page_grouping": lambda: [line_words(rows) for rows in data.legacy_lines],
+        "qul_search_results": lambda: build_search_results(data.qul_search_rows, store),
+        "legacy_search_results": lambda: format_search_results(data.legacy_search_rows),
+        "surah_timings_grouping": lambda: group_surah_timings(data.timing_rows),
+        "encode_page_json": lambda: FastJSONResponse(data.page_dict).body,
+    }
+    if msgpack is not None:
+        benchmarks["encode_page_msgpack"] = lambda: MsgPackResponse(data.page_compact).body
+    return benchmarks
+
+
+def measure(func: Callable[[], object], min_time: float, samples: int) -> dict:
+    """Seconds per call: calibrate the loop count, then take `samples` timed runs"""
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        if time.perf_counter() - started >= min_time:
+            break
+        loops *= 2
+
+    timings = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(samples):
+            started = time.perf_counter()
+            for _ in range(loops):
+                func()
+            timings.append((time.perf_counter() - started) / loops)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    return {
+        "loops": loops,
+        "samples": samples,
+        "median_us": round(median(timings) * 1e6, 3),
+        "mean_us": round(mean(timings) * 1e6, 3),
+        "stdev_us": round(stdev(timings) * 1e6, 3) if len(timings) > 1 else 0.0,
+        "min_us": round(min(timings) * 1e6, 3),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> List[Tuple[str, float, float, float]]:
+    """(name, before, after, change %) of cases whose median slowed by more than `threshold` percent"""
+    regressions = []
+    for name, stats in results["benchmarks"].items():
+        before = baseline.get("benchmarks", {}).get(name)
+        if not before or not before["median_us"]:
+            continue
+        change = (stats["median_us"] - before["median_us"]) / before["median_us"] * 100
+        if change > threshold:
+            regressions.append((name, before["median_us"], stats["median_us"], change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run micro-benchmarks of the API hot paths")
+    parser.add_argument("--filter", default="*", help="Glob of case names to run")
+    parser.add_argument("--samples", type=int, default=15, help="Timed samples per case")
+    parser.add_argument("--min-time", type=float, default=0.05, help="Minimum seconds per sample")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for the synthetic inputs")
+    parser.add_argument("--output", default="bench_results/micro.json", help="Where to write the JSON results")
+    parser.add_argument("--baseline", help="Earlier results to compare against")
+    parser.add_argument("--threshold", type=float, default=20.0, help="Allowed median regression in percent")
+    args = parser.parse_args()
+
+    print("⏱️ MICRO-BENCHMARKS")
+    print("=" * 60)
+
+    data = Data(args.seed)
+    try:
+        results = {
+            "meta": {
+                "seed": args.seed,
+                "samples": args.samples,
+                "min_time_s": args.min_time,
+                "python": sys.version.split()[0],
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "benchmarks": {}
+        }
+        for name, func in cases(data).items():
+            if not fnmatch.fnmatch(name, args.filter):
+                continue
+            stats = measure(func, args.min_time, args.samples)
+            results["benchmarks"][name] = stats
+            print(f"   {name:<26}{stats['median_us']:>12.2f} µs  ±{stats['stdev_us']:.2f}  ({stats['loops']} loops)")
+    finally:
+        data.close()
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "wb") as f:
+        f.write(orjson.dumps(results, option=orjson.OPT_INDENT_2))
+    print(f"\n✅ Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "rb") as f:
+            regressions = compare(results, orjson.loads(f.read()), args.threshold)
+        if regressions:
+            print(f"\n❌ Median regressions over {args.threshold:.0f}%:")
+            for name, before, after, change in regressions:
+                print(f"   {name}: {before:.2f} -> {after:.2f} µs (+{change:.0f}%)")
+            sys.exit(1)
+        print(f"✅ No median regression over {args.threshold:.0f}% against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,29 @@
+import hashlib
 import sqlite3
 import os
-import shutil
+import sys
 
-def create_complete_qul_database():
-    """Create complete QUL database using real QUL resources"""
-    
-    # Database paths
-    source_paths = {
-        'words': 'qul_guide/Quran_script_in_word_by_word_format.db',
-        'layout': 'qul_guide/qpc-hafs-15-lines.db',
-        'surah_names': 'qul_guide/quran-metadata-surah-name.sqlite'
-    }
-    
-    target_db = 'app/database/qul_complete.db'
-    
-    print("🏗️ CREATING COMPLETE QUL DATABASE")
-    print("=" * 60)
-    
-    # Create target directory
-    os.makedirs(os.path.dirname(target_db), exist_ok=True)
-    
-    # Remove existing database
-    if os.path.exists(target_db):
-        os.remove(target_db)
-        print("🗑️ Removed existing database")
-    
-    # Create new database
-    conn = sqlite3.connect(target_db)
-    cursor = conn.cursor()
-    
-    try:
-        # 1. Create and populate words table
-        print("\n📝 Creating words table...")
-        cursor.execute('''
+from app.database.qul_store import QulStore
+from app.database.validation import FONTS_DIR, validate_qul_database
+from app.offline.versions import record_store_build
+
+# Source QUL resources
+SOURCE_PATHS = {
+    'words': 'qul_guide/Quran_script_in_word_by_word_format.db',
+    'layout': 'qul_guide/qpc-hafs-15-lines.db',
+    'surah_names': 'qul_guide/quran-metadata-surah-name.sqlite'
+}
+
+TARGET_DB = 'app/database/qul_complete.db'
+
+# Rows copied per fetchmany/executemany round, bounding memory during the build
+CHUNK_SIZE = 5000
+
+TABLES = [
+    {
+        'name': 'words',
+        'source': 'words',
+        'create': '''
             CREATE TABLE words (
                 id INTEGER PRIMARY KEY,
                 location TEXT,
@@ -41,25 +32,18 @@ def create_complete_qul_database():
                 word INTEGER,
                 text TEXT
             )
-        ''')
-        
-        # Copy words from source
-        words_conn = sqlite3.connect(source_paths['words'])
-        words_cursor = words_conn.cursor()
-        words_cursor.execute("SELECT * FROM words")
-        words_data = words_cursor.fetchall()
-        
-        cursor.executemany('''
+        ''',
+        'select': "SELECT * FROM words",
+        'insert': '''
             INSERT INTO words (id, location, surah, ayah, word, text)
             VALUES (?, ?, ?, ?, ?, ?)
-        ''', words_data)
-        
-        words_conn.close()
-        print(f"   ✅ Inserted {len(words_data)} words")
-        
-        # 2. Create and populate pages table
-        print("\n📄 Creating pages table...")
-        cursor.execute('''
+        ''',
+        'label': 'words'
+    },
+    {
+        'name': 'pages',
+        'source': 'layout',
+        'create': '''
             CREATE TABLE pages (
                 page_number INTEGER,
                 line_number INTEGER,
@@ -69,26 +53,19 @@ def create_complete_qul_database():
                 last_word_id INTEGER,
                 surah_number INTEGER
             )
-        ''')
-        
-        # Copy pages from layout source
-        layout_conn = sqlite3.connect(source_paths['layout'])
-        layout_cursor = layout_conn.cursor()
-        layout_cursor.execute("SELECT * FROM pages")
-        pages_data = layout_cursor.fetchall()
-        
-        cursor.executemany('''
+        ''',
+        'select': "SELECT * FROM pages",
+        'insert': '''
             INSERT INTO pages (page_number, line_number, line_type, is_centered, 
                              first_word_id, last_word_id, surah_number)
             VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', pages_data)
-        
-        layout_conn.close()
-        print(f"   ✅ Inserted {len(pages_data)} page lines")
-        
-        # 3. Create and populate chapters (surah names) table
-        print("\n📚 Creating chapters table...")
-        cursor.execute('''
+        ''',
+        'label': 'page lines'
+    },
+    {
+        'name': 'chapters',
+        'source': 'surah_names',
+        'create': '''
             CREATE TABLE chapters (
                 id INTEGER PRIMARY KEY,
                 name TEXT,
@@ -99,22 +76,108 @@ def create_complete_qul_database():
                 verses_count INTEGER,
                 bismillah_pre INTEGER
             )
-        ''')
-        
-        # Copy chapters from source
-        chapters_conn = sqlite3.connect(source_paths['surah_names'])
-        chapters_cursor = chapters_conn.cursor()
-        chapters_cursor.execute("SELECT * FROM chapters")
-        chapters_data = chapters_cursor.fetchall()
-        
-        cursor.executemany('''
+        ''',
+        'select': "SELECT * FROM chapters",
+        'insert': '''
             INSERT INTO chapters (id, name, name_simple, name_arabic, 
                                 revelation_order, revelation_place, verses_count, bismillah_pre)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', chapters_data)
-        
-        chapters_conn.close()
-        print(f"   ✅ Inserted {len(chapters_data)} chapters")
+        ''',
+        'label': 'chapters'
+    }
+]
+
+# Created after loading so inserts do not maintain them row by row
+# (words.id and chapters.id are INTEGER PRIMARY KEYs and need no extra index)
+INDEXES = [
+    "CREATE INDEX idx_words_surah_ayah ON words(surah, ayah)",
+    "CREATE INDEX idx_pages_page_number ON pages(page_number)",
+    "CREATE INDEX idx_pages_word_range ON pages(first_word_id, last_word_id)"
+]
+
+def source_fingerprint(source_paths):
+    """Hash of the source files' sizes and modification times"""
+    digest = hashlib.sha256()
+    for key in sorted(source_paths):
+        stat = os.stat(source_paths[key])
+        digest.update(f"{key}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()
+
+def built_fingerprint(db_path):
+    """Source fingerprint recorded in an existing build, if any"""
+    if not os.path.exists(db_path):
+        return None
+    try:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            row = conn.execute("SELECT source_fingerprint FROM build_info").fetchone()
+            return row[0] if row else None
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return None
+
+def copy_table(source_path, select_sql, cursor, insert_sql):
+    """Stream rows from a source database in chunks; returns the row count"""
+    source_conn = sqlite3.connect(f"file:{source_path}?mode=ro", uri=True)
+    try:
+        source_cursor = source_conn.execute(select_sql)
+        total = 0
+        while True:
+            rows = source_cursor.fetchmany(CHUNK_SIZE)
+            if not rows:
+                break
+            cursor.executemany(insert_sql, rows)
+            total += len(rows)
+        return total
+    finally:
+        source_conn.close()
+
+def create_complete_qul_database(force=False, check_fonts=True):
+    """
+    Create complete QUL database using real QUL resources
+    
+    The build is written to a temporary file and swapped into place with an
+    atomic rename, so the app keeps serving the previous database until the
+    new one is complete. A build that fails validation is never swapped in.
+    Rebuilding unchanged sources is skipped unless `force` is set.
+    """
+    
+    source_paths = SOURCE_PATHS
+    target_db = TARGET_DB
+    building_db = f"{target_db}.building"
+    
+    print("🏗️ CREATING COMPLETE QUL DATABASE")
+    print("=" * 60)
+    
+    # Create target directory
+    os.makedirs(os.path.dirname(target_db), exist_ok=True)
+    
+    fingerprint = source_fingerprint(source_paths)
+    if not force and built_fingerprint(target_db) == fingerprint:
+        print("✅ Database is up to date with its sources, nothing to rebuild")
+        return True
+    
+    # Remove leftovers from an interrupted build
+    if os.path.exists(building_db):
+        os.remove(building_db)
+    
+    conn = sqlite3.connect(building_db)
+    cursor = conn.cursor()
+    
+    try:
+        # The temporary file is discarded on failure, so durability is not needed
+        cursor.execute("PRAGMA journal_mode=OFF")
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.execute("PRAGMA locking_mode=EXCLUSIVE")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        
+        # 1-3. Create and populate words, pages and chapters tables
+        for step, table in enumerate(TABLES, start=1):
+            print(f"\n📝 {step}. Creating {table['name']} table...")
+            cursor.execute(table['create'])
+            count = copy_table(source_paths[table['source']], table['select'], cursor, table['insert'])
+            print(f"   ✅ Inserted {count:,} {table['label']}")
         
         # 4. Create layout info table
         print("\n📋 Creating layout info...")
@@ -132,26 +195,30 @@ def create_complete_qul_database():
             VALUES ('QPC HAFS Complete', 604, 15, 'qpc-hafs-page-specific')
         ''')
         
+        cursor.execute('''
+            CREATE TABLE build_info (
+                source_fingerprint TEXT,
+                built_at TEXT
+            )
+        ''')
+        cursor.execute(
+            "INSERT INTO build_info (source_fingerprint, built_at) VALUES (?, datetime('now'))",
+            (fingerprint,)
+        )
+        
         print("   ✅ Created layout info")
         
-        # 5. Create indexes for performance
-        print("\n🔗 Creating database indexes...")
-        indexes = [
-            "CREATE INDEX idx_words_surah_ayah ON words(surah, ayah)",
-            "CREATE INDEX idx_words_id ON words(id)",
-            "CREATE INDEX idx_pages_page_number ON pages(page_number)",
-            "CREATE INDEX idx_pages_word_range ON pages(first_word_id, last_word_id)",
-            "CREATE INDEX idx_chapters_id ON chapters(id)"
-        ]
+        conn.commit()
         
-        for index_sql in indexes:
+        # 5. Create indexes once all rows are loaded, then refresh planner stats
+        print("\n🔗 Creating database indexes...")
+        for index_sql in INDEXES:
             cursor.execute(index_sql)
+        cursor.execute("ANALYZE")
+        conn.commit()
         
         print("   ✅ Created performance indexes")
         
-        # Commit all changes
-        conn.commit()
-        
         # 6. Verify the database
         print("\n🔍 Verifying database...")
         
@@ -180,16 +247,46 @@ def create_complete_qul_database():
         print(f"   📚 Chapters: {chapter_count}")
         print(f"   🕌 Surahs: {min_surah}-{max_surah}")
         
-        print(f"\n✅ Database created successfully: {target_db}")
-        print(f"📏 Database size: {os.path.getsize(target_db) / (1024*1024):.1f} MB")
+        conn.close()
+        
+        # 7. Validate the build before it can go live
+        print("\n🧪 Validating build...")
+        report = validate_qul_database(building_db, FONTS_DIR if check_fonts else None)
+        for error in report.errors:
+            print(f"   ❌ {error}")
+        for warning in report.warnings:
+            print(f"   ⚠️ {warning}")
+        if not report.ok:
+            raise ValueError(f"Build failed validation: {report.summary()}")
+        print(f"   ✅ {report.summary()}")
+        
+        # 8. Swap the new build into place; open handles keep reading the old file
+        os.replace(building_db, target_db)
+        print("\n🔁 Swapped new build into place")
         
     except Exception as e:
         print(f"❌ Error creating database: {e}")
         import traceback
         traceback.print_exc()
         
-    finally:
         conn.close()
+        if os.path.exists(building_db):
+            os.remove(building_db)
+        return False
+    
+    # 9. Record content-addressed versions for delta updates. The build is
+    # already live, so a failure here does not fail it: the server records
+    # the versions itself when it loads the build.
+    print("\n🔖 Recording content versions...")
+    try:
+        manifest = record_store_build(QulStore(target_db))
+        print(f"   ✅ Build version {manifest['version']} ({len(manifest['parts'])} parts)")
+    except Exception as e:
+        print(f"   ⚠️ Swapped in, but versions not recorded: {e}")
+    
+    print(f"\n✅ Database created successfully: {target_db}")
+    print(f"📏 Database size: {os.path.getsize(target_db) / (1024*1024):.1f} MB")
+    return True
 
 def test_database():
     """Test the created database with sample queries"""
@@ -253,5 +350,6 @@ def test_database():
         traceback.print_exc()
 
 if __name__ == "__main__":
-    create_complete_qul_database()
-    test_database() 
\ No newline at end of file
+    if create_complete_qul_database(force="--force" in sys.argv,
+                                    check_fonts="--no-font-check" not in sys.argv):
+        test_database() 
\ No newline at end of file
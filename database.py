@@ -102,3 +102,16 @@ class AudioTiming(Base):
     word = relationship("Word", back_populates="audio_timings")
     recitation = relationship("Recitation", back_populates="audio_timings")
 
+class RecitationStat(Base):
+    __tablename__ = "recitation_stats"
+    
+    # surah_number/ayah_number of 0 mark the per-surah and recitation-wide rows
+    recitation_id = Column(Integer, ForeignKey("recitations.id"), primary_key=True)
+    surah_number = Column(Integer, primary_key=True)
+    ayah_number = Column(Integer, primary_key=True)
+    word_count = Column(Integer, nullable=False)
+    total_duration_ms = Column(Integer, nullable=False)
+    min_duration_ms = Column(Integer, nullable=False)
+    max_duration_ms = Column(Integer, nullable=False)
+    ayahs_covered = Column(Integer, nullable=False)
+    surahs_covered = Column(Integer, nullable=False)
@@ -0,0 +1,35 @@
+"""
+Export the whole Mushaf as a versioned offline bundle
+Usage: python export_offline_bundle.py [--fonts] [--output DIR]
+"""
+
+import argparse
+import os
+
+from app.database.qul_store import QUL_DB_PATH, QulStore
+from app.offline.bundle import BUNDLE_DIR, build_bundle
+
+def main():
+    parser = argparse.ArgumentParser(description="Export an offline Mushaf bundle")
+    parser.add_argument("--fonts", action="store_true", help="Include page-specific fonts")
+    parser.add_argument("--db", default=QUL_DB_PATH, help="QUL database to export")
+    parser.add_argument("--output", default=BUNDLE_DIR, help="Directory for the bundle")
+    args = parser.parse_args()
+    
+    if not os.path.exists(args.db):
+        print(f"❌ QUL database not found at {args.db}")
+        return
+    
+    print("📦 EXPORTING OFFLINE BUNDLE")
+    print("=" * 40)
+    
+    store = QulStore(args.db)
+    manifest = build_bundle(store, include_fonts=args.fonts, output_dir=args.output)
+    
+    print(f"   📄 Parts: {len(manifest['parts'])}")
+    print(f"   🔖 Version: {manifest['version']}")
+    print(f"   📏 Size: {manifest['bundle']['size'] / (1024*1024):.1f} MB")
+    print(f"\n✅ Bundle written to {os.path.join(args.output, manifest['bundle']['filename'])}")
+
+if __name__ == "__main__":
+    main()
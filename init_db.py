@@ -6,15 +6,17 @@ Creates all necessary tables for the Quranic Mushaf API
 import sqlite3
 import os
 
-def create_database():
+from app.database.recitation_stats import RECITATION_STATS_SCHEMA
+
+def create_database(db_path="app/database/quran.db"):
     """Create database and all tables"""
     
     # Ensure database directory exists
-    db_dir = os.path.dirname("app/database/quran.db")
+    db_dir = os.path.dirname(db_path)
     os.makedirs(db_dir, exist_ok=True)
     
     # Connect to database
-    conn = sqlite3.connect("app/database/quran.db")
+    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
     
     # Create mushaf_layouts table
@@ -104,12 +106,16 @@ def create_database():
         )
     """)
     
+    # Create recitation_stats table (materialized from audio_timings at ingest)
+    cursor.execute(RECITATION_STATS_SCHEMA)
+    
     # Create indexes for better performance
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_words_surah_ayah ON words(surah_number, ayah_number)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_words_text ON words(word_text_uthmani)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_words_translation ON words(translation_en)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_word_positions_layout_page ON word_positions(mushaf_layout_id, page_number)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_audio_timings_word_recitation ON audio_timings(word_id, recitation_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_audio_timings_recitation ON audio_timings(recitation_id, word_id)")
     
     # Commit changes
     conn.commit()
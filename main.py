@@ -6,12 +6,25 @@ Main application file with CORS configuration and route setup
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, PlainTextResponse, RedirectResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
 import uvicorn
+import asyncio
 import os
+import signal
 
-from app.routers import mushaf, audio, search, qul_mushaf
+from app.routers import mushaf, audio, search, qul_mushaf, offline
 from app.database.connection import init_database
+from app.database.page_bodies import encode_page_bodies
+from app.database.qul_store import QUL_DB_PATH, qul_manager
+from app.database.tracing import QueryTraceMiddleware, tracer
+from app.http_cache import HttpCacheMiddleware
+from app.metrics import CACHES_WARM, QUL_STORE_GENERATION, MetricsMiddleware, add_refresh_hook, render_metrics
+from app.offline.versions import current_build, font_hashes
+from app.responses import FastJSONResponse
+from app.routers.qul_mushaf import IMMUTABLE_CACHE_CONTROL, VERSIONED_FONT_URL
+from app.warmup import run_warmup, warmup_state
 
 # Create FastAPI instance
 app = FastAPI(
@@ -19,9 +32,13 @@ app = FastAPI(
     description="Complete Quran API with QUL rendering support and page-specific fonts",
     version="2.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=FastJSONResponse
 )
 
+# Innermost: Cache-Control, ETag/304 and the optional response cache (HTTP_CACHE_MB)
+app.add_middleware(HttpCacheMiddleware, version=lambda: qul_manager.generation)
+
 # Configure CORS to allow all origins
 app.add_middleware(
     CORSMiddleware,
@@ -31,19 +48,56 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
-# Mount static files for audio and images
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# SQL tracing and Server-Timing while enabled (QUERY_TRACE=1 or SIGUSR1)
+app.add_middleware(QueryTraceMiddleware)
+
+# Outermost, so timings cover CORS handling and streamed bodies
+app.add_middleware(MetricsMiddleware)
 
 # Include routers
 app.include_router(mushaf.router, prefix="/api/v1/mushaf", tags=["mushaf"])
 app.include_router(audio.router, prefix="/api/v1/audio", tags=["audio"])
 app.include_router(search.router, prefix="/api/v1/search", tags=["search"])
 app.include_router(qul_mushaf.router, prefix="/api/v1/qul", tags=["qul-mushaf"])
+app.include_router(offline.router, prefix="/api/v1/offline", tags=["offline"])
+
+# Seconds between checks for a new QUL database build (0 disables polling)
+QUL_RELOAD_INTERVAL = float(os.getenv("QUL_RELOAD_INTERVAL", "5"))
+
+def register_store_warmers():
+    """Work done on every QUL build before it serves requests (also run by serve.py before forking)"""
+    qul_manager.add_warmer(encode_page_bodies)
+    qul_manager.add_warmer(current_build.get)
+    qul_manager.add_warmer(font_hashes.refresh)
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize database on startup"""
     await init_database()
+    
+    # Hot-swap new QUL builds: poll the file and reload on SIGHUP.
+    # Each new build is warmed before it starts serving requests.
+    register_store_warmers()
+    if QUL_RELOAD_INTERVAL > 0:
+        app.state.qul_watcher = asyncio.create_task(qul_manager.watch(QUL_RELOAD_INTERVAL))
+    # SIGUSR1 toggles query tracing at runtime
+    try:
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGHUP, qul_manager.request_reload)
+        loop.add_signal_handler(signal.SIGUSR1, tracer.toggle)
+    except (AttributeError, NotImplementedError, RuntimeError, ValueError):
+        pass  # No SIGHUP on this platform, or not running in the main thread
+    
+    # Warm the page store, fonts and search files; readiness reports 503 until done
+    app.state.warmup = asyncio.create_task(run_warmup(warmup_state))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background tasks"""
+    for name in ("qul_watcher", "warmup"):
+        task = getattr(app.state, name, None)
+        if task:
+            task.cancel()
 
 @app.get("/")
 async def root():
@@ -63,18 +117,67 @@ async def root():
             "qul": "/api/v1/qul/",
             "mushaf": "/api/v1/mushaf/",
             "audio": "/api/v1/audio/",
-            "search": "/api/v1/search/"
+            "search": "/api/v1/search/",
+            "offline": "/api/v1/offline/manifest"
         }
     }
 
+@app.get("/api/v1/health/live")
+async def liveness_check():
+    """Liveness probe: the event loop is answering requests"""
+    return {"status": "alive"}
+
+@app.get("/api/v1/health/ready")
+async def readiness_check():
+    """
+    Readiness probe
+
+    Ready once the QUL build and its page bodies are loaded; warming steps
+    that only make serving slower report "degraded" instead when they fail.
+    Built only from in-memory state, so frequent probes cost no filesystem calls.
+    """
+    store = qul_manager.current
+    ready = warmup_state.ready and store is not None
+    
+    qul_database = {"loaded": store is not None, "generation": qul_manager.generation}
+    if store is not None:
+        manifest = current_build.peek(store)
+        qul_database.update({
+            "version": manifest["version"] if manifest else None,
+            "source_fingerprint": store.build_fingerprint,
+            "loaded_at": store.loaded_at,
+            "total_pages": store.total_pages
+        })
+    
+    if ready:
+        status = "degraded" if warmup_state.degraded else "ready"
+    elif warmup_state.finished_at is None:
+        status = "warming"
+    else:
+        status = "unavailable"
+    
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": status,
+            "qul_database": qul_database,
+            "legacy_database": "available" if warmup_state.legacy_database else "missing",
+            "fonts": "available" if warmup_state.font_files else "missing",
+            "font_system": "page-specific",
+            "warmup": warmup_state.to_dict()
+        }
+    )
+
 @app.get("/api/v1/health")
 async def health_check():
-    """Health check endpoint"""
-    # Check if QUL database exists
-    qul_db_exists = os.path.exists("app/database/qul_complete.db")
-    
-    # Check if fonts directory exists
-    fonts_exist = os.path.exists("static/fonts") and len(os.listdir("static/fonts")) > 0
+    """
+    Health check endpoint
+
+    Kept in its original shape and always 200 for existing clients; load
+    balancers should use the liveness and readiness probes above.
+    """
+    qul_db_exists = qul_manager.current is not None or os.path.exists(QUL_DB_PATH)
+    fonts_exist = warmup_state.font_files > 0 or (os.path.isdir("static/fonts") and len(os.listdir("static/fonts")) > 0)
     
     return {
         "status": "healthy",
@@ -84,9 +187,31 @@ async def health_check():
         "font_system": "page-specific"
     }
 
+def refresh_app_metrics():
+    QUL_STORE_GENERATION.labels().set(qul_manager.generation)
+    CACHES_WARM.labels().set(1 if warmup_state.ready else 0)
+
+add_refresh_hook(refresh_app_metrics)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics in the text exposition format"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+async def current_font_hash(page_number: int) -> Optional[str]:
+    """Font hash of a page; hashes the fonts off the event loop if no build has been loaded yet"""
+    if not font_hashes.loaded:
+        await run_in_threadpool(font_hashes.refresh)
+    return font_hashes.get(page_number)
+
 @app.get("/api/v1/fonts/{page_number}")
 async def get_page_font(page_number: int):
-    """Get page-specific font file"""
+    """
+    Get page-specific font file
+
+    Served under the HTTP cache policy of data routes, since the file may
+    change; `Content-Location` names the immutable versioned URL.
+    """
     if page_number < 1 or page_number > 604:
         raise HTTPException(status_code=400, detail="Page number must be between 1 and 604")
     
@@ -95,12 +220,37 @@ async def get_page_font(page_number: int):
     if not os.path.exists(font_file):
         raise HTTPException(status_code=404, detail=f"Font for page {page_number} not found")
     
+    headers = {}
+    font_hash = await current_font_hash(page_number)
+    if font_hash:
+        headers["Content-Location"] = VERSIONED_FONT_URL.format(font_hash=font_hash, page_number=page_number)
+    
+    return FileResponse(font_file, media_type="font/woff", headers=headers)
+
+@app.get("/static/fonts/{font_hash}/p{page_number}.woff", include_in_schema=False)
+async def get_versioned_page_font(font_hash: str, page_number: int):
+    """Page font by content hash, cached forever; stale hashes redirect to the current one"""
+    current_hash = await current_font_hash(page_number) if 1 <= page_number <= 604 else None
+    
+    if current_hash is None:
+        raise HTTPException(status_code=404, detail=f"Font for page {page_number} not found")
+    
+    if font_hash != current_hash:
+        return RedirectResponse(
+            VERSIONED_FONT_URL.format(font_hash=current_hash, page_number=page_number),
+            status_code=307,
+            headers={"Cache-Control": "no-cache"}
+        )
+    
     return FileResponse(
-        font_file,
+        font_hashes.path(page_number),
         media_type="font/woff",
-        headers={"Cache-Control": "public, max-age=31536000"}  # Cache for 1 year
+        headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL}
     )
 
+# Mount static files for audio and images; after the routes, so versioned fonts are not shadowed
+app.mount("/static", StaticFiles(directory="static"), name="static")
+
 @app.exception_handler(404)
 async def not_found_handler(request, exc):
     """Custom 404 handler"""
@@ -120,6 +270,7 @@ async def internal_error_handler(request, exc):
 if __name__ == "__main__":
     # Run the application
     # Listen on 0.0.0.0 to allow external access
+    # Development server; use serve.py for multi-process production serving
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
@@ -0,0 +1,192 @@
+"""
+Pre-render the read-only API into static files
+Usage: python prerender.py [--output DIR] [--workers N] [--no-timings] [--no-ayahs]
+
+Every QUL page (plain and versioned URL), the layouts, surah names, stats
+and version documents, every ayah lookup and the per-surah word timings of
+each recitation are rendered through the app itself, so the bytes are
+exactly what the API serves. Files are written at paths matching their URLs,
+each with a precompressed .gz copy (and .br when brotli is installed) for
+nginx gzip_static/brotli_static or object storage. `_manifest.json` records
+the content type, Cache-Control and ETag of every file.
+
+Search and MessagePack pages are left to the Python app.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+import argparse
+import asyncio
+import gzip
+import multiprocessing
+import os
+import time
+
+import orjson
+
+try:
+    import brotli
+except ImportError:  # Optional: only .gz copies are written without it
+    brotli = None
+
+# URLs rendered per task; small enough to balance the slow timing queries
+CHUNK_SIZE = 64
+
+
+async def render(app, path: str) -> Tuple[int, Dict[str, str], bytes]:
+    """Status, headers and body of a GET request made straight to the ASGI app"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"prerender"), (b"accept", b"application/json")],
+        "client": None,
+        "server": ("prerender", 80),
+    }
+    status = 0
+    headers = {}
+    chunks = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            headers.update((key.decode().lower(), value.decode()) for key, value in message["headers"])
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, headers, b"".join(chunks)
+
+
+def write_file(output: str, path: str, body: bytes):
+    """Write the body and its precompressed copies where the URL path points"""
+    file_path = os.path.join(output, path.lstrip("/"))
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "wb") as f:
+        f.write(body)
+
+    # mtime=0 keeps the .gz identical across runs
+    copies = [(".gz", gzip.compress(body, 9, mtime=0))]
+    if brotli is not None:
+        copies.append((".br", brotli.compress(body)))
+    for suffix, compressed in copies:
+        if len(compressed) < len(body):
+            with open(file_path + suffix, "wb") as f:
+                f.write(compressed)
+
+
+def render_chunk(output: str, paths: List[str]) -> Tuple[Dict[str, dict], List[str]]:
+    """Worker task: render and write a list of URLs; returns manifest entries and failures"""
+    import main
+
+    async def run():
+        files = {}
+        failed = []
+        for path in paths:
+            status, headers, body = await render(main.app, path)
+            if status != 200:
+                failed.append(f"{path} ({status})")
+                continue
+            write_file(output, path, body)
+            files[path] = {
+                "content_type": headers.get("content-type"),
+                "cache_control": headers.get("cache-control"),
+                "etag": headers.get("etag"),
+                "size": len(body)
+            }
+        return files, failed
+
+    return asyncio.run(run())
+
+
+def collect_paths(store, version: str, recitation_ids: List[int],
+                  include_ayahs: bool, include_timings: bool) -> List[str]:
+    qul = "/api/v1/qul/qul"
+    paths = [f"{qul}/layouts", f"{qul}/surah-names", f"{qul}/stats", f"{qul}/version", "/api/v1/audio/recitations"]
+
+    for page_number in sorted(store.pages):
+        paths.append(f"{qul}/page/{page_number}")
+        paths.append(f"{qul}/v/{version}/page/{page_number}")
+
+    if include_ayahs:
+        for chapter in store.chapters.values():
+            for ayah_number in range(1, (chapter.verses_count or 0) + 1):
+                paths.append(f"{qul}/ayah/{chapter.id}/{ayah_number}")
+
+    if include_timings:
+        for recitation_id in recitation_ids:
+            for surah_number in sorted(store.chapters):
+                paths.append(f"/api/v1/audio/surah/{surah_number}/recitation/{recitation_id}/timings")
+
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-render the read-only API into static files")
+    parser.add_argument("--output", default="prerendered", help="Directory for the rendered files")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--no-ayahs", action="store_true", help="Skip the per-ayah lookups")
+    parser.add_argument("--no-timings", action="store_true", help="Skip the per-surah word timings")
+    args = parser.parse_args()
+
+    print("🗂️ PRE-RENDERING STATIC API")
+    print("=" * 40)
+
+    started = time.perf_counter()
+
+    # Loaded once here; forked workers share the store and its encoded bodies
+    import main as app_main
+    from app.database.qul_store import get_qul_store
+    from app.offline.versions import current_build
+
+    app_main.register_store_warmers()
+    try:
+        store = get_qul_store()
+    except FileNotFoundError:
+        print("❌ QUL database not found")
+        return
+    version = current_build.get(store)["version"]
+
+    status, _, body = asyncio.run(render(app_main.app, "/api/v1/audio/recitations"))
+    recitation_ids = [r["id"] for r in orjson.loads(body)["recitations"]] if status == 200 else []
+
+    paths = collect_paths(store, version, recitation_ids, not args.no_ayahs, not args.no_timings)
+    print(f"   🔖 Version: {version}")
+    print(f"   📄 {len(paths)} URLs on {args.workers} workers")
+
+    chunks = [paths[i:i + CHUNK_SIZE] for i in range(0, len(paths), CHUNK_SIZE)]
+    files = {}
+    failed = []
+    context = multiprocessing.get_context("fork")
+    with ProcessPoolExecutor(args.workers, mp_context=context) as pool:
+        for chunk_files, chunk_failed in pool.map(render_chunk, [args.output] * len(chunks), chunks):
+            files.update(chunk_files)
+            failed.extend(chunk_failed)
+
+    manifest = {"version": version, "files": dict(sorted(files.items()))}
+    os.makedirs(args.output, exist_ok=True)
+    with open(os.path.join(args.output, "_manifest.json"), "wb") as f:
+        f.write(orjson.dumps(manifest, option=orjson.OPT_INDENT_2))
+
+    total = sum(entry["size"] for entry in files.values())
+    print(f"   📏 {len(files)} files, {total / (1024 * 1024):.1f} MB uncompressed"
+          f"{'' if brotli is not None else ' (brotli not installed: .gz only)'}")
+    for failure in failed[:10]:
+        print(f"   ⚠️ Not rendered: {failure}")
+    if len(failed) > 10:
+        print(f"   ⚠️ ... and {len(failed) - 10} more")
+    print(f"\n✅ Rendered to {args.output} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,8 @@ Add sample data for Al-Fatiha (Chapter 1) to the database
 
 import sqlite3
 
+from app.database.recitation_stats import refresh_recitation_stats
+
 def add_sample_data():
     """Add sample data for Al-Fatiha"""
     
@@ -172,6 +174,9 @@ def add_sample_data():
         """, timing_data)
     
     conn.commit()
+    
+    # Materialize recitation stats for the ingested timings
+    refresh_recitation_stats(conn, 1, [timing[0] for timing in audio_timings])
     conn.close()
     
     print("Sample data for Al-Fatiha added successfully!")
@@ -0,0 +1,219 @@
+"""
+Production launcher: pre-forked workers sharing the loaded data
+Usage: python serve.py [--workers N] [--host HOST] [--port PORT]
+
+The parent binds the socket, loads the QUL page store, encodes every page
+body and warms the caches, then freezes the garbage collector and forks the
+workers. Everything loaded before the fork is shared copy-on-write: page
+bodies live in a few large bytes buffers and the lookup indexes in flat
+arrays, so serving them does not write reference counts into the shared
+pages, and frozen objects are never touched by a collection.
+
+Workers do not watch the QUL database themselves, since a build loaded in
+a worker would be private to it. The parent polls the file every
+QUL_RELOAD_INTERVAL seconds and reloads on SIGHUP: it loads and warms the
+new build, freezes it, forks a fresh set of workers that share it, then
+stops the old ones, which finish their in-flight requests first.
+
+The parent restarts workers that die, forwards SIGUSR1 (toggle query
+tracing) and prints per-worker memory on SIGUSR2. Prometheus metrics are
+kept per worker.
+"""
+
+from typing import Dict
+import argparse
+import gc
+import os
+import signal
+import time
+
+import uvicorn
+
+# Pause between restarts of a worker that keeps dying
+RESPAWN_DELAY = 1.0
+# Seconds between checks for exited workers and due reloads
+WAIT_INTERVAL = 0.2
+
+
+def memory_usage(pid: int) -> Dict[str, int]:
+    """Rss, Pss, shared and private kB of a process, from /proc/<pid>/smaps_rollup"""
+    usage = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name in ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty"):
+                    usage[name] = int(value.split()[0])
+    except OSError:
+        pass
+    return usage
+
+
+def preload():
+    """Load and warm everything workers share; runs once in the parent"""
+    # Collections during loading would only walk objects that live forever
+    gc.disable()
+
+    # Read before main is imported: workers leave reloading to the parent
+    os.environ["QUL_RELOAD_INTERVAL"] = "0"
+    import main
+    from app.database.qul_store import qul_manager
+    from app.warmup import warm_caches, warmup_state
+
+    main.register_store_warmers()
+    warm_caches(warmup_state)
+
+    store = qul_manager.current
+    if store is None:
+        print("⚠️ QUL database not loaded; workers will retry on first request")
+    elif store.bodies is not None:
+        print(f"   📄 {store.total_pages} pages, {store.bodies.nbytes / (1024 * 1024):.1f} MB of encoded bodies")
+    for name, error in warmup_state.errors.items():
+        print(f"   ⚠️ Warming {name} failed: {error}")
+
+    # Move everything loaded so far out of the collector's reach
+    gc.freeze()
+    return main.app
+
+
+def reload_store(force: bool) -> bool:
+    """Load a new QUL build in the parent; returns True if one was swapped in"""
+    from app.database.qul_store import qul_manager
+
+    try:
+        if not force and not qul_manager.is_stale():
+            return False
+        if not qul_manager.reload(force=force):
+            return False
+    except Exception as e:
+        print(f"⚠️ QUL database reload failed: {e}")
+        return False
+
+    # The previous build is garbage now; freeze the new one for the next workers
+    gc.unfreeze()
+    gc.collect()
+    gc.freeze()
+    return True
+
+
+def spawn(config: uvicorn.Config, sock) -> int:
+    pid = os.fork()
+    if pid:
+        return pid
+
+    # Worker: uvicorn installs its own shutdown handlers, the app its SIGHUP/SIGUSR1 ones
+    for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP, signal.SIGUSR1, signal.SIGUSR2):
+        signal.signal(signum, signal.SIG_DFL)
+    gc.enable()
+    status = 0
+    try:
+        uvicorn.Server(config).run(sockets=[sock])
+    except BaseException as e:
+        print(f"Worker {os.getpid()} failed: {e}")
+        status = 1
+    finally:
+        os._exit(status)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the API from pre-forked workers")
+    parser.add_argument("--host", default="0.0.0.0", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--backlog", type=int, default=2048, help="Listen backlog")
+    parser.add_argument("--log-level", default="info", help="uvicorn log level")
+    args = parser.parse_args()
+
+    reload_interval = float(os.getenv("QUL_RELOAD_INTERVAL", "5"))
+
+    print("🚀 STARTING PRE-FORKED SERVER")
+    print("=" * 40)
+
+    started = time.perf_counter()
+    app = preload()
+    print(f"   ✅ Loaded in {time.perf_counter() - started:.1f}s")
+
+    config = uvicorn.Config(app, host=args.host, port=args.port, backlog=args.backlog, log_level=args.log_level)
+    sock = config.bind_socket()
+
+    workers = {spawn(config, sock) for _ in range(args.workers)}
+    print(f"   👷 {len(workers)} workers on http://{args.host}:{args.port}")
+    # Old workers being replaced after a reload; not restarted when they exit
+    retiring = set()
+    stopping = False
+    reload_requested = False
+    next_check = time.monotonic() + reload_interval
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        forward(signal.SIGTERM, frame)
+
+    def forward(signum, frame):
+        for pid in list(workers):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def request_reload(signum, frame):
+        nonlocal reload_requested
+        reload_requested = True
+
+    def roll_workers():
+        """Fork workers sharing the newly loaded build, then stop the old ones"""
+        old = workers - retiring
+        for _ in range(len(old)):
+            workers.add(spawn(config, sock))
+        for pid in old:
+            retiring.add(pid)
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        print(f"   🔄 New QUL build loaded; replaced {len(old)} workers")
+
+    def report(signum, frame):
+        for pid in sorted(workers):
+            usage = memory_usage(pid)
+            shared = usage.get("Shared_Clean", 0) + usage.get("Shared_Dirty", 0)
+            print(f"   📊 worker {pid}: rss {usage.get('Rss', 0) / 1024:.1f} MB, "
+                  f"pss {usage.get('Pss', 0) / 1024:.1f} MB, shared {shared / 1024:.1f} MB, "
+                  f"private dirty {usage.get('Private_Dirty', 0) / 1024:.1f} MB")
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGHUP, request_reload)
+    signal.signal(signal.SIGUSR1, forward)
+    signal.signal(signal.SIGUSR2, report)
+
+    while workers:
+        if not stopping and (reload_requested or (reload_interval > 0 and time.monotonic() >= next_check)):
+            force, reload_requested = reload_requested, False
+            next_check = time.monotonic() + reload_interval
+            if reload_store(force):
+                roll_workers()
+
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            time.sleep(WAIT_INTERVAL)
+            continue
+
+        workers.discard(pid)
+        if stopping or pid in retiring:
+            retiring.discard(pid)
+            continue
+        print(f"⚠️ Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}; restarting")
+        time.sleep(RESPAWN_DELAY)
+        if not stopping:
+            workers.add(spawn(config, sock))
+
+    sock.close()
+    print("✅ All workers stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test gapless joining of per-ayah MP3 files
+"""
+
+import os
+import sys
+import tempfile
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.audio.mp3 import parse_frame_header, scan_mp3
+from app.audio.playlist import build_playlist, iter_joined_frames
+
+# MPEG-1 Layer III, 32 kbps, 44.1 kHz, mono: 104-byte frames of 1152 samples
+FRAME_HEADER = b"\xff\xfb\x10\xc0"
+FRAME_LENGTH = 104
+FRAME_MS = 1152 / 44100 * 1000
+
+
+def frames(count, fill):
+    return (FRAME_HEADER + bytes([fill]) * (FRAME_LENGTH - 4)) * count
+
+
+def write_ayah(directory, name, count, fill, tagged=False):
+    """Write an ayah file; tagged ones carry ID3v2, a Xing frame and ID3v1 around the audio"""
+    audio = frames(count, fill)
+    data = audio
+    if tagged:
+        id3v2 = b"ID3\x03\x00\x00\x00\x00\x00\x10" + bytes(16)
+        xing = FRAME_HEADER + bytes(17) + b"Xing" + bytes(FRAME_LENGTH - 25)
+        id3v1 = b"TAG" + bytes(125)
+        data = id3v2 + xing + audio + id3v1
+    with open(os.path.join(directory, name), "wb") as f:
+        f.write(data)
+    return audio
+
+
+def test_frame_header():
+    header = parse_frame_header(FRAME_HEADER)
+    assert header is not None
+    assert (header.length, header.samples, header.sample_rate) == (FRAME_LENGTH, 1152, 44100)
+    assert parse_frame_header(b"\xff\xfb\xf0\xc0") is None  # bitrate index 15
+    print("✅ Frame header parsed")
+
+
+def test_join_skips_tags_and_offsets_timings():
+    """Joined bytes are exactly the audio frames and word timings follow the ayah offsets"""
+    with tempfile.TemporaryDirectory() as root:
+        audio_dir = os.path.join(root, "static", "audio")
+        os.makedirs(audio_dir)
+        first = write_ayah(audio_dir, "001001_test.mp3", 10, 1, tagged=True)
+        second = write_ayah(audio_dir, "001002_test.mp3", 7, 2)
+
+        index = scan_mp3(os.path.join(audio_dir, "001001_test.mp3"))
+        assert index.frame_count == 10
+        assert index.end - index.start == len(first)
+
+        cwd = os.getcwd()
+        os.chdir(root)
+        try:
+            playlist = build_playlist([
+                (1, 1, 0, 100, "/static/audio/001001_test.mp3"),
+                (1, 2, 100, 200, "/static/audio/001001_test.mp3"),
+                (2, 3, 0, 50, "/static/audio/001002_test.mp3"),
+            ])
+            spans = [(ayah["path"], *ayah["byte_range"]) for ayah in playlist["ayahs"]]
+            joined = b"".join(iter_joined_frames(spans, chunk_size=100))
+        finally:
+            os.chdir(cwd)
+
+        assert joined == first + second
+        assert playlist["total_bytes"] == len(joined)
+        assert abs(playlist["total_duration_ms"] - 17 * FRAME_MS) < 0.01
+
+        second_ayah = playlist["ayahs"][1]
+        assert abs(second_ayah["offset_ms"] - 10 * FRAME_MS) < 0.01
+        assert abs(second_ayah["words"][0]["start_time"] - round(10 * FRAME_MS, 3)) < 0.01
+        print(f"✅ Joined {len(joined)} bytes over {playlist['total_duration_ms']} ms without tags")
+
+
+if __name__ == "__main__":
+    print("🔊 Testing MP3 joining")
+    print("=" * 40)
+    test_frame_header()
+    test_join_skips_tags_and_offsets_timings()
+    print("\n🎉 MP3 joining tests passed!")
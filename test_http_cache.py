@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test Cache-Control policies, ETag revalidation and the response cache
+"""
+
+import asyncio
+import os
+import sys
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from app.http_cache import HttpCacheMiddleware, ResponseCache, _Entry, make_etag
+
+calls = []
+
+
+async def page(request: Request):
+    calls.append(request.url.path)
+    language = request.headers.get("accept-language", "en")
+    return PlainTextResponse(f"page {request.path_params['n']} in {language}", headers={"Vary": "Accept-Language"})
+
+
+async def search(request: Request):
+    calls.append(request.url.path)
+    return PlainTextResponse("results", headers={"Cache-Control": "private"})
+
+
+async def stream(request: Request):
+    async def chunks():
+        yield b"a"
+        yield b"b"
+    return StreamingResponse(chunks())
+
+
+def make_app(cache_bytes: int = 0):
+    app = Starlette(routes=[
+        Route("/api/v1/qul/qul/page/{n}", page),
+        Route("/api/v1/search/", search),
+        Route("/api/v1/audio/stream", stream),
+    ])
+    generation = [1]
+    middleware = HttpCacheMiddleware(app, version=lambda: generation[0])
+    middleware.cache = ResponseCache(cache_bytes) if cache_bytes else None
+    return middleware, generation
+
+
+def test_etag_and_not_modified():
+    async def run():
+        middleware, _ = make_app()
+        async with httpx.AsyncClient(app=middleware, base_url="http://test") as client:
+            response = await client.get("/api/v1/qul/qul/page/1")
+            assert response.headers["cache-control"] == "public, max-age=3600, stale-while-revalidate=86400"
+            etag = response.headers["etag"]
+            assert etag == make_etag(response.content).decode()
+
+            for if_none_match in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+                revalidated = await client.get("/api/v1/qul/qul/page/1", headers={"If-None-Match": if_none_match})
+                assert revalidated.status_code == 304, if_none_match
+                assert revalidated.content == b""
+                assert revalidated.headers["etag"] == etag
+                assert revalidated.headers["vary"] == "Accept-Language"
+
+            changed = await client.get("/api/v1/qul/qul/page/1", headers={"If-None-Match": '"other"'})
+            assert changed.status_code == 200
+
+            # Handler headers win over the policy
+            assert (await client.get("/api/v1/search/")).headers["cache-control"] == "private"
+
+            # Streamed bodies are not buffered for an ETag
+            streamed = await client.get("/api/v1/audio/stream")
+            assert streamed.content == b"ab" and "etag" not in streamed.headers
+
+    asyncio.run(run())
+    print("✅ ETags and 304 responses")
+
+
+def test_response_cache_varies_and_follows_version():
+    async def run():
+        calls.clear()
+        middleware, generation = make_app(1024 * 1024)
+        async with httpx.AsyncClient(app=middleware, base_url="http://test") as client:
+            english = await client.get("/api/v1/qul/qul/page/1", headers={"Accept-Language": "en"})
+            arabic = await client.get("/api/v1/qul/qul/page/1", headers={"Accept-Language": "ar"})
+            again = await client.get("/api/v1/qul/qul/page/1", headers={"Accept-Language": "ar"})
+            assert english.text != arabic.text and again.text == arabic.text
+            assert len(calls) == 2
+
+            # private responses are never shared
+            await client.get("/api/v1/search/")
+            await client.get("/api/v1/search/")
+            assert calls.count("/api/v1/search/") == 2
+
+            # A new data version drops everything cached
+            generation[0] = 2
+            await client.get("/api/v1/qul/qul/page/1", headers={"Accept-Language": "ar"})
+            assert calls.count("/api/v1/qul/qul/page/1") == 3
+            assert len(middleware.cache._entries) == 1
+
+    asyncio.run(run())
+    print("✅ Response cache keyed by Vary and data version")
+
+
+def test_response_cache_lru_and_vary_bookkeeping():
+    cache = ResponseCache(max_bytes=800)
+    vary = [(b"vary", b"Accept-Language")]
+
+    def put(path, language, size=100):
+        cache.put((1, path, b""), {b"accept-language": language}, _Entry(vary, b"x" * size, None, float("inf")))
+
+    for n in range(8):
+        put(f"/page/{n}", b"en")
+    assert cache.size == 800
+    # Reading page 0 makes page 1 the least recently used
+    assert cache.get((1, "/page/0", b""), {b"accept-language": b"en"}) is not None
+    put("/page/8", b"en")
+    assert cache.size <= 800
+    assert cache.get((1, "/page/1", b""), {b"accept-language": b"en"}) is None
+    assert cache.get((1, "/page/0", b""), {b"accept-language": b"en"}) is not None
+
+    # Too large for the budget: not cached at all
+    put("/page/huge", b"en", size=200)
+    assert not cache.contains((1, "/page/huge", b""), {b"accept-language": b"en"})
+
+    # Vary bookkeeping leaves with the last entry of a path
+    for n in range(1000):
+        put(f"/once/{n}", b"en", size=1)
+    for n in range(2000):
+        put(f"/page/{n}", b"en", size=100)
+    assert len(cache._vary) == len(cache._path_entries) == len({key[1] for key in cache._entries})
+    assert len(cache._vary) <= 8
+    print("✅ LRU eviction within the byte budget")
+
+
+if __name__ == "__main__":
+    print("🗄️ Testing HTTP caching")
+    print("=" * 40)
+    test_etag_and_not_modified()
+    test_response_cache_varies_and_follows_version()
+    test_response_cache_lru_and_vary_bookkeeping()
+    print("\n🎉 HTTP caching tests passed!")
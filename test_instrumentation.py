@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Test that QUL database statements are metered
+"""
+
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import instrumentation
+from app.database.qul_access import QulDatabase
+from app.metrics import DB_QUERIES
+
+
+def make_database(directory):
+    db_path = os.path.join(directory, "metered.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE words (id INTEGER PRIMARY KEY, text TEXT)")
+    conn.executemany("INSERT INTO words VALUES (?, ?)", [(1, "بِسْمِ"), (2, "ٱللَّهِ")])
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def test_connection_statements_are_counted():
+    """Statements through conn.execute, conn.executemany and cursors are all counted"""
+    with tempfile.TemporaryDirectory() as directory:
+        conn = instrumentation.connect(make_database(directory), "qul")
+        before = DB_QUERIES.labels("qul").value
+
+        assert conn.execute("SELECT text FROM words WHERE id = ?", (1,)).fetchall() == [("بِسْمِ",)]
+        conn.executemany("UPDATE words SET text = ? WHERE id = ?", [("x", 1)])
+        conn.cursor().execute("SELECT COUNT(*) FROM words").fetchone()
+        conn.close()
+
+        counted = DB_QUERIES.labels("qul").value - before
+        assert counted == 3, f"{counted} of 3 statements counted"
+        print(f"✅ Connection statements counted: {counted:.0f}")
+
+
+def test_qul_database_fetchall_is_counted():
+    """Queries run on the QUL thread pool are counted"""
+    with tempfile.TemporaryDirectory() as directory:
+        database = QulDatabase(make_database(directory), threads=1)
+        before = DB_QUERIES.labels("qul").value
+
+        rows = asyncio.run(database.fetchall("SELECT id FROM words ORDER BY id"))
+        database._executor.shutdown()
+
+        assert rows == [(1,), (2,)]
+        counted = DB_QUERIES.labels("qul").value - before
+        assert counted == 1, f"{counted} of 1 statement counted"
+        print(f"✅ QUL pool statements counted: {counted:.0f}")
+
+
+if __name__ == "__main__":
+    print("📊 Testing database instrumentation")
+    print("=" * 40)
+    test_connection_statements_are_counted()
+    test_qul_database_fetchall_is_counted()
+    print("\n🎉 Instrumentation tests passed!")
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Test content negotiation between JSON and MessagePack
+"""
+
+import os
+import sys
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from starlette.requests import Request
+
+from app.responses import msgpack, wants_msgpack
+
+# (Accept header, MessagePack expected)
+CASES = [
+    ("", False),
+    ("application/json", False),
+    ("application/msgpack", True),
+    ("application/x-msgpack", True),
+    ("application/msgpack, application/json", False),
+    ("application/json, application/msgpack;q=0.1", False),
+    ("application/json;q=0.5, application/msgpack", True),
+    ("application/msgpack, */*", True),
+    ("application/msgpack;q=0.8, */*", False),
+    ("application/msgpack;q=0.8, application/*;q=0.5", True),
+    ("application/msgpack;q=0", False),
+    ("application/msgpack;q=bogus", False),
+]
+
+
+def request_accepting(accept: str) -> Request:
+    headers = [(b"accept", accept.encode())] if accept else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+def test_wants_msgpack_quality_values():
+    if msgpack is None:
+        print("⚠️ msgpack not installed, skipped")
+        return
+    for accept, expected in CASES:
+        assert wants_msgpack(request_accepting(accept)) is expected, accept
+    print(f"✅ {len(CASES)} Accept headers negotiated")
+
+
+if __name__ == "__main__":
+    print("📦 Testing response negotiation")
+    print("=" * 40)
+    test_wants_msgpack_quality_values()
+    print("\n🎉 Negotiation tests passed!")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test coalescing of concurrent identical lookups
+"""
+
+import asyncio
+import os
+import sys
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_computation():
+    async def run():
+        flight = SingleFlight("mushaf_page")
+        calls = []
+
+        async def compute(key):
+            calls.append(key)
+            await asyncio.sleep(0.01)
+            return {"page": key}
+
+        results = await asyncio.gather(
+            *[flight.do(1, lambda: compute(1)) for _ in range(10)],
+            *[flight.do(2, lambda: compute(2)) for _ in range(5)]
+        )
+        assert calls == [1, 2]
+        assert all(result is results[0] for result in results[:10])
+        assert all(result == {"page": 2} for result in results[10:])
+        assert flight.in_flight == 0
+
+        # Nothing is kept once the call finished
+        await flight.do(1, lambda: compute(1))
+        assert calls == [1, 2, 1]
+
+    asyncio.run(run())
+    print("✅ 15 concurrent calls ran 2 computations")
+
+
+def test_errors_are_shared_and_not_kept():
+    async def run():
+        flight = SingleFlight("search")
+        attempts = 0
+
+        async def failing():
+            nonlocal attempts
+            attempts += 1
+            await asyncio.sleep(0.01)
+            raise ValueError("database locked")
+
+        results = await asyncio.gather(*[flight.do("q", failing) for _ in range(3)], return_exceptions=True)
+        assert attempts == 1
+        assert all(isinstance(result, ValueError) for result in results)
+        assert flight.in_flight == 0
+
+        async def succeeding():
+            return "rows"
+
+        assert await flight.do("q", succeeding) == "rows"
+
+    asyncio.run(run())
+    print("✅ Errors shared once and not cached")
+
+
+def test_cancelled_follower_leaves_others_running():
+    async def run():
+        flight = SingleFlight("surah_timings")
+
+        async def compute():
+            await asyncio.sleep(0.02)
+            return "timings"
+
+        leader = asyncio.ensure_future(flight.do(1, compute))
+        follower = asyncio.ensure_future(flight.do(1, compute))
+        await asyncio.sleep(0)
+        follower.cancel()
+        assert await leader == "timings"
+        assert follower.cancelled()
+
+    asyncio.run(run())
+    print("✅ A cancelled caller does not cancel the shared call")
+
+
+if __name__ == "__main__":
+    print("🛫 Testing request coalescing")
+    print("=" * 40)
+    test_concurrent_calls_share_one_computation()
+    test_errors_are_shared_and_not_kept()
+    test_cancelled_follower_leaves_others_running()
+    print("\n🎉 Coalescing tests passed!")
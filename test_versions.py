@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test content-addressed build versions and splice deltas
+"""
+
+import base64
+import os
+import random
+import sys
+import tempfile
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.offline.versions import (
+    COMPARE_CHUNK, apply_delta, changes_between, load_build_manifest, make_delta, record_build
+)
+
+
+def edits(base: bytes):
+    """(name, new bytes) pairs covering edits at the edges, inside and across compare chunks"""
+    middle = len(base) // 2
+    yield "identical", base
+    yield "empty to full", base
+    yield "to empty", b""
+    yield "prepend", b"new" + base
+    yield "append", base + b"new"
+    yield "replace middle", base[:middle] + b"changed words" + base[middle + 5:]
+    yield "delete middle", base[:middle] + base[middle + 100:]
+    yield "at chunk boundary", base[:COMPARE_CHUNK] + b"x" + base[COMPARE_CHUNK + 1:]
+    yield "before chunk boundary", base[:COMPARE_CHUNK - 1] + b"x" + base[COMPARE_CHUNK:]
+    yield "repeated bytes", base[:middle] + base[middle - 1:middle] * 3 + base[middle:]
+
+
+def test_delta_round_trip():
+    rng = random.Random(7)
+    base = bytes(rng.randrange(256) for _ in range(5 * COMPARE_CHUNK + 123))
+    for name, new in edits(base):
+        old = b"" if name == "empty to full" else base
+        delta = make_delta(old, new)
+        assert apply_delta(old, delta) == new, name
+        assert delta["prefix"] + delta["suffix"] <= min(len(old), len(new)), name
+    # A small edit ships only the changed bytes
+    new = base[:1000] + b"ab" + base[1002:]
+    assert make_delta(base, new)["insert"] == b"ab"
+    print("✅ Deltas round-trip")
+
+
+def test_changes_between_builds():
+    """A client holding the old build reconstructs the new one from the change list"""
+    rng = random.Random(3)
+    page = bytes(rng.randrange(256) for _ in range(20000))
+    old_parts = {"pages/1": page, "pages/2": b"second page", "chapters": b"old"}
+    new_parts = {"pages/1": page[:9000] + b"fixed" + page[9005:], "pages/2": b"second page", "fonts/p1": b"font"}
+
+    with tempfile.TemporaryDirectory() as store_dir:
+        old = record_build(old_parts.items(), store_dir)
+        new = record_build(new_parts.items(), store_dir)
+        assert old["version"] != new["version"]
+        assert load_build_manifest(new["version"], store_dir) == new
+        assert load_build_manifest("../LATEST", store_dir) is None
+
+        changes = changes_between(old, new, store_dir)
+        assert changes["removed"] == ["chapters"]
+        changed = {entry["part"]: entry for entry in changes["changed"]}
+        assert sorted(changed) == ["fonts/p1", "pages/1"]
+        assert "delta" not in changed["fonts/p1"]
+
+        delta = changed["pages/1"]["delta"]
+        assert delta["base_sha256"] == old["parts"]["pages/1"]["sha256"]
+        rebuilt = apply_delta(old_parts["pages/1"], {**delta, "insert": base64.b64decode(delta["insert"])})
+        assert rebuilt == new_parts["pages/1"]
+        print(f"✅ Change list with a {len(base64.b64decode(delta['insert']))}-byte delta")
+
+
+if __name__ == "__main__":
+    print("🔖 Testing build versions")
+    print("=" * 40)
+    test_delta_round_trip()
+    test_changes_between_builds()
+    print("\n🎉 Version tests passed!")